@@ -12,6 +12,7 @@ from homeassistant.auth.permissions.const import POLICY_READ
 from homeassistant.bootstrap import DATA_LOGGING
 from homeassistant.components.http import HomeAssistantView
 from homeassistant.const import (
+    CONTENT_TYPE_JSON,
     EVENT_HOMEASSISTANT_STOP,
     EVENT_TIME_CHANGED,
     HTTP_BAD_REQUEST,
@@ -229,7 +230,15 @@ class APIStatesView(HomeAssistantView):
             for state in request.app["hass"].states.async_all()
             if entity_perm(state.entity_id, "read")
         ]
-        return self.json(states)
+        # The states are serialized once and joined for every request
+        try:
+            states_json = f'[{",".join(state.as_json() for state in states)}]'
+        except (ValueError, TypeError):
+            return self.json(states)
+
+        response = web.Response(text=states_json, content_type=CONTENT_TYPE_JSON)
+        response.enable_compression()
+        return response
 
 
 class APIEntityStateView(HomeAssistantView):
@@ -1,7 +1,8 @@
 """Provide pre-made queries on top of the recorder component."""
 from collections import defaultdict
 from datetime import datetime as dt, timedelta
-from itertools import groupby
+from functools import partial
+from itertools import chain, groupby
 import json
 import logging
 import time
@@ -12,12 +13,21 @@ from sqlalchemy import and_, bindparam, func, not_, or_
 from sqlalchemy.ext import baked
 import voluptuous as vol
 
-from homeassistant.components import recorder
+from homeassistant.components import recorder, websocket_api
 from homeassistant.components.http import HomeAssistantView
 from homeassistant.components.recorder.models import (
+    EMPTY_JSON_OBJECT,
+    StateAttributes,
     States,
     process_timestamp,
     process_timestamp_to_utc_isoformat,
+    process_timestamp_to_utc_timestamp,
+)
+from homeassistant.components.recorder.statistics import (
+    PERIOD_5MINUTE,
+    PERIOD_HOUR,
+    list_statistic_ids,
+    statistics_during_period,
 )
 from homeassistant.components.recorder.util import execute, session_scope
 from homeassistant.const import (
@@ -46,6 +56,13 @@ CONF_ORDER = "use_include_order"
 STATE_KEY = "state"
 LAST_CHANGED_KEY = "last_changed"
 
+# Keys of the columnar response
+COLUMN_STATE_KEY = "s"
+COLUMN_LAST_UPDATED_KEY = "lu"
+COLUMN_ATTRIBUTES_KEY = "a"
+# Number of rows fetched at a time when streaming the columnar history
+COLUMNAR_YIELD_PER = 1000
+
 GLOB_TO_SQL_CHARS = {
     42: "%",  # *
     46: "_",  # .
@@ -80,6 +97,7 @@ QUERY_STATES = [
     States.entity_id,
     States.state,
     States.attributes,
+    StateAttributes.shared_attrs,
     States.last_changed,
     States.last_updated,
 ]
@@ -87,9 +105,16 @@ QUERY_STATES = [
 HISTORY_BAKERY = "history_bakery"
 
 
+def _query_states(session):
+    """Query the states with their shared attributes joined in."""
+    return session.query(*QUERY_STATES).outerjoin(
+        StateAttributes, States.attributes_id == StateAttributes.attributes_id
+    )
+
+
 def get_significant_states(hass, *args, **kwargs):
     """Wrap _get_significant_states with a sql session."""
-    with session_scope(hass=hass) as session:
+    with session_scope(hass=hass, read_only=True) as session:
         return _get_significant_states(hass, session, *args, **kwargs)
 
 
@@ -103,6 +128,7 @@ def _get_significant_states(
     include_start_time_state=True,
     significant_changes_only=True,
     minimal_response=False,
+    columnar_response=False,
 ):
     """
     Return states changes during UTC period start_time - end_time.
@@ -110,12 +136,13 @@ def _get_significant_states(
     Significant states are all states where there is a state change,
     as well as all states from certain domains (for instance
     thermostat so that we get current temperature in our graphs).
+
+    With columnar_response the states are returned in the format of
+    _sorted_states_to_columns.
     """
     timer_start = time.perf_counter()
 
-    baked_query = hass.data[HISTORY_BAKERY](
-        lambda session: session.query(*QUERY_STATES)
-    )
+    baked_query = hass.data[HISTORY_BAKERY](_query_states)
 
     if significant_changes_only:
         baked_query += lambda q: q.filter(
@@ -142,12 +169,32 @@ def _get_significant_states(
 
     baked_query += lambda q: q.order_by(States.entity_id, States.last_updated)
 
-    states = execute(
-        baked_query(session).params(
-            start_time=start_time, end_time=end_time, entity_ids=entity_ids
-        )
+    if columnar_response:
+        # The rows are fetched in batches while the columns are built
+        baked_query += lambda q: q.yield_per(COLUMNAR_YIELD_PER)
+
+    query = baked_query(session).params(
+        start_time=start_time, end_time=end_time, entity_ids=entity_ids
     )
 
+    if columnar_response:
+        result = _sorted_states_to_columns(
+            hass,
+            session,
+            query,
+            start_time,
+            entity_ids,
+            filters,
+            include_start_time_state,
+            minimal_response,
+        )
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            elapsed = time.perf_counter() - timer_start
+            _LOGGER.debug("get_significant_states took %fs", elapsed)
+        return result
+
+    states = execute(query)
+
     if _LOGGER.isEnabledFor(logging.DEBUG):
         elapsed = time.perf_counter() - timer_start
         _LOGGER.debug("get_significant_states took %fs", elapsed)
@@ -166,10 +213,8 @@ def _get_significant_states(
 
 def state_changes_during_period(hass, start_time, end_time=None, entity_id=None):
     """Return states changes during UTC period start_time - end_time."""
-    with session_scope(hass=hass) as session:
-        baked_query = hass.data[HISTORY_BAKERY](
-            lambda session: session.query(*QUERY_STATES)
-        )
+    with session_scope(hass=hass, read_only=True) as session:
+        baked_query = hass.data[HISTORY_BAKERY](_query_states)
 
         baked_query += lambda q: q.filter(
             (States.last_changed == States.last_updated)
@@ -182,7 +227,9 @@ def state_changes_during_period(hass, start_time, end_time=None, entity_id=None)
             )
 
         if entity_id is not None:
-            baked_query += lambda q: q.filter_by(entity_id=bindparam("entity_id"))
+            baked_query += lambda q: q.filter(
+                States.entity_id == bindparam("entity_id")
+            )
             entity_id = entity_id.lower()
 
         baked_query += lambda q: q.order_by(States.entity_id, States.last_updated)
@@ -202,14 +249,14 @@ def get_last_state_changes(hass, number_of_states, entity_id):
     """Return the last number_of_states."""
     start_time = dt_util.utcnow()
 
-    with session_scope(hass=hass) as session:
-        baked_query = hass.data[HISTORY_BAKERY](
-            lambda session: session.query(*QUERY_STATES)
-        )
+    with session_scope(hass=hass, read_only=True) as session:
+        baked_query = hass.data[HISTORY_BAKERY](_query_states)
         baked_query += lambda q: q.filter(States.last_changed == States.last_updated)
 
         if entity_id is not None:
-            baked_query += lambda q: q.filter_by(entity_id=bindparam("entity_id"))
+            baked_query += lambda q: q.filter(
+                States.entity_id == bindparam("entity_id")
+            )
             entity_id = entity_id.lower()
 
         baked_query += lambda q: q.order_by(
@@ -245,7 +292,7 @@ def get_states(hass, utc_point_in_time, entity_ids=None, run=None, filters=None)
         if run is None:
             return []
 
-    with session_scope(hass=hass) as session:
+    with session_scope(hass=hass, read_only=True) as session:
         return _get_states_with_session(
             hass, session, utc_point_in_time, entity_ids, run, filters
         )
@@ -270,7 +317,7 @@ def _get_states_with_session(
     # We have more than one entity to look at (most commonly we want
     # all entities,) so we need to do a search on all states since the
     # last recorder run started.
-    query = session.query(*QUERY_STATES)
+    query = _query_states(session)
 
     most_recent_states_by_date = session.query(
         States.entity_id.label("max_entity_id"),
@@ -318,9 +365,7 @@ def _get_states_with_session(
 def _get_single_entity_states_with_session(hass, session, utc_point_in_time, entity_id):
     # Use an entirely different (and extremely fast) query if we only
     # have a single entity id
-    baked_query = hass.data[HISTORY_BAKERY](
-        lambda session: session.query(*QUERY_STATES)
-    )
+    baked_query = hass.data[HISTORY_BAKERY](_query_states)
     baked_query += lambda q: q.filter(
         States.last_updated < bindparam("utc_point_in_time"),
         States.entity_id == bindparam("entity_id"),
@@ -424,6 +469,119 @@ def _sorted_states_to_json(
     return {key: val for key, val in result.items() if val}
 
 
+def _sorted_states_to_columns(
+    hass,
+    session,
+    states,
+    start_time,
+    entity_ids,
+    filters=None,
+    include_start_time_state=True,
+    minimal_response=False,
+):
+    """Convert SQL results into a compact columnar data structure.
+
+    This turns our state rows into parallel arrays per entity
+    {'entity_id': {'s': [states], 'lu': [last updated], 'a': {index: attributes}}}
+    where the last updated times are UTC epoch timestamps and the
+    attributes are only included at the points where they changed.
+
+    The rows are converted as they are iterated, no State object
+    is created for them. States may be a query that fetches its rows
+    in batches, it is only iterated after the states at the start time
+    were queried.
+
+    States must be sorted by entity_id and last_updated
+    """
+    result = {}
+    # Set all entity IDs in result set to maintain the order
+    if entity_ids is not None:
+        result = dict.fromkeys(entity_ids)
+
+    # Get the rows of the states at the start time
+    start_rows = {}
+    if include_start_time_state:
+        run = recorder.run_information_from_instance(hass, start_time)
+        for state in _get_states_with_session(
+            hass, session, start_time, entity_ids, run=run, filters=filters
+        ):
+            start_rows[state.entity_id] = state._row  # pylint: disable=protected-access
+    start_timestamp = start_time.timestamp()
+
+    for ent_id, group in groupby(states, lambda state: state.entity_id):
+        result[ent_id] = _rows_to_columns(
+            ent_id,
+            start_rows.pop(ent_id, None),
+            start_timestamp,
+            group,
+            minimal_response,
+        )
+
+    for ent_id, start_row in start_rows.items():
+        result[ent_id] = _rows_to_columns(
+            ent_id, start_row, start_timestamp, (), minimal_response
+        )
+
+    # Filter out the entities without any state
+    return {key: val for key, val in result.items() if val}
+
+
+def _rows_to_columns(entity_id, start_row, start_timestamp, rows, minimal_response):
+    """Convert the sorted rows of an entity into columns.
+
+    With minimal response the rows that do not change the state
+    are skipped and only the first point has attributes, except
+    for the domains where the attributes are needed.
+    """
+    need_attributes = (
+        not minimal_response or split_entity_id(entity_id)[0] in NEED_ATTRIBUTE_DOMAINS
+    )
+    # Called in a tight loop so cache the function
+    # here
+    _process_timestamp_to_utc_timestamp = process_timestamp_to_utc_timestamp
+
+    points = (
+        (row, _process_timestamp_to_utc_timestamp(row.last_updated)) for row in rows
+    )
+    if start_row is not None:
+        points = chain(((start_row, start_timestamp),), points)
+
+    states = []
+    timestamps = []
+    attributes = {}
+    prev_shared_attrs = None
+    for row, timestamp in points:
+        state = row.state or ""
+        if not need_attributes and states:
+            if state == states[-1]:
+                continue
+        else:
+            shared_attrs = row.shared_attrs or row.attributes or EMPTY_JSON_OBJECT
+            if shared_attrs != prev_shared_attrs:
+                attributes[len(states)] = _decode_attributes(entity_id, shared_attrs)
+                prev_shared_attrs = shared_attrs
+        states.append(state)
+        timestamps.append(timestamp)
+
+    if not states:
+        return None
+
+    return {
+        COLUMN_STATE_KEY: states,
+        COLUMN_LAST_UPDATED_KEY: timestamps,
+        COLUMN_ATTRIBUTES_KEY: attributes,
+    }
+
+
+def _decode_attributes(entity_id, shared_attrs):
+    """Decode the json attributes of a state row."""
+    try:
+        return json.loads(shared_attrs)
+    except ValueError:
+        _LOGGER.exception("Error converting attributes of %s", entity_id)
+        return {}
+
+
 def get_state(hass, utc_point_in_time, entity_id, run=None):
     """Return a state at a specific point in time."""
     states = get_states(hass, utc_point_in_time, (entity_id,), run)
@@ -437,10 +595,15 @@ async def async_setup(hass, config):
     filters = sqlalchemy_filter_from_include_exclude_conf(conf)
 
     hass.data[HISTORY_BAKERY] = baked.bakery()
+    hass.data[DOMAIN] = filters
 
     use_include_order = conf.get(CONF_ORDER)
 
     hass.http.register_view(HistoryPeriodView(filters, use_include_order))
+    hass.http.register_view(HistoryStatisticsView())
+    websocket_api.async_register_command(hass, ws_get_history_during_period)
+    websocket_api.async_register_command(hass, ws_get_statistics_during_period)
+    websocket_api.async_register_command(hass, ws_get_list_statistic_ids)
     hass.components.frontend.async_register_built_in_panel(
         "history", "history", "hass:poll-box"
     )
@@ -513,7 +676,7 @@ class HistoryPeriodView(HomeAssistantView):
 
         return cast(
             web.Response,
-            await hass.async_add_executor_job(
+            await hass.data[recorder.DATA_INSTANCE].async_add_read_job(
                 self._sorted_significant_states_json,
                 hass,
                 start_time,
@@ -538,7 +701,7 @@ class HistoryPeriodView(HomeAssistantView):
         """Fetch significant stats from the database as json."""
         timer_start = time.perf_counter()
 
-        with session_scope(hass=hass) as session:
+        with session_scope(hass=hass, read_only=True) as session:
             result = _get_significant_states(
                 hass,
                 session,
@@ -572,6 +735,158 @@ class HistoryPeriodView(HomeAssistantView):
         return self.json(result)
 
 
+class HistoryStatisticsView(HomeAssistantView):
+    """Handle long-term statistics requests."""
+
+    url = "/api/history/statistics"
+    name = "api:history:view-statistics"
+    extra_urls = ["/api/history/statistics/{datetime}"]
+
+    async def get(
+        self, request: web.Request, datetime: Optional[str] = None
+    ) -> web.Response:
+        """Return the statistics over a period of time."""
+        now = dt_util.utcnow()
+
+        if datetime:
+            start_time = dt_util.parse_datetime(datetime)
+            if start_time is None:
+                return self.json_message("Invalid datetime", HTTP_BAD_REQUEST)
+            start_time = dt_util.as_utc(start_time)
+        else:
+            start_time = now - timedelta(days=1)
+
+        end_time = None
+        end_time_str = request.query.get("end_time")
+        if end_time_str:
+            end_time = dt_util.parse_datetime(end_time_str)
+            if end_time is None:
+                return self.json_message("Invalid end_time", HTTP_BAD_REQUEST)
+            end_time = dt_util.as_utc(end_time)
+
+        statistic_ids = None
+        statistic_ids_str = request.query.get("statistic_ids")
+        if statistic_ids_str:
+            statistic_ids = statistic_ids_str.lower().split(",")
+
+        period = request.query.get("period", PERIOD_HOUR)
+        if period not in (PERIOD_5MINUTE, PERIOD_HOUR):
+            return self.json_message("Invalid period", HTTP_BAD_REQUEST)
+
+        hass = request.app["hass"]
+        statistics = await hass.data[recorder.DATA_INSTANCE].async_add_read_job(
+            statistics_during_period,
+            hass,
+            start_time,
+            end_time,
+            statistic_ids,
+            period,
+        )
+        return self.json(statistics)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "history/history_during_period",
+        vol.Required("start_time"): str,
+        vol.Optional("end_time"): str,
+        vol.Optional("entity_ids"): [str],
+        vol.Optional("include_start_time_state", default=True): bool,
+        vol.Optional("significant_changes_only", default=True): bool,
+        vol.Optional("minimal_response", default=False): bool,
+    }
+)
+@websocket_api.async_response
+async def ws_get_history_during_period(hass, connection, msg):
+    """Handle history websocket command.
+
+    The history is returned in the compact columnar format.
+    """
+    start_time = dt_util.parse_datetime(msg["start_time"])
+    if start_time is None:
+        connection.send_error(msg["id"], "invalid_start_time", "Invalid start_time")
+        return
+    start_time = dt_util.as_utc(start_time)
+
+    if "end_time" in msg:
+        end_time = dt_util.parse_datetime(msg["end_time"])
+        if end_time is None:
+            connection.send_error(msg["id"], "invalid_end_time", "Invalid end_time")
+            return
+        end_time = dt_util.as_utc(end_time)
+    else:
+        end_time = start_time + timedelta(days=1)
+
+    entity_ids = msg.get("entity_ids")
+    if entity_ids is not None:
+        entity_ids = [entity_id.lower() for entity_id in entity_ids]
+
+    history = await hass.data[recorder.DATA_INSTANCE].async_add_read_job(
+        partial(
+            get_significant_states,
+            hass,
+            start_time,
+            end_time,
+            entity_ids,
+            hass.data[DOMAIN],
+            include_start_time_state=msg["include_start_time_state"],
+            significant_changes_only=msg["significant_changes_only"],
+            minimal_response=msg["minimal_response"],
+            columnar_response=True,
+        )
+    )
+    connection.send_result(msg["id"], history)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "history/statistics_during_period",
+        vol.Required("start_time"): str,
+        vol.Optional("end_time"): str,
+        vol.Optional("statistic_ids"): [str],
+        vol.Optional("period", default=PERIOD_HOUR): vol.In(
+            [PERIOD_5MINUTE, PERIOD_HOUR]
+        ),
+    }
+)
+@websocket_api.async_response
+async def ws_get_statistics_during_period(hass, connection, msg):
+    """Handle statistics websocket command."""
+    start_time = dt_util.parse_datetime(msg["start_time"])
+    if start_time is None:
+        connection.send_error(msg["id"], "invalid_start_time", "Invalid start_time")
+        return
+    start_time = dt_util.as_utc(start_time)
+
+    end_time = None
+    if "end_time" in msg:
+        end_time = dt_util.parse_datetime(msg["end_time"])
+        if end_time is None:
+            connection.send_error(msg["id"], "invalid_end_time", "Invalid end_time")
+            return
+        end_time = dt_util.as_utc(end_time)
+
+    statistics = await hass.data[recorder.DATA_INSTANCE].async_add_read_job(
+        statistics_during_period,
+        hass,
+        start_time,
+        end_time,
+        msg.get("statistic_ids"),
+        msg["period"],
+    )
+    connection.send_result(msg["id"], statistics)
+
+
+@websocket_api.websocket_command({vol.Required("type"): "history/list_statistic_ids"})
+@websocket_api.async_response
+async def ws_get_list_statistic_ids(hass, connection, msg):
+    """Handle list statistic ids websocket command."""
+    statistic_ids = await hass.data[recorder.DATA_INSTANCE].async_add_read_job(
+        list_statistic_ids, hass
+    )
+    connection.send_result(msg["id"], statistic_ids)
+
+
 def sqlalchemy_filter_from_include_exclude_conf(conf):
     """Build a sql filter from config."""
     filters = Filters()
@@ -704,13 +1019,16 @@ class LazyState(State):
         self._last_changed = None
         self._last_updated = None
         self._context = None
+        self._as_json = None
 
     @property  # type: ignore
     def attributes(self):
         """State attributes."""
         if not self._attributes:
             try:
-                self._attributes = json.loads(self._row.attributes)
+                self._attributes = json.loads(
+                    self._row.shared_attrs or self._row.attributes or EMPTY_JSON_OBJECT
+                )
             except ValueError:
                 # When json.loads fails
                 _LOGGER.exception("Error converting row to state: %s", self)
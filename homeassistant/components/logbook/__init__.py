@@ -1,7 +1,10 @@
 """Event parser and human readable log generator."""
+import asyncio
+from collections import namedtuple
 from datetime import timedelta
 from itertools import groupby
 import json
+import logging
 import re
 
 import sqlalchemy
@@ -9,15 +12,21 @@ from sqlalchemy.orm import aliased
 from sqlalchemy.sql.expression import literal
 import voluptuous as vol
 
+from homeassistant.components import websocket_api
 from homeassistant.components.automation import EVENT_AUTOMATION_TRIGGERED
 from homeassistant.components.history import sqlalchemy_filter_from_include_exclude_conf
 from homeassistant.components.http import HomeAssistantView
 from homeassistant.components.recorder.models import (
+    EMPTY_JSON_OBJECT,
+    EventData,
     Events,
+    StateAttributes,
     States,
+    context_id_from_db,
     process_timestamp_to_utc_isoformat,
 )
-from homeassistant.components.recorder.util import session_scope
+from homeassistant.components.recorder.const import DATA_INSTANCE
+from homeassistant.components.recorder.util import LRUCache, session_scope
 from homeassistant.components.script import EVENT_SCRIPT_STARTED
 from homeassistant.const import (
     ATTR_DOMAIN,
@@ -26,6 +35,7 @@ from homeassistant.const import (
     ATTR_ICON,
     ATTR_NAME,
     ATTR_SERVICE,
+    ATTR_UNIT_OF_MEASUREMENT,
     EVENT_CALL_SERVICE,
     EVENT_HOMEASSISTANT_START,
     EVENT_HOMEASSISTANT_STOP,
@@ -44,9 +54,12 @@ from homeassistant.helpers.entityfilter import (
 from homeassistant.helpers.integration_platform import (
     async_process_integration_platforms,
 )
+from homeassistant.helpers.json import JSONEncoder
 from homeassistant.loader import bind_hass
 import homeassistant.util.dt as dt_util
 
+_LOGGER = logging.getLogger(__name__)
+
 ENTITY_ID_JSON_TEMPLATE = '"entity_id": "{}"'
 ENTITY_ID_JSON_EXTRACT = re.compile('"entity_id": "([^"]+)"')
 DOMAIN_JSON_EXTRACT = re.compile('"domain": "([^"]+)"')
@@ -60,9 +73,20 @@ CONTINUOUS_DOMAINS = ["proximity", "sensor"]
 
 DOMAIN = "logbook"
 
+LOGBOOK_FILTERS = "logbook_filters"
+
 GROUP_BY_MINUTES = 15
 
-EMPTY_JSON_OBJECT = "{}"
+DEFAULT_PAGE_SIZE = 500
+
+# Bound the lookups kept while humanifying events
+CONTEXT_LOOKUP_SIZE = 8192
+ENTITY_ATTRIBUTE_CACHE_SIZE = 1024
+
+# Time to wait for the recorder to commit before
+# reading the last page of a stream
+COMMIT_TIMEOUT = 10
+
 UNIT_OF_MEASUREMENT_JSON = '"unit_of_measurement":'
 
 HA_DOMAIN_ENTITY_ID = f"{HA_DOMAIN}."
@@ -90,12 +114,38 @@ ALL_EVENT_TYPES = [
 EVENT_COLUMNS = [
     Events.event_type,
     Events.event_data,
+    EventData.shared_data,
     Events.time_fired,
     Events.context_id,
     Events.context_user_id,
     Events.context_parent_id,
+    Events.context_id_bin,
+    Events.context_user_id_bin,
+    Events.context_parent_id_bin,
 ]
 
+# An event fired on the bus in the shape of a row of the logbook query
+LiveRow = namedtuple(
+    "LiveRow",
+    [
+        "event_type",
+        "event_data",
+        "shared_data",
+        "time_fired",
+        "context_id",
+        "context_user_id",
+        "context_parent_id",
+        "context_id_bin",
+        "context_user_id_bin",
+        "context_parent_id_bin",
+        "state",
+        "entity_id",
+        "domain",
+        "attributes",
+        "shared_attrs",
+    ],
+)
+
 SCRIPT_AUTOMATION_EVENTS = [EVENT_AUTOMATION_TRIGGERED, EVENT_SCRIPT_STARTED]
 
 LOG_MESSAGE_SCHEMA = vol.Schema(
@@ -161,7 +211,10 @@ async def async_setup(hass, config):
         filters = None
         entities_filter = None
 
+    hass.data[LOGBOOK_FILTERS] = (filters, entities_filter)
     hass.http.register_view(LogbookView(conf, filters, entities_filter))
+    websocket_api.async_register_command(hass, ws_get_events)
+    websocket_api.async_register_command(hass, ws_event_stream)
 
     hass.services.async_register(DOMAIN, "log", log_message, schema=LOG_MESSAGE_SCHEMA)
 
@@ -248,7 +301,217 @@ class LogbookView(HomeAssistantView):
                 )
             )
 
-        return await hass.async_add_executor_job(json_events)
+        return await hass.data[DATA_INSTANCE].async_add_read_job(json_events)
+
+
+def _parse_time(connection, msg, key):
+    """Parse a time of a websocket message, sending an error if invalid."""
+    parsed = dt_util.parse_datetime(msg[key])
+    if parsed is None:
+        connection.send_error(msg["id"], f"invalid_{key}", f"Invalid {key}")
+        return None
+    return dt_util.as_utc(parsed)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "logbook/get_events",
+        vol.Required("start_time"): str,
+        vol.Required("end_time"): str,
+        vol.Optional("entity_ids"): cv.entity_ids,
+        vol.Optional("entity_matches_only", default=False): bool,
+        vol.Optional("page_size", default=DEFAULT_PAGE_SIZE): vol.All(
+            vol.Coerce(int), vol.Range(min=1)
+        ),
+    }
+)
+@websocket_api.async_response
+async def ws_get_events(hass, connection, msg):
+    """Handle logbook get events websocket command.
+
+    The result holds a page of entries and the cursor to pass as
+    start_time to get the next page, or None for the last page.
+    """
+    start_time = _parse_time(connection, msg, "start_time")
+    if start_time is None:
+        return
+    end_time = _parse_time(connection, msg, "end_time")
+    if end_time is None:
+        return
+
+    filters, entities_filter = hass.data[LOGBOOK_FILTERS]
+    entries, cursor = await hass.data[DATA_INSTANCE].async_add_read_job(
+        _get_events_page,
+        hass,
+        start_time,
+        end_time,
+        msg["page_size"],
+        EntityAttributeCache(hass),
+        _new_context_lookup(),
+        msg.get("entity_ids"),
+        filters,
+        entities_filter,
+        msg["entity_matches_only"],
+    )
+    connection.send_result(
+        msg["id"],
+        {
+            "events": entries,
+            "cursor": process_timestamp_to_utc_isoformat(cursor),
+        },
+    )
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "logbook/event_stream",
+        vol.Required("start_time"): str,
+        vol.Optional("entity_ids"): cv.entity_ids,
+        vol.Optional("page_size", default=DEFAULT_PAGE_SIZE): vol.All(
+            vol.Coerce(int), vol.Range(min=1)
+        ),
+    }
+)
+@websocket_api.async_response
+async def ws_event_stream(hass, connection, msg):
+    """Handle logbook event stream websocket command.
+
+    The entries since start_time are sent in pages followed by
+    the entries of the events as they are fired.
+    """
+    start_time = _parse_time(connection, msg, "start_time")
+    if start_time is None:
+        return
+
+    msg_id = msg["id"]
+    entity_ids = msg.get("entity_ids")
+    filters, entities_filter = hass.data[LOGBOOK_FILTERS]
+    if entity_ids is not None:
+        filters = None
+        entities_filter = generate_filter([], entity_ids, [], [])
+    entity_attr_cache = EntityAttributeCache(hass)
+    context_lookup = _new_context_lookup()
+    # The events fired while the recorded pages are sent
+    pending_events = []
+
+    def send_entries(entries):
+        """Send entries to the client."""
+        if entries:
+            connection.send_message(
+                websocket_api.event_message(msg_id, {"events": entries})
+            )
+
+    def humanify_live_events(events):
+        """Humanify the events fired on the bus."""
+        rows = [
+            _live_row(event)
+            for event in events
+            if event.event_type != EVENT_STATE_CHANGED
+            or _keep_live_state_change(event, entities_filter)
+        ]
+        return list(
+            humanify(
+                hass,
+                _yield_events(hass, rows, entities_filter, context_lookup),
+                entity_attr_cache,
+                context_lookup,
+            )
+        )
+
+    @callback
+    def async_forward_event(event):
+        """Forward a fired event to the client."""
+        if pending_events is not None:
+            pending_events.append(event)
+        else:
+            send_entries(humanify_live_events([event]))
+
+    unsubs = [
+        hass.bus.async_listen(event_type, async_forward_event)
+        for event_type in {*ALL_EVENT_TYPES, *hass.data[DOMAIN]}
+    ]
+
+    @callback
+    def async_unsubscribe():
+        """Stop forwarding events."""
+        for unsub in unsubs:
+            unsub()
+
+    connection.subscriptions[msg_id] = async_unsubscribe
+    connection.send_result(msg_id)
+
+    # The recorded pages end where the forwarded events start
+    end_time = dt_util.utcnow()
+    try:
+        await asyncio.wait_for(hass.data[DATA_INSTANCE].async_commit(), COMMIT_TIMEOUT)
+    except asyncio.TimeoutError:
+        _LOGGER.warning("Recorder did not commit the pending events in time")
+
+    cursor = start_time
+    while cursor is not None and msg_id in connection.subscriptions:
+        entries, cursor = await hass.data[DATA_INSTANCE].async_add_read_job(
+            _get_events_page,
+            hass,
+            cursor,
+            end_time,
+            msg["page_size"],
+            entity_attr_cache,
+            context_lookup,
+            entity_ids,
+            filters,
+            entities_filter,
+        )
+        send_entries(entries)
+
+    events, pending_events = pending_events, None
+    if msg_id in connection.subscriptions:
+        send_entries(humanify_live_events(events))
+
+
+def _keep_live_state_change(event, entities_filter):
+    """Return if a fired state change is shown like the recorded ones."""
+    old_state = event.data.get("old_state")
+    new_state = event.data.get("new_state")
+    if old_state is None or new_state is None or old_state.state == new_state.state:
+        return False
+    if (
+        new_state.domain in CONTINUOUS_DOMAINS
+        and ATTR_UNIT_OF_MEASUREMENT in new_state.attributes
+    ):
+        return False
+    return entities_filter is None or entities_filter(new_state.entity_id)
+
+
+def _live_row(event):
+    """Convert an event fired on the bus to a row of the logbook query."""
+    state = entity_id = domain = attributes = None
+    if event.event_type == EVENT_STATE_CHANGED:
+        new_state = event.data["new_state"]
+        state = new_state.state
+        entity_id = new_state.entity_id
+        domain = new_state.domain
+        attributes = json.dumps(new_state.attributes, cls=JSONEncoder)
+        event_data = EMPTY_JSON_OBJECT
+    else:
+        event_data = json.dumps(event.data, cls=JSONEncoder)
+
+    return LiveRow(
+        event_type=event.event_type,
+        event_data=event_data,
+        shared_data=None,
+        time_fired=event.time_fired,
+        context_id=event.context.id,
+        context_user_id=event.context.user_id,
+        context_parent_id=event.context.parent_id,
+        context_id_bin=None,
+        context_user_id_bin=None,
+        context_parent_id_bin=None,
+        state=state,
+        entity_id=entity_id,
+        domain=domain,
+        attributes=attributes,
+        shared_attrs=None,
+    )
 
 
 def humanify(hass, events, entity_attr_cache, context_lookup):
@@ -419,61 +682,141 @@ def _get_events(
     """Get events for a period of time."""
 
     entity_attr_cache = EntityAttributeCache(hass)
-    context_lookup = {None: None}
-
-    def yield_events(query):
-        """Yield Events that are not filtered away."""
-        for row in query.yield_per(1000):
-            event = LazyEventPartialState(row)
-            context_lookup.setdefault(event.context_id, event)
-            if event.event_type == EVENT_CALL_SERVICE:
-                continue
-            if event.event_type == EVENT_STATE_CHANGED or _keep_event(
-                hass, event, entities_filter
-            ):
-                yield event
+    context_lookup = _new_context_lookup()
 
     if entity_ids is not None:
         entities_filter = generate_filter([], entity_ids, [], [])
 
-    with session_scope(hass=hass) as session:
-        old_state = aliased(States, name="old_state")
+    with session_scope(hass=hass, read_only=True) as session:
+        query = _generate_logbook_query(
+            hass, session, start_day, end_day, entity_ids, filters, entity_matches_only
+        )
 
-        if entity_ids is not None:
-            query = _generate_events_query_without_states(session)
-            query = _apply_event_time_filter(query, start_day, end_day)
-            query = _apply_event_types_filter(
-                hass, query, ALL_EVENT_TYPES_EXCEPT_STATE_CHANGED
-            )
-            if entity_matches_only:
-                # When entity_matches_only is provided, contexts and events that do not
-                # contain the entity_ids are not included in the logbook response.
-                query = _apply_event_entity_id_matchers(query, entity_ids)
-
-            query = query.union_all(
-                _generate_states_query(
-                    session, start_day, end_day, old_state, entity_ids
-                )
+        return list(
+            humanify(
+                hass,
+                _yield_events(
+                    hass, query.yield_per(1000), entities_filter, context_lookup
+                ),
+                entity_attr_cache,
+                context_lookup,
             )
-        else:
-            query = _generate_events_query(session)
-            query = _apply_event_time_filter(query, start_day, end_day)
-            query = _apply_events_types_and_states_filter(
-                hass, query, old_state
-            ).filter(
-                (States.last_updated == States.last_changed)
-                | (Events.event_type != EVENT_STATE_CHANGED)
+        )
+
+
+def _get_events_page(
+    hass,
+    start_day,
+    end_day,
+    page_size,
+    entity_attr_cache,
+    context_lookup,
+    entity_ids=None,
+    filters=None,
+    entities_filter=None,
+    entity_matches_only=False,
+):
+    """Get a page of the events fired after start_day.
+
+    The page ends with the group of events of its page_size-th row, so the
+    entries are grouped as they would be for the whole period. Returns the
+    entries and the time the last event of the page was fired, to continue
+    from, or None when there are no more events in the period.
+    """
+    cursor = None
+    more = False
+
+    def page_rows(rows):
+        """Yield the rows of the page."""
+        nonlocal cursor, more
+        group = None
+        for count, row in enumerate(rows):
+            row_group = row.time_fired.minute // GROUP_BY_MINUTES
+            if count >= page_size and row_group != group:
+                more = True
+                return
+            group = row_group
+            cursor = row.time_fired
+            yield row
+
+    if entity_ids is not None:
+        entities_filter = generate_filter([], entity_ids, [], [])
+
+    with session_scope(hass=hass, read_only=True) as session:
+        query = _generate_logbook_query(
+            hass, session, start_day, end_day, entity_ids, filters, entity_matches_only
+        )
+        entries = list(
+            humanify(
+                hass,
+                _yield_events(
+                    hass,
+                    page_rows(query.yield_per(page_size)),
+                    entities_filter,
+                    context_lookup,
+                ),
+                entity_attr_cache,
+                context_lookup,
             )
-            if filters:
-                query = query.filter(
-                    filters.entity_filter() | (Events.event_type != EVENT_STATE_CHANGED)
-                )
+        )
 
-        query = query.order_by(Events.time_fired)
+    return entries, cursor if more else None
 
-        return list(
-            humanify(hass, yield_events(query), entity_attr_cache, context_lookup)
+
+def _new_context_lookup():
+    """Return a bounded lookup of the first event of each context."""
+    context_lookup = LRUCache(CONTEXT_LOOKUP_SIZE)
+    context_lookup[None] = None
+    return context_lookup
+
+
+def _yield_events(hass, rows, entities_filter, context_lookup):
+    """Yield Events that are not filtered away."""
+    for row in rows:
+        event = LazyEventPartialState(row)
+        if event.context_id not in context_lookup:
+            context_lookup[event.context_id] = event
+        if event.event_type == EVENT_CALL_SERVICE:
+            continue
+        if event.event_type == EVENT_STATE_CHANGED or _keep_event(
+            hass, event, entities_filter
+        ):
+            yield event
+
+
+def _generate_logbook_query(
+    hass, session, start_day, end_day, entity_ids, filters, entity_matches_only
+):
+    """Generate the query of the logbook events of a period of time."""
+    old_state = aliased(States, name="old_state")
+
+    if entity_ids is not None:
+        query = _generate_events_query_without_states(session)
+        query = _apply_event_time_filter(query, start_day, end_day)
+        query = _apply_event_types_filter(
+            hass, query, ALL_EVENT_TYPES_EXCEPT_STATE_CHANGED
+        )
+        if entity_matches_only:
+            # When entity_matches_only is provided, contexts and events that do not
+            # contain the entity_ids are not included in the logbook response.
+            query = _apply_event_entity_id_matchers(query, entity_ids)
+
+        query = query.union_all(
+            _generate_states_query(session, start_day, end_day, old_state, entity_ids)
+        )
+    else:
+        query = _generate_events_query(session)
+        query = _apply_event_time_filter(query, start_day, end_day)
+        query = _apply_events_types_and_states_filter(hass, query, old_state).filter(
+            (States.last_updated == States.last_changed)
+            | (Events.event_type != EVENT_STATE_CHANGED)
         )
+        if filters:
+            query = query.filter(
+                filters.entity_filter() | (Events.event_type != EVENT_STATE_CHANGED)
+            )
+
+    return query.order_by(Events.time_fired)
 
 
 def _generate_events_query(session):
@@ -483,6 +826,7 @@ def _generate_events_query(session):
         States.entity_id,
         States.domain,
         States.attributes,
+        StateAttributes.shared_attrs,
     )
 
 
@@ -493,14 +837,19 @@ def _generate_events_query_without_states(session):
         literal(None).label("entity_id"),
         literal(None).label("domain"),
         literal(None).label("attributes"),
-    )
+        literal(None).label("shared_attrs"),
+    ).outerjoin(EventData, (Events.data_id == EventData.data_id))
 
 
 def _generate_states_query(session, start_day, end_day, old_state, entity_ids):
     return (
         _generate_events_query(session)
         .outerjoin(Events, (States.event_id == Events.event_id))
+        .outerjoin(EventData, (Events.data_id == EventData.data_id))
         .outerjoin(old_state, (States.old_state_id == old_state.state_id))
+        .outerjoin(
+            StateAttributes, (States.attributes_id == StateAttributes.attributes_id)
+        )
         .filter(_missing_state_matcher(old_state))
         .filter(_continuous_entity_matcher())
         .filter((States.last_updated > start_day) & (States.last_updated < end_day))
@@ -513,8 +862,12 @@ def _generate_states_query(session, start_day, end_day, old_state, entity_ids):
 
 def _apply_events_types_and_states_filter(hass, query, old_state):
     events_query = (
-        query.outerjoin(States, (Events.event_id == States.event_id))
+        query.outerjoin(EventData, (Events.data_id == EventData.data_id))
+        .outerjoin(States, (Events.event_id == States.event_id))
         .outerjoin(old_state, (States.old_state_id == old_state.state_id))
+        .outerjoin(
+            StateAttributes, (States.attributes_id == StateAttributes.attributes_id)
+        )
         .filter(
             (Events.event_type != EVENT_STATE_CHANGED)
             | _missing_state_matcher(old_state)
@@ -544,7 +897,11 @@ def _continuous_entity_matcher():
     #
     return sqlalchemy.or_(
         sqlalchemy.not_(States.domain.in_(CONTINUOUS_DOMAINS)),
-        sqlalchemy.not_(States.attributes.contains(UNIT_OF_MEASUREMENT_JSON)),
+        sqlalchemy.not_(
+            sqlalchemy.func.coalesce(
+                StateAttributes.shared_attrs, States.attributes
+            ).contains(UNIT_OF_MEASUREMENT_JSON)
+        ),
     )
 
 
@@ -564,7 +921,9 @@ def _apply_event_entity_id_matchers(events_query, entity_ids):
     return events_query.filter(
         sqlalchemy.or_(
             *[
-                Events.event_data.contains(ENTITY_ID_JSON_TEMPLATE.format(entity_id))
+                sqlalchemy.func.coalesce(
+                    EventData.shared_data, Events.event_data
+                ).contains(ENTITY_ID_JSON_TEMPLATE.format(entity_id))
                 for entity_id in entity_ids
             ]
         )
@@ -693,9 +1052,15 @@ class LazyEventPartialState:
         self.entity_id = self._row.entity_id
         self.state = self._row.state
         self.domain = self._row.domain
-        self.context_id = self._row.context_id
-        self.context_user_id = self._row.context_user_id
-        self.context_parent_id = self._row.context_parent_id
+        self.context_id = context_id_from_db(
+            self._row.context_id, self._row.context_id_bin
+        )
+        self.context_user_id = context_id_from_db(
+            self._row.context_user_id, self._row.context_user_id_bin
+        )
+        self.context_parent_id = context_id_from_db(
+            self._row.context_parent_id, self._row.context_parent_id_bin
+        )
         self.time_fired_minute = self._row.time_fired.minute
 
     @property
@@ -704,7 +1069,9 @@ class LazyEventPartialState:
         if self._attributes:
             return self._attributes.get(ATTR_ICON)
 
-        result = ICON_JSON_EXTRACT.search(self._row.attributes)
+        result = ICON_JSON_EXTRACT.search(
+            self._row.shared_attrs or self._row.attributes or EMPTY_JSON_OBJECT
+        )
         return result and result.group(1)
 
     @property
@@ -713,7 +1080,7 @@ class LazyEventPartialState:
         if self._event_data:
             return self._event_data.get(ATTR_ENTITY_ID)
 
-        result = ENTITY_ID_JSON_EXTRACT.search(self._row.event_data)
+        result = ENTITY_ID_JSON_EXTRACT.search(self._shared_data)
         return result and result.group(1)
 
     @property
@@ -722,30 +1089,34 @@ class LazyEventPartialState:
         if self._event_data:
             return self._event_data.get(ATTR_DOMAIN)
 
-        result = DOMAIN_JSON_EXTRACT.search(self._row.event_data)
+        result = DOMAIN_JSON_EXTRACT.search(self._shared_data)
         return result and result.group(1)
 
     @property
     def attributes(self):
         """State attributes."""
         if not self._attributes:
-            if (
-                self._row.attributes is None
-                or self._row.attributes == EMPTY_JSON_OBJECT
-            ):
+            source = self._row.shared_attrs or self._row.attributes
+            if source is None or source == EMPTY_JSON_OBJECT:
                 self._attributes = {}
             else:
-                self._attributes = json.loads(self._row.attributes)
+                self._attributes = json.loads(source)
         return self._attributes
 
+    @property
+    def _shared_data(self):
+        """Event data json from the shared or the legacy column."""
+        return self._row.shared_data or self._row.event_data or EMPTY_JSON_OBJECT
+
     @property
     def data(self):
         """Event data."""
         if not self._event_data:
-            if self._row.event_data == EMPTY_JSON_OBJECT:
+            source = self._shared_data
+            if source == EMPTY_JSON_OBJECT:
                 self._event_data = {}
             else:
-                self._event_data = json.loads(self._row.event_data)
+                self._event_data = json.loads(source)
         return self._event_data
 
     @property
@@ -766,27 +1137,27 @@ class EntityAttributeCache:
     that are expected to change state.
     """
 
-    def __init__(self, hass):
+    def __init__(self, hass, max_size=ENTITY_ATTRIBUTE_CACHE_SIZE):
         """Init the cache."""
         self._hass = hass
-        self._cache = {}
+        self._cache = LRUCache(max_size)
 
     def get(self, entity_id, attribute, event):
         """Lookup an attribute for an entity or get it from the cache."""
-        if entity_id in self._cache:
-            if attribute in self._cache[entity_id]:
-                return self._cache[entity_id][attribute]
-        else:
-            self._cache[entity_id] = {}
+        attributes = self._cache.get(entity_id)
+        if attributes is None:
+            attributes = self._cache[entity_id] = {}
+        elif attribute in attributes:
+            return attributes[attribute]
 
         current_state = self._hass.states.get(entity_id)
         if current_state:
             # Try the current state as its faster than decoding the
             # attributes
-            self._cache[entity_id][attribute] = current_state.attributes.get(attribute)
+            attributes[attribute] = current_state.attributes.get(attribute)
         else:
             # If the entity has been removed, decode the attributes
             # instead
-            self._cache[entity_id][attribute] = event.attributes.get(attribute)
+            attributes[attribute] = event.attributes.get(attribute)
 
-        return self._cache[entity_id][attribute]
+        return attributes[attribute]
@@ -10,12 +10,16 @@ import objgraph
 from pyprof2calltree import convert
 import voluptuous as vol
 
+from homeassistant.components import websocket_api
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.core import HomeAssistant, ServiceCall, callback
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.polling import DATA_POLLING_SCHEDULER
 from homeassistant.helpers.service import async_register_admin_service
+from homeassistant.helpers.template_timing import DATA_TEMPLATE_TIMINGS, TemplateTimings
 from homeassistant.helpers.typing import ConfigType
+from homeassistant.util.job_timing import JobTimings
 
 from .const import DOMAIN
 
@@ -24,6 +28,10 @@ SERVICE_MEMORY = "memory"
 SERVICE_START_LOG_OBJECTS = "start_log_objects"
 SERVICE_STOP_LOG_OBJECTS = "stop_log_objects"
 SERVICE_DUMP_LOG_OBJECTS = "dump_log_objects"
+SERVICE_START_JOB_TIMING = "start_job_timing"
+SERVICE_STOP_JOB_TIMING = "stop_job_timing"
+SERVICE_START_TEMPLATE_TIMING = "start_template_timing"
+SERVICE_STOP_TEMPLATE_TIMING = "stop_template_timing"
 
 SERVICES = (
     SERVICE_START,
@@ -31,8 +39,14 @@ SERVICES = (
     SERVICE_START_LOG_OBJECTS,
     SERVICE_STOP_LOG_OBJECTS,
     SERVICE_DUMP_LOG_OBJECTS,
+    SERVICE_START_JOB_TIMING,
+    SERVICE_STOP_JOB_TIMING,
+    SERVICE_START_TEMPLATE_TIMING,
+    SERVICE_STOP_TEMPLATE_TIMING,
 )
 
+PLATFORMS = ["sensor"]
+
 DEFAULT_SCAN_INTERVAL = timedelta(seconds=30)
 
 CONF_SECONDS = "seconds"
@@ -46,6 +60,9 @@ _LOGGER = logging.getLogger(__name__)
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """Set up the profiler component."""
+    websocket_api.async_register_command(hass, ws_job_timings)
+    websocket_api.async_register_command(hass, ws_polling)
+    websocket_api.async_register_command(hass, ws_template_timings)
     return True
 
 
@@ -99,6 +116,26 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
             notification_id="profile_object_dump",
         )
 
+    @callback
+    def _async_start_job_timing(call: ServiceCall):
+        if hass.job_timings is not None:
+            return
+
+        hass.job_timings = JobTimings(hass.loop)
+        hass.job_timings.async_start()
+
+    @callback
+    def _async_stop_job_timing(call: ServiceCall):
+        _async_stop_job_timings(hass)
+
+    @callback
+    def _async_start_template_timing(call: ServiceCall):
+        hass.data.setdefault(DATA_TEMPLATE_TIMINGS, TemplateTimings())
+
+    @callback
+    def _async_stop_template_timing(call: ServiceCall):
+        hass.data.pop(DATA_TEMPLATE_TIMINGS, None)
+
     async_register_admin_service(
         hass,
         DOMAIN,
@@ -149,19 +186,132 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         schema=vol.Schema({vol.Required(CONF_TYPE): str}),
     )
 
+    async_register_admin_service(
+        hass,
+        DOMAIN,
+        SERVICE_START_JOB_TIMING,
+        _async_start_job_timing,
+        schema=vol.Schema({}),
+    )
+
+    async_register_admin_service(
+        hass,
+        DOMAIN,
+        SERVICE_STOP_JOB_TIMING,
+        _async_stop_job_timing,
+        schema=vol.Schema({}),
+    )
+
+    async_register_admin_service(
+        hass,
+        DOMAIN,
+        SERVICE_START_TEMPLATE_TIMING,
+        _async_start_template_timing,
+        schema=vol.Schema({}),
+    )
+
+    async_register_admin_service(
+        hass,
+        DOMAIN,
+        SERVICE_STOP_TEMPLATE_TIMING,
+        _async_stop_template_timing,
+        schema=vol.Schema({}),
+    )
+
+    for platform in PLATFORMS:
+        hass.async_create_task(
+            hass.config_entries.async_forward_entry_setup(entry, platform)
+        )
+
     return True
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Unload a config entry."""
+    unload_ok = all(
+        await asyncio.gather(
+            *[
+                hass.config_entries.async_forward_entry_unload(entry, platform)
+                for platform in PLATFORMS
+            ]
+        )
+    )
+    if not unload_ok:
+        return False
+
     for service in SERVICES:
         hass.services.async_remove(domain=DOMAIN, service=service)
     if LOG_INTERVAL_SUB in hass.data[DOMAIN]:
         hass.data[DOMAIN][LOG_INTERVAL_SUB]()
+    _async_stop_job_timings(hass)
+    hass.data.pop(DATA_TEMPLATE_TIMINGS, None)
     hass.data.pop(DOMAIN)
     return True
 
 
+@callback
+def _async_stop_job_timings(hass: HomeAssistant):
+    if hass.job_timings is None:
+        return
+
+    hass.job_timings.async_stop()
+    hass.job_timings = None
+
+
+@websocket_api.require_admin
+@websocket_api.websocket_command({vol.Required("type"): "profiler/job_timings"})
+@callback
+def ws_job_timings(hass, connection, msg):
+    """Return the timings of the jobs and the lag of the event loop.
+
+    Also returns how many state writes were skipped because they did not change
+    the state.
+    """
+    if hass.job_timings is None:
+        connection.send_error(
+            msg["id"], "not_started", "Job timing has not been started"
+        )
+        return
+
+    connection.send_result(
+        msg["id"],
+        {
+            **hass.job_timings.as_dict(),
+            "suppressed_writes": hass.states.suppressed_writes,
+        },
+    )
+
+
+@websocket_api.require_admin
+@websocket_api.websocket_command({vol.Required("type"): "profiler/polling"})
+@callback
+def ws_polling(hass, connection, msg):
+    """Return the poll stats of the platforms polled by the polling scheduler."""
+    scheduler = hass.data.get(DATA_POLLING_SCHEDULER)
+    if scheduler is None:
+        connection.send_error(
+            msg["id"], "not_enabled", "The polling scheduler is not enabled"
+        )
+        return
+
+    connection.send_result(msg["id"], scheduler.as_dict())
+
+
+@websocket_api.require_admin
+@websocket_api.websocket_command({vol.Required("type"): "profiler/template_timings"})
+@callback
+def ws_template_timings(hass, connection, msg):
+    """Return the timings of the template renders, the slowest first."""
+    timings = hass.data.get(DATA_TEMPLATE_TIMINGS)
+    if timings is None:
+        connection.send_error(
+            msg["id"], "not_started", "Template timing has not been started"
+        )
+        return
+
+    connection.send_result(msg["id"], timings.as_dict())
+
+
 async def _async_generate_profile(hass: HomeAssistant, call: ServiceCall):
     start_time = int(time.time() * 1000000)
     hass.components.persistent_notification.async_create(
@@ -0,0 +1,126 @@
+"""Sensors reporting the timings of the jobs run by Home Assistant."""
+from abc import ABC, abstractmethod
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import TIME_MILLISECONDS
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.typing import HomeAssistantType
+
+ICON = "mdi:timer-outline"
+
+
+async def async_setup_entry(
+    hass: HomeAssistantType, entry: ConfigEntry, async_add_entities
+):
+    """Set up the profiler sensors."""
+    async_add_entities(
+        [LoopLagSensor(hass, entry), SlowestJobSensor(hass, entry)], True
+    )
+
+
+def _milliseconds(seconds):
+    """Convert a duration in seconds to rounded milliseconds."""
+    if seconds is None:
+        return None
+    return round(seconds * 1000, 1)
+
+
+class JobTimingSensor(Entity, ABC):
+    """Base class for sensors reporting on the job timings.
+
+    The sensors have no state while job timing is not started.
+    """
+
+    def __init__(self, hass, entry):
+        """Initialize the sensor."""
+        self.hass = hass
+        self._entry = entry
+        self._state = None
+        self._attributes = {}
+
+    @property
+    def icon(self):
+        """Return the icon of the sensor."""
+        return ICON
+
+    @property
+    def state(self):
+        """Return the state of the sensor."""
+        return self._state
+
+    @property
+    def device_state_attributes(self):
+        """Return the state attributes."""
+        return self._attributes
+
+    async def async_update(self):
+        """Read the job timings in the event loop that records them."""
+        job_timings = self.hass.job_timings
+        if job_timings is None:
+            self._state = None
+            self._attributes = {}
+        else:
+            self._update_from(job_timings.as_dict())
+
+    @abstractmethod
+    def _update_from(self, timings):
+        """Update the sensor from the job timings."""
+
+
+class LoopLagSensor(JobTimingSensor):
+    """How late the event loop runs its callbacks."""
+
+    @property
+    def name(self):
+        """Return the name of the sensor."""
+        return "Event loop lag"
+
+    @property
+    def unique_id(self):
+        """Return a unique ID."""
+        return f"{self._entry.entry_id}_loop_lag"
+
+    @property
+    def unit_of_measurement(self):
+        """Return the unit of measurement."""
+        return TIME_MILLISECONDS
+
+    def _update_from(self, timings):
+        """Report the 99th percentile of the recent lags."""
+        loop_lag = timings["loop_lag"]
+        self._state = _milliseconds(loop_lag["p99"])
+        self._attributes = {
+            "last": _milliseconds(loop_lag["last"]),
+            "max": _milliseconds(loop_lag["max"]),
+        }
+
+
+class SlowestJobSensor(JobTimingSensor):
+    """The job target that took the most time."""
+
+    @property
+    def name(self):
+        """Return the name of the sensor."""
+        return "Slowest job"
+
+    @property
+    def unique_id(self):
+        """Return a unique ID."""
+        return f"{self._entry.entry_id}_slowest_job"
+
+    def _update_from(self, timings):
+        """Report the target with the largest cumulative duration."""
+        if not timings["jobs"]:
+            self._state = None
+            self._attributes = {}
+            return
+
+        slowest = timings["jobs"][0]
+        # States are limited to 255 characters
+        self._state = slowest["target"][-255:]
+        self._attributes = {
+            "job_type": slowest["job_type"],
+            "count": slowest["count"],
+            "total": _milliseconds(slowest["total"]),
+            "p99": _milliseconds(slowest["p99"]),
+        }
@@ -2,16 +2,16 @@
 import asyncio
 from collections import namedtuple
 import concurrent.futures
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
 import queue
 import threading
 import time
 from typing import Any, Callable, List, Optional
 
-from sqlalchemy import create_engine, event as sqlalchemy_event, exc, select
+from sqlalchemy import create_engine, event as sqlalchemy_event, exc, func, select
 from sqlalchemy.orm import scoped_session, sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import QueuePool, StaticPool
 import voluptuous as vol
 
 from homeassistant.components import persistent_notification
@@ -34,10 +34,19 @@ from homeassistant.helpers.entityfilter import (
 from homeassistant.helpers.typing import ConfigType
 import homeassistant.util.dt as dt_util
 
-from . import migration, purge
+from . import migration, purge, statistics
 from .const import CONF_DB_INTEGRITY_CHECK, DATA_INSTANCE, DOMAIN, SQLITE_URL_PREFIX
-from .models import Base, Events, RecorderRuns, States
-from .util import session_scope, validate_or_move_away_sqlite_database
+from .models import (
+    Base,
+    EventData,
+    Events,
+    RecorderRuns,
+    StateAttributes,
+    States,
+    StatisticsShortTerm,
+    process_timestamp,
+)
+from .util import LRUCache, session_scope, validate_or_move_away_sqlite_database
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -61,9 +70,13 @@ DEFAULT_DB_RETRY_WAIT = 3
 DEFAULT_COMMIT_INTERVAL = 1
 KEEPALIVE_TIME = 30
 
-# Controls how often we clean up
-# States and Events objects
-EXPIRE_AFTER_COMMITS = 120
+# The number of attribute and event data ids to cache in memory
+STATE_ATTRIBUTES_ID_CACHE_SIZE = 2048
+EVENT_DATA_ID_CACHE_SIZE = 2048
+
+# Connections of the read only pool, each with
+# a thread of the read executor
+READ_POOL_SIZE = 4
 
 CONF_AUTO_PURGE = "auto_purge"
 CONF_DB_URL = "db_url"
@@ -198,11 +211,19 @@ async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
 
 PurgeTask = namedtuple("PurgeTask", ["keep_days", "repack"])
 
+StatisticsTask = namedtuple("StatisticsTask", ["start"])
+
+CommitTask = namedtuple("CommitTask", ["done"])
+
 
 class WaitTask:
     """An object to insert into the recorder queue to tell it set the _queue_watch event."""
 
 
+class _BulkInsertMismatch(Exception):
+    """The primary keys of a bulk insert could not be matched to its rows."""
+
+
 class Recorder(threading.Thread):
     """A threaded recorder class."""
 
@@ -241,12 +262,25 @@ class Recorder(threading.Thread):
         self.exclude_t = exclude_t
 
         self._timechanges_seen = 0
-        self._commits_without_expire = 0
         self._keepalive_count = 0
-        self._old_states = {}
-        self._pending_expunge = []
+        self._old_state_ids = {}
+        self._state_attributes_ids = LRUCache(STATE_ATTRIBUTES_ID_CACHE_SIZE)
+        self._pending_state_attributes = {}
+        self._event_data_ids = LRUCache(EVENT_DATA_ID_CACHE_SIZE)
+        self._pending_event_data = {}
+        self._pending_events = []
+        # The highest primary key of each table the events are bulk inserted in
+        self._last_ids = {}
+        self.batch_latency: Optional[float] = None
+        self.purge_started: Optional[float] = None
+        self.purged_rows = 0
         self.event_session = None
         self.get_session = None
+        self.read_engine: Any = None
+        self.get_read_session = None
+        self._read_executor: Any = concurrent.futures.ThreadPoolExecutor(
+            max_workers=READ_POOL_SIZE, thread_name_prefix="RecorderRead"
+        )
         self._completed_database_setup = False
 
     @callback
@@ -296,6 +330,7 @@ class Recorder(threading.Thread):
                 )
 
             self.hass.add_job(connection_failed)
+            self._shutdown_read_executor()
             return
 
         shutdown_task = object()
@@ -348,6 +383,17 @@ class Recorder(threading.Thread):
                 async_purge, hour=4, minute=12, second=0
             )
 
+        @callback
+        def async_periodic_statistics(now):
+            """Trigger the statistics run for the period that just ended."""
+            self.queue.put(StatisticsTask(statistics.get_start_time(now)))
+
+        # Compile statistics every 5 minutes
+        self.hass.helpers.event.track_utc_time_change(
+            async_periodic_statistics, minute="/5", second=10
+        )
+        self._schedule_compile_missing_statistics()
+
         self.event_session = self.get_session()
         self.event_session.expire_on_commit = False
         # Use a session for the event read loop
@@ -358,12 +404,25 @@ class Recorder(threading.Thread):
             if event is None:
                 self._close_run()
                 self._close_connection()
+                self._shutdown_read_executor()
                 return
             if isinstance(event, PurgeTask):
+                # Commit pending states first so the purge never removes
+                # state attributes that are about to be referenced
+                self._commit_event_session_or_retry()
                 # Schedule a new purge task if this one didn't finish
                 if not purge.purge_old_data(self, event.keep_days, event.repack):
                     self.queue.put(PurgeTask(event.keep_days, event.repack))
                 continue
+            if isinstance(event, StatisticsTask):
+                # Commit pending states first so they are part of the statistics
+                self._commit_event_session_or_retry()
+                statistics.compile_statistics(self, event.start)
+                continue
+            if isinstance(event, CommitTask):
+                self._commit_event_session_or_retry()
+                self.hass.loop.call_soon_threadsafe(event.done.set)
+                continue
             if isinstance(event, WaitTask):
                 self._queue_watch.set()
                 continue
@@ -387,50 +446,128 @@ class Recorder(threading.Thread):
                     continue
 
             try:
-                if event.event_type == EVENT_STATE_CHANGED:
-                    dbevent = Events.from_event(event, event_data="{}")
-                else:
-                    dbevent = Events.from_event(event)
-                dbevent.created = event.time_fired
-                self.event_session.add(dbevent)
+                dbevent = Events.row_from_event(event)
+                # The data of state_changed events is already in the states table
+                if event.event_type != EVENT_STATE_CHANGED:
+                    self._link_event_data(event, dbevent)
             except (TypeError, ValueError):
                 _LOGGER.warning("Event is not JSON serializable: %s", event)
+                continue
             except Exception as err:  # pylint: disable=broad-except
                 # Must catch the exception to prevent the loop from collapsing
                 _LOGGER.exception("Error adding event: %s", err)
+                continue
 
-            if dbevent and event.event_type == EVENT_STATE_CHANGED:
+            dbstate = None
+            if event.event_type == EVENT_STATE_CHANGED:
                 try:
-                    dbstate = States.from_event(event)
-                    has_new_state = event.data.get("new_state")
-                    if dbstate.entity_id in self._old_states:
-                        old_state = self._old_states.pop(dbstate.entity_id)
-                        if old_state.state_id:
-                            dbstate.old_state_id = old_state.state_id
-                        else:
-                            dbstate.old_state = old_state
-                    if not has_new_state:
-                        dbstate.state = None
-                    dbstate.event = dbevent
-                    dbstate.created = event.time_fired
-                    self.event_session.add(dbstate)
-                    if has_new_state:
-                        self._old_states[dbstate.entity_id] = dbstate
-                        self._pending_expunge.append(dbstate)
+                    dbstate = States.row_from_event(event)
+                    self._link_state_attributes(event, dbstate)
+                    if not event.data.get("new_state"):
+                        dbstate["state"] = None
                 except (TypeError, ValueError):
                     _LOGGER.warning(
                         "State is not JSON serializable: %s",
                         event.data.get("new_state"),
                     )
+                    dbstate = None
                 except Exception as err:  # pylint: disable=broad-except
                     # Must catch the exception to prevent the loop from collapsing
                     _LOGGER.exception("Error adding state change: %s", err)
+                    dbstate = None
+
+            self._pending_events.append((dbevent, dbstate))
 
             # If they do not have a commit interval
             # than we commit right away
             if not self.commit_interval:
                 self._commit_event_session_or_retry()
 
+    def _schedule_compile_missing_statistics(self):
+        """Compile the statistics of the periods missed while not running.
+
+        Periods older than the purge window no longer have their states.
+        """
+        with session_scope(session=self.get_session()) as session:
+            last_start = session.query(func.max(StatisticsShortTerm.start)).scalar()
+        if last_start is None:
+            return
+
+        now = dt_util.utcnow()
+        start = process_timestamp(last_start) + statistics.SHORT_TERM_PERIOD
+        while start < now - timedelta(days=self.keep_days):
+            start += statistics.SHORT_TERM_PERIOD
+        last_period_start = statistics.get_start_time(now)
+        while start <= last_period_start:
+            self.queue.put(StatisticsTask(start))
+            start += statistics.SHORT_TERM_PERIOD
+
+    def _link_state_attributes(self, event, dbstate):
+        """Link the state to a new or existing shared attributes row."""
+        shared_attrs = StateAttributes.shared_attrs_from_event(event)
+
+        # Matching attributes added in this commit batch
+        pending_states = self._pending_state_attributes.get(shared_attrs)
+        if pending_states is not None:
+            pending_states.append(dbstate)
+            return
+
+        # Matching attributes already written to the database
+        attributes_id = self._state_attributes_ids.get(shared_attrs)
+        if attributes_id is None:
+            attributes_id = self._find_shared_attrs_in_db(shared_attrs)
+        if attributes_id is not None:
+            self._state_attributes_ids[shared_attrs] = attributes_id
+            dbstate["attributes_id"] = attributes_id
+            return
+
+        # The attributes_id is set once the attributes are inserted
+        self._pending_state_attributes[shared_attrs] = [dbstate]
+
+    def _find_shared_attrs_in_db(self, shared_attrs):
+        """Find the attributes_id of matching attributes in the database."""
+        attributes_id = (
+            self.event_session.query(StateAttributes.attributes_id)
+            .filter(
+                StateAttributes.hash == StateAttributes.hash_shared_attrs(shared_attrs)
+            )
+            .filter(StateAttributes.shared_attrs == shared_attrs)
+            .first()
+        )
+        return attributes_id and attributes_id[0]
+
+    def _link_event_data(self, event, dbevent):
+        """Link the event to a new or existing shared event data row."""
+        shared_data = EventData.shared_data_from_event(event)
+
+        # Matching event data added in this commit batch
+        pending_events = self._pending_event_data.get(shared_data)
+        if pending_events is not None:
+            pending_events.append(dbevent)
+            return
+
+        # Matching event data already written to the database
+        data_id = self._event_data_ids.get(shared_data)
+        if data_id is None:
+            data_id = self._find_shared_data_in_db(shared_data)
+        if data_id is not None:
+            self._event_data_ids[shared_data] = data_id
+            dbevent["data_id"] = data_id
+            return
+
+        # The data_id is set once the event data is inserted
+        self._pending_event_data[shared_data] = [dbevent]
+
+    def _find_shared_data_in_db(self, shared_data):
+        """Find the data_id of matching event data in the database."""
+        data_id = (
+            self.event_session.query(EventData.data_id)
+            .filter(EventData.hash == EventData.hash_shared_data(shared_data))
+            .filter(EventData.shared_data == shared_data)
+            .first()
+        )
+        return data_id and data_id[0]
+
     def _send_keep_alive(self):
         try:
             _LOGGER.debug("Sending keepalive")
@@ -502,17 +639,16 @@ class Recorder(threading.Thread):
             _LOGGER.exception("Error while creating new event session: %s", err)
 
     def _commit_event_session(self):
-        self._commits_without_expire += 1
+        start = time.monotonic()
 
         try:
-            if self._pending_expunge:
-                self.event_session.flush()
-                for dbstate in self._pending_expunge:
-                    # Expunge the state so its not expired
-                    # until we use it later for dbstate.old_state
-                    if dbstate in self.event_session:
-                        self.event_session.expunge(dbstate)
-                self._pending_expunge = []
+            try:
+                new_old_state_ids = self._write_pending_events(bulk=True)
+            except _BulkInsertMismatch as err:
+                _LOGGER.debug("%s, inserting the rows one by one", err)
+                self.event_session.rollback()
+                self._last_ids = {}
+                new_old_state_ids = self._write_pending_events(bulk=False)
             self.event_session.commit()
         except exc.IntegrityError as err:
             _LOGGER.error(
@@ -520,25 +656,176 @@ class Recorder(threading.Thread):
                 err,
             )
             self.event_session.rollback()
-            self._old_states = {}
+            self._old_state_ids = {}
+            self._state_attributes_ids.clear()
+            self._event_data_ids.clear()
+            self._last_ids = {}
+            self._clear_pending_events()
             raise
         except Exception as err:
             _LOGGER.error("Error executing query: %s", err)
             self.event_session.rollback()
+            self._last_ids = {}
+            self._clear_pending_events()
             raise
 
-        # Expire is an expensive operation (frequently more expensive
-        # than the flush and commit itself) so we only
-        # do it after EXPIRE_AFTER_COMMITS commits
-        if self._commits_without_expire == EXPIRE_AFTER_COMMITS:
-            self._commits_without_expire = 0
-            self.event_session.expire_all()
+        # The pending attributes and event data now have their ids
+        for shared_attrs, dbstates in self._pending_state_attributes.items():
+            self._state_attributes_ids[shared_attrs] = dbstates[0]["attributes_id"]
+        for shared_data, dbevents in self._pending_event_data.items():
+            self._event_data_ids[shared_data] = dbevents[0]["data_id"]
+        for entity_id, state_id in new_old_state_ids.items():
+            if state_id is None:
+                self._old_state_ids.pop(entity_id, None)
+            else:
+                self._old_state_ids[entity_id] = state_id
+        self._clear_pending_events()
+
+        self.batch_latency = time.monotonic() - start
+
+    def _clear_pending_events(self):
+        self._pending_events = []
+        self._pending_state_attributes = {}
+        self._pending_event_data = {}
+
+    def _write_pending_events(self, bulk):
+        """Insert the events and states collected since the last commit.
+
+        Returns the state_id of the last state of each entity written, or None
+        if the entity was removed, to link the next states of those entities.
+        Without bulk the rows are inserted one by one.
+        """
+        new_old_state_ids = {}
+        if not self._pending_events:
+            return new_old_state_ids
+
+        for model, row_from_shared_json, key_column, pending in (
+            (
+                EventData,
+                EventData.row_from_shared_data,
+                "data_id",
+                self._pending_event_data,
+            ),
+            (
+                StateAttributes,
+                StateAttributes.row_from_shared_attrs,
+                "attributes_id",
+                self._pending_state_attributes,
+            ),
+        ):
+            if not pending:
+                continue
+            shared_ids = self._insert(
+                model,
+                [row_from_shared_json(shared_json) for shared_json in pending],
+                bulk,
+            )
+            for rows, shared_id in zip(pending.values(), shared_ids):
+                for row in rows:
+                    row[key_column] = shared_id
+
+        event_ids = self._insert(
+            Events, [dbevent for dbevent, _ in self._pending_events], bulk
+        )
+        dbstates = []
+        for (_, dbstate), event_id in zip(self._pending_events, event_ids):
+            if dbstate is not None:
+                dbstate["event_id"] = event_id
+                dbstates.append(dbstate)
+
+        # Each entity appears at most once per insert so
+        # the next state of an entity can link to the previous one
+        while dbstates:
+            batch = []
+            deferred = []
+            entity_ids = set()
+            for dbstate in dbstates:
+                entity_id = dbstate["entity_id"]
+                if entity_id in entity_ids:
+                    deferred.append(dbstate)
+                    continue
+                entity_ids.add(entity_id)
+                if entity_id in new_old_state_ids:
+                    dbstate["old_state_id"] = new_old_state_ids[entity_id]
+                else:
+                    dbstate["old_state_id"] = self._old_state_ids.get(entity_id)
+                batch.append(dbstate)
+
+            state_ids = self._insert(States, batch, bulk)
+            for dbstate, state_id in zip(batch, state_ids):
+                # A removed state is not the old state of the next one
+                new_old_state_ids[dbstate["entity_id"]] = (
+                    state_id if dbstate["state"] is not None else None
+                )
+            dbstates = deferred
+
+        return new_old_state_ids
+
+    def _insert(self, model, rows, bulk):
+        """Insert rows and return their primary keys.
+
+        With bulk the rows are inserted with a single executemany.
+        """
+        table = model.__table__
+        if not bulk:
+            return [
+                self.event_session.execute(table.insert(), row).inserted_primary_key[0]
+                for row in rows
+            ]
+
+        primary_key = next(iter(table.primary_key.columns))
+        last_id = self._last_ids.get(table.name)
+        if last_id is None:
+            last_id = self.event_session.query(func.max(primary_key)).scalar() or 0
+        self.event_session.execute(table.insert(), rows)
+
+        # SQLAlchemy 1.3 does not return the primary keys of an executemany.
+        # They are the ones that follow the highest key of the last insert,
+        # unless another writer inserted rows or the keys are not contiguous
+        # (auto_increment_increment, sequence caching or rolled back inserts).
+        new_ids = [
+            new_id
+            for new_id, in self.event_session.query(primary_key)
+            .filter(primary_key > last_id)
+            .order_by(primary_key)
+            .limit(len(rows) + 1)
+        ]
+        if new_ids != list(range(last_id + 1, last_id + len(rows) + 1)):
+            raise _BulkInsertMismatch(
+                f"The keys of the {len(rows)} rows inserted into {table.name} "
+                f"do not follow {last_id}"
+            )
+        self._last_ids[table.name] = new_ids[-1]
+        return new_ids
 
     @callback
     def event_listener(self, event):
         """Listen for new events and put them in the process queue."""
         self.queue.put(event)
 
+    @callback
+    def async_add_read_job(self, target: Callable[..., Any], *args: Any):
+        """Run a job that only reads the database in the read executor.
+
+        Read jobs run concurrently with each other and with the
+        recorder thread, using the connections of the read pool.
+        """
+        if self._read_executor is None:
+            return self.hass.async_add_executor_job(target, *args)
+        return self.hass.loop.run_in_executor(self._read_executor, target, *args)
+
+    def _shutdown_read_executor(self):
+        """Stop the threads of the read executor."""
+        read_executor, self._read_executor = self._read_executor, None
+        if read_executor is not None:
+            read_executor.shutdown(wait=False)
+
+    async def async_commit(self):
+        """Wait until the events queued so far are committed to the database."""
+        done = asyncio.Event()
+        self.queue.put(CommitTask(done))
+        await done.wait()
+
     def block_till_done(self):
         """Block till all events processed.
 
@@ -614,12 +901,56 @@ class Recorder(threading.Thread):
 
         Base.metadata.create_all(self.engine)
         self.get_session = scoped_session(sessionmaker(bind=self.engine))
+        self._setup_read_connection()
+
+    def _setup_read_connection(self):
+        """Set up the read only connection pool.
+
+        An in memory SQLite database only has the connection
+        of the recorder so reads share it.
+        """
+        if self.read_engine is not None:
+            self.read_engine.dispose()
+            self.read_engine = None
+
+        if self.db_url == SQLITE_URL_PREFIX or ":memory:" in self.db_url:
+            self.get_read_session = self.get_session
+            return
+
+        def setup_read_connection(dbapi_connection, connection_record):
+            """Make the connections of the pool read only."""
+            cursor = dbapi_connection.cursor()
+            if self.db_url.startswith(SQLITE_URL_PREFIX):
+                # Readers do not block the recorder in WAL mode
+                cursor.execute("PRAGMA query_only = ON")
+            elif self.db_url.startswith("mysql"):
+                cursor.execute("SET session wait_timeout=28800")
+                cursor.execute("SET SESSION TRANSACTION READ ONLY")
+            elif self.db_url.startswith("postgresql"):
+                cursor.execute("SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY")
+            cursor.close()
+
+        kwargs = {
+            "poolclass": QueuePool,
+            "pool_size": READ_POOL_SIZE,
+            "pool_pre_ping": True,
+        }
+        if self.db_url.startswith(SQLITE_URL_PREFIX):
+            kwargs["connect_args"] = {"check_same_thread": False}
+
+        self.read_engine = create_engine(self.db_url, **kwargs)
+        sqlalchemy_event.listen(self.read_engine, "connect", setup_read_connection)
+        self.get_read_session = scoped_session(sessionmaker(bind=self.read_engine))
 
     def _close_connection(self):
         """Close the connection."""
         self.engine.dispose()
         self.engine = None
         self.get_session = None
+        if self.read_engine is not None:
+            self.read_engine.dispose()
+            self.read_engine = None
+        self.get_read_session = None
 
     def _setup_run(self):
         """Log the start of the current run."""
@@ -1,17 +1,34 @@
 """Schema migration helpers."""
 import logging
 
-from sqlalchemy import ForeignKeyConstraint, MetaData, Table, text
+from sqlalchemy import ForeignKeyConstraint, MetaData, Table, bindparam, func, text
 from sqlalchemy.engine import reflection
 from sqlalchemy.exc import InternalError, OperationalError, SQLAlchemyError
+from sqlalchemy.orm import sessionmaker
 from sqlalchemy.schema import AddConstraint, DropConstraint
 
+from homeassistant.const import EVENT_STATE_CHANGED
+
 from .const import DOMAIN
-from .models import SCHEMA_VERSION, TABLE_STATES, Base, SchemaChanges
-from .util import session_scope
+from .models import (
+    SCHEMA_VERSION,
+    TABLE_STATES,
+    Base,
+    EventData,
+    Events,
+    SchemaChanges,
+    StateAttributes,
+    States,
+    context_id_to_db,
+)
+from .util import LRUCache, session_scope
 
 _LOGGER = logging.getLogger(__name__)
 
+# The number of rows moved to a
+# shared table per transaction
+SHARED_TABLE_MIGRATION_CHUNK_SIZE = 10000
+
 
 def migrate_schema(instance):
     """Check if the schema needs to be upgraded."""
@@ -206,6 +223,12 @@ def _add_columns(engine, table_name, columns_def):
             )
 
 
+def _column_def(engine, model, column_name):
+    """Return the column definition of a model column for the engine dialect."""
+    column_type = model.__table__.c[column_name].type
+    return f"{column_name} {column_type.compile(dialect=engine.dialect)}"
+
+
 def _update_states_table_with_foreign_key_options(engine):
     """Add the options to foreign key constraints."""
     inspector = reflection.Inspector.from_engine(engine)
@@ -323,10 +346,195 @@ def _apply_update(engine, new_version, old_version):
     elif new_version == 11:
         _create_index(engine, "states", "ix_states_old_state_id")
         _update_states_table_with_foreign_key_options(engine)
+    elif new_version == 12:
+        _add_columns(engine, "states", ["attributes_id INTEGER"])
+        _create_index(engine, "states", "ix_states_attributes_id")
+        _move_to_shared_table(
+            engine,
+            "state attributes",
+            States.state_id,
+            States.attributes,
+            States.attributes_id,
+            _find_or_add_state_attributes,
+        )
+    elif new_version == 13:
+        _add_columns(
+            engine,
+            "events",
+            [
+                _column_def(engine, Events, "data_id"),
+                _column_def(engine, Events, "context_id_bin"),
+                _column_def(engine, Events, "context_user_id_bin"),
+                _column_def(engine, Events, "context_parent_id_bin"),
+            ],
+        )
+        _create_index(engine, "events", "ix_events_data_id")
+        _create_index(engine, "events", "ix_events_context_id_bin")
+        _migrate_events(engine)
+    elif new_version == 14:
+        # The statistics tables are new and created by create_all
+        pass
     else:
         raise ValueError(f"No schema migration defined for version {new_version}")
 
 
+def _migrate_in_chunks(engine, row_id, columns, migrate_rows, *criteria):
+    """Migrate the rows of a table in chunks ordered by row_id.
+
+    The chunks are committed separately so the migration does not have to
+    hold a single huge transaction. Each chunk starts after the last row of
+    the previous one, so the rows that were already migrated are not scanned
+    again. migrate_rows is called with the session and the rows of a chunk
+    and returns how many rows it migrated.
+    """
+    session_maker = sessionmaker(bind=engine)
+    last_row_id = None
+
+    while True:
+        with session_scope(session=session_maker()) as session:
+            query = session.query(row_id, *columns).filter(*criteria)
+            if last_row_id is not None:
+                query = query.filter(row_id > last_row_id)
+            rows = query.order_by(row_id).limit(SHARED_TABLE_MIGRATION_CHUNK_SIZE).all()
+            if not rows:
+                return
+            last_row_id = rows[-1][0]
+            migrated = migrate_rows(session, rows)
+
+        _LOGGER.debug("Migrated %s of %s rows", migrated, len(rows))
+
+
+def _move_to_shared_table(engine, description, row_id, inline, link, find_or_add):
+    """Move inline json of a table to a shared table that the rows link to."""
+    _LOGGER.warning(
+        "Moving %s to a shared table. Note: this can take several "
+        "minutes on large databases and slow computers. Please "
+        "be patient!",
+        description,
+    )
+    shared_ids = LRUCache(SHARED_TABLE_MIGRATION_CHUNK_SIZE)
+
+    def move_rows(session, rows):
+        """Move the inline json of the rows of a chunk."""
+        row_ids_by_shared_json = {}
+        for row_id_value, shared_json in rows:
+            row_ids_by_shared_json.setdefault(shared_json, []).append(row_id_value)
+
+        for shared_json, row_ids in row_ids_by_shared_json.items():
+            shared_id = shared_ids.get(shared_json)
+            if shared_id is None:
+                shared_id = find_or_add(session, shared_json)
+                shared_ids[shared_json] = shared_id
+            session.query(row_id.class_).filter(row_id.in_(row_ids)).update(
+                {link: shared_id, inline: None}, synchronize_session=False
+            )
+        return len(rows)
+
+    _migrate_in_chunks(engine, row_id, [inline], move_rows, inline.isnot(None))
+
+
+def _migrate_events(engine):
+    """Move the event data to a shared table and the context ids to binary.
+
+    The data of state_changed events is already in the states table and is
+    dropped. Rows that were migrated before keep their links and binary
+    context ids if the migration runs again.
+    """
+    _LOGGER.warning(
+        "Moving event data to a shared table and converting the context ids. "
+        "Note: this can take several minutes on large databases and slow "
+        "computers. Please be patient!"
+    )
+    shared_ids = LRUCache(SHARED_TABLE_MIGRATION_CHUNK_SIZE)
+    events = Events.__table__
+    context_columns = ("context_id", "context_user_id", "context_parent_id")
+    values = {
+        "event_data": None,
+        "data_id": func.coalesce(bindparam("b_data_id"), events.c.data_id),
+    }
+    for column in context_columns:
+        values[column] = bindparam(f"b_{column}")
+        values[f"{column}_bin"] = func.coalesce(
+            bindparam(f"b_{column}_bin"), events.c[f"{column}_bin"]
+        )
+    update = (
+        events.update()
+        .where(events.c.event_id == bindparam("b_event_id"))
+        .values(values)
+    )
+
+    def migrate_rows(session, rows):
+        """Migrate the event data and context ids of the rows of a chunk."""
+        params = []
+        for event_id, event_type, event_data, *context_ids in rows:
+            if event_data is None and not any(context_ids):
+                continue
+            data_id = None
+            if event_data is not None and event_type != EVENT_STATE_CHANGED:
+                data_id = shared_ids.get(event_data)
+                if data_id is None:
+                    data_id = _find_or_add_event_data(session, event_data)
+                    shared_ids[event_data] = data_id
+            param = {"b_event_id": event_id, "b_data_id": data_id}
+            for column, context_id in zip(context_columns, context_ids):
+                param[f"b_{column}"], param[f"b_{column}_bin"] = context_id_to_db(
+                    context_id
+                )
+            params.append(param)
+        if params:
+            session.execute(update, params)
+        return len(params)
+
+    _migrate_in_chunks(
+        engine,
+        Events.event_id,
+        [
+            Events.event_type,
+            Events.event_data,
+            Events.context_id,
+            Events.context_user_id,
+            Events.context_parent_id,
+        ],
+        migrate_rows,
+    )
+
+
+def _find_or_add_state_attributes(session, shared_attrs):
+    """Return the attributes_id for shared_attrs, adding a row if needed."""
+    attr_hash = StateAttributes.hash_shared_attrs(shared_attrs)
+    existing = (
+        session.query(StateAttributes.attributes_id)
+        .filter(StateAttributes.hash == attr_hash)
+        .filter(StateAttributes.shared_attrs == shared_attrs)
+        .first()
+    )
+    if existing:
+        return existing[0]
+
+    dbstate_attributes = StateAttributes(hash=attr_hash, shared_attrs=shared_attrs)
+    session.add(dbstate_attributes)
+    session.flush()
+    return dbstate_attributes.attributes_id
+
+
+def _find_or_add_event_data(session, shared_data):
+    """Return the data_id for shared_data, adding a row if needed."""
+    data_hash = EventData.hash_shared_data(shared_data)
+    existing = (
+        session.query(EventData.data_id)
+        .filter(EventData.hash == data_hash)
+        .filter(EventData.shared_data == shared_data)
+        .first()
+    )
+    if existing:
+        return existing[0]
+
+    dbevent_data = EventData(hash=data_hash, shared_data=shared_data)
+    session.add(dbevent_data)
+    session.flush()
+    return dbevent_data.data_id
+
+
 def _inspect_schema_version(engine, session):
     """Determine the schema version by inspecting the db structure.
 
@@ -1,19 +1,23 @@
 """Models for SQLAlchemy."""
 import json
 import logging
+import zlib
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     Column,
     DateTime,
+    Float,
     ForeignKey,
     Index,
     Integer,
+    LargeBinary,
     String,
     Text,
     distinct,
 )
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.declarative import declarative_base, declared_attr
 from sqlalchemy.orm import relationship
 from sqlalchemy.orm.session import Session
 
@@ -25,18 +29,46 @@ import homeassistant.util.dt as dt_util
 # pylint: disable=invalid-name
 Base = declarative_base()
 
-SCHEMA_VERSION = 11
+SCHEMA_VERSION = 14
 
 _LOGGER = logging.getLogger(__name__)
 
 DB_TIMEZONE = "+00:00"
 
 TABLE_EVENTS = "events"
+TABLE_EVENT_DATA = "event_data"
 TABLE_STATES = "states"
+TABLE_STATE_ATTRIBUTES = "state_attributes"
 TABLE_RECORDER_RUNS = "recorder_runs"
 TABLE_SCHEMA_CHANGES = "schema_changes"
-
-ALL_TABLES = [TABLE_STATES, TABLE_EVENTS, TABLE_RECORDER_RUNS, TABLE_SCHEMA_CHANGES]
+TABLE_STATISTICS = "statistics"
+TABLE_STATISTICS_SHORT_TERM = "statistics_short_term"
+TABLE_STATISTICS_META = "statistics_meta"
+
+ALL_TABLES = [
+    TABLE_STATES,
+    TABLE_STATE_ATTRIBUTES,
+    TABLE_EVENTS,
+    TABLE_EVENT_DATA,
+    TABLE_RECORDER_RUNS,
+    TABLE_SCHEMA_CHANGES,
+    TABLE_STATISTICS,
+    TABLE_STATISTICS_SHORT_TERM,
+    TABLE_STATISTICS_META,
+]
+
+# Tables that have existed since before schema versions were
+# tracked and are safe to check before the schema is migrated
+TABLES_TO_CHECK = [
+    TABLE_STATES,
+    TABLE_EVENTS,
+    TABLE_RECORDER_RUNS,
+    TABLE_SCHEMA_CHANGES,
+]
+
+EMPTY_JSON_OBJECT = "{}"
+
+CONTEXT_ID_BIN_MAX_LENGTH = 16
 
 
 class Events(Base):  # type: ignore
@@ -56,37 +88,85 @@ class Events(Base):  # type: ignore
     context_id = Column(String(36), index=True)
     context_user_id = Column(String(36), index=True)
     context_parent_id = Column(String(36), index=True)
+    data_id = Column(Integer, ForeignKey("event_data.data_id"), index=True)
+    context_id_bin = Column(LargeBinary(CONTEXT_ID_BIN_MAX_LENGTH))
+    context_user_id_bin = Column(LargeBinary(CONTEXT_ID_BIN_MAX_LENGTH))
+    context_parent_id_bin = Column(LargeBinary(CONTEXT_ID_BIN_MAX_LENGTH))
+    event_data_rel = relationship("EventData", lazy="joined")
 
     __table_args__ = (
         # Used for fetching events at a specific time
         # see logbook
         Index("ix_events_event_type_time_fired", "event_type", "time_fired"),
+        Index(
+            "ix_events_context_id_bin",
+            "context_id_bin",
+            mysql_length=CONTEXT_ID_BIN_MAX_LENGTH,
+        ),
     )
 
     @staticmethod
-    def from_event(event, event_data=None):
-        """Create an event database object from a native event."""
-        return Events(
-            event_type=event.event_type,
-            event_data=event_data or json.dumps(event.data, cls=JSONEncoder),
-            origin=str(event.origin.value),
-            time_fired=event.time_fired,
-            context_id=event.context.id,
-            context_user_id=event.context.user_id,
-            context_parent_id=event.context.parent_id,
+    def from_event(event):
+        """Create an event database object from a native event.
+
+        The event data is stored in the event_data table and
+        linked by the recorder via data_id.
+        """
+        return Events(**Events.row_from_event(event))
+
+    @staticmethod
+    def row_from_event(event):
+        """Create the column values of an event row from a native event.
+
+        The recorder bulk inserts these rows so every column
+        that it writes must be present.
+        """
+        context_id, context_id_bin = context_id_to_db(event.context.id)
+        context_user_id, context_user_id_bin = context_id_to_db(event.context.user_id)
+        context_parent_id, context_parent_id_bin = context_id_to_db(
+            event.context.parent_id
         )
+        return {
+            "event_type": event.event_type,
+            "event_data": None,
+            "origin": str(event.origin.value),
+            "time_fired": event.time_fired,
+            "created": event.time_fired,
+            "context_id": context_id,
+            "context_user_id": context_user_id,
+            "context_parent_id": context_parent_id,
+            "context_id_bin": context_id_bin,
+            "context_user_id_bin": context_user_id_bin,
+            "context_parent_id_bin": context_parent_id_bin,
+            "data_id": None,
+        }
+
+    @property
+    def shared_data(self):
+        """Return the data json for the event.
+
+        Events written before schema version 13 keep their data
+        inline, newer events reference the event_data table.
+        """
+        if self.event_data is not None:
+            return self.event_data
+        if self.event_data_rel is not None:
+            return self.event_data_rel.shared_data
+        return EMPTY_JSON_OBJECT
 
     def to_native(self, validate_entity_id=True):
         """Convert to a natve HA Event."""
         context = Context(
-            id=self.context_id,
-            user_id=self.context_user_id,
-            parent_id=self.context_parent_id,
+            id=context_id_from_db(self.context_id, self.context_id_bin),
+            user_id=context_id_from_db(self.context_user_id, self.context_user_id_bin),
+            parent_id=context_id_from_db(
+                self.context_parent_id, self.context_parent_id_bin
+            ),
         )
         try:
             return Event(
                 self.event_type,
-                json.loads(self.event_data),
+                json.loads(self.shared_data),
                 EventOrigin(self.origin),
                 process_timestamp(self.time_fired),
                 context=context,
@@ -97,6 +177,58 @@ class Events(Base):  # type: ignore
             return None
 
 
+class EventData(Base):  # type: ignore
+    """Event data shared between events with the same data."""
+
+    __table_args__ = {
+        "mysql_default_charset": "utf8mb4",
+        "mysql_collate": "utf8mb4_unicode_ci",
+    }
+    __tablename__ = TABLE_EVENT_DATA
+    data_id = Column(Integer, primary_key=True)
+    hash = Column(BigInteger, index=True)
+    shared_data = Column(Text)
+
+    @staticmethod
+    def from_event(event):
+        """Create object from an event."""
+        shared_data = EventData.shared_data_from_event(event)
+        return EventData(
+            hash=EventData.hash_shared_data(shared_data), shared_data=shared_data
+        )
+
+    @staticmethod
+    def shared_data_from_event(event):
+        """Create the shared data json from an event."""
+        return json.dumps(event.data, cls=JSONEncoder)
+
+    @staticmethod
+    def hash_shared_data(shared_data):
+        """Return the hash of the shared data json.
+
+        The hash is only used to narrow down the lookup, rows are
+        always matched on shared_data as well.
+        """
+        return zlib.crc32(shared_data.encode("utf-8"))
+
+    @staticmethod
+    def row_from_shared_data(shared_data):
+        """Create the column values of an event data row."""
+        return {
+            "hash": EventData.hash_shared_data(shared_data),
+            "shared_data": shared_data,
+        }
+
+    def to_native(self, validate_entity_id=True):
+        """Convert to the event data dict."""
+        try:
+            return json.loads(self.shared_data)
+        except ValueError:
+            # When json.loads fails
+            _LOGGER.exception("Error converting row to event data: %s", self)
+            return {}
+
+
 class States(Base):  # type: ignore
     """State change history."""
 
@@ -119,8 +251,12 @@ class States(Base):  # type: ignore
     old_state_id = Column(
         Integer, ForeignKey("states.state_id", ondelete="SET NULL"), index=True
     )
+    attributes_id = Column(
+        Integer, ForeignKey("state_attributes.attributes_id"), index=True
+    )
     event = relationship("Events", uselist=False)
     old_state = relationship("States", remote_side=[state_id])
+    state_attributes = relationship("StateAttributes", lazy="joined")
 
     __table_args__ = (
         # Used for fetching the state of entities at a specific time
@@ -131,26 +267,55 @@ class States(Base):  # type: ignore
     @staticmethod
     def from_event(event):
         """Create object from a state_changed event."""
+        return States(**States.row_from_event(event))
+
+    @staticmethod
+    def row_from_event(event):
+        """Create the column values of a state row from a state_changed event.
+
+        The recorder bulk inserts these rows so every column
+        that it writes must be present.
+        """
         entity_id = event.data["entity_id"]
         state = event.data.get("new_state")
 
-        dbstate = States(entity_id=entity_id)
+        row = {
+            "entity_id": entity_id,
+            # The attributes are stored in the state_attributes
+            # table and linked by the recorder via attributes_id
+            "attributes": None,
+            "event_id": None,
+            "created": event.time_fired,
+            "old_state_id": None,
+            "attributes_id": None,
+        }
 
         # State got deleted
         if state is None:
-            dbstate.state = ""
-            dbstate.domain = split_entity_id(entity_id)[0]
-            dbstate.attributes = "{}"
-            dbstate.last_changed = event.time_fired
-            dbstate.last_updated = event.time_fired
+            row["state"] = ""
+            row["domain"] = split_entity_id(entity_id)[0]
+            row["last_changed"] = event.time_fired
+            row["last_updated"] = event.time_fired
         else:
-            dbstate.domain = state.domain
-            dbstate.state = state.state
-            dbstate.attributes = json.dumps(dict(state.attributes), cls=JSONEncoder)
-            dbstate.last_changed = state.last_changed
-            dbstate.last_updated = state.last_updated
+            row["domain"] = state.domain
+            row["state"] = state.state
+            row["last_changed"] = state.last_changed
+            row["last_updated"] = state.last_updated
+
+        return row
 
-        return dbstate
+    @property
+    def shared_attrs(self):
+        """Return the attributes json for the state.
+
+        States written before schema version 12 keep their attributes
+        inline, newer states reference the state_attributes table.
+        """
+        if self.attributes is not None:
+            return self.attributes
+        if self.state_attributes is not None:
+            return self.state_attributes.shared_attrs
+        return EMPTY_JSON_OBJECT
 
     def to_native(self, validate_entity_id=True):
         """Convert to an HA state object."""
@@ -158,7 +323,7 @@ class States(Base):  # type: ignore
             return State(
                 self.entity_id,
                 self.state,
-                json.loads(self.attributes),
+                json.loads(self.shared_attrs),
                 process_timestamp(self.last_changed),
                 process_timestamp(self.last_updated),
                 # Join the events table on event_id to get the context instead
@@ -172,6 +337,63 @@ class States(Base):  # type: ignore
             return None
 
 
+class StateAttributes(Base):  # type: ignore
+    """State attributes shared between states with the same attributes."""
+
+    __table_args__ = {
+        "mysql_default_charset": "utf8mb4",
+        "mysql_collate": "utf8mb4_unicode_ci",
+    }
+    __tablename__ = TABLE_STATE_ATTRIBUTES
+    attributes_id = Column(Integer, primary_key=True)
+    hash = Column(BigInteger, index=True)
+    shared_attrs = Column(Text)
+
+    @staticmethod
+    def from_event(event):
+        """Create object from a state_changed event."""
+        shared_attrs = StateAttributes.shared_attrs_from_event(event)
+        return StateAttributes(
+            hash=StateAttributes.hash_shared_attrs(shared_attrs),
+            shared_attrs=shared_attrs,
+        )
+
+    @staticmethod
+    def shared_attrs_from_event(event):
+        """Create the shared attributes json from a state_changed event."""
+        state = event.data.get("new_state")
+        # State got deleted
+        if state is None:
+            return EMPTY_JSON_OBJECT
+        return json.dumps(dict(state.attributes), cls=JSONEncoder)
+
+    @staticmethod
+    def hash_shared_attrs(shared_attrs):
+        """Return the hash of the shared attributes json.
+
+        The hash is only used to narrow down the lookup, rows are
+        always matched on shared_attrs as well.
+        """
+        return zlib.crc32(shared_attrs.encode("utf-8"))
+
+    @staticmethod
+    def row_from_shared_attrs(shared_attrs):
+        """Create the column values of a state attributes row."""
+        return {
+            "hash": StateAttributes.hash_shared_attrs(shared_attrs),
+            "shared_attrs": shared_attrs,
+        }
+
+    def to_native(self, validate_entity_id=True):
+        """Convert to the attributes dict."""
+        try:
+            return json.loads(self.shared_attrs)
+        except ValueError:
+            # When json.loads fails
+            _LOGGER.exception("Error converting row to state attributes: %s", self)
+            return {}
+
+
 class RecorderRuns(Base):  # type: ignore
     """Representation of recorder run."""
 
@@ -219,6 +441,94 @@ class SchemaChanges(Base):  # type: ignore
     changed = Column(DateTime(timezone=True), default=dt_util.utcnow)
 
 
+class StatisticsMeta(Base):  # type: ignore
+    """Metadata of a long-term statistic."""
+
+    __table_args__ = {
+        "mysql_default_charset": "utf8mb4",
+        "mysql_collate": "utf8mb4_unicode_ci",
+    }
+    __tablename__ = TABLE_STATISTICS_META
+    id = Column(Integer, primary_key=True)
+    statistic_id = Column(String(255), index=True, unique=True)
+    source = Column(String(32))
+    unit_of_measurement = Column(String(255))
+    has_sum = Column(Boolean)
+
+
+class StatisticsBase:
+    """Columns shared by the short-term and long-term statistics tables."""
+
+    id = Column(Integer, primary_key=True)
+    created = Column(DateTime(timezone=True), default=dt_util.utcnow)
+
+    @declared_attr
+    def metadata_id(self):
+        """Reference the metadata of the statistic."""
+        return Column(
+            Integer,
+            ForeignKey(f"{TABLE_STATISTICS_META}.id", ondelete="CASCADE"),
+            index=True,
+        )
+
+    start = Column(DateTime(timezone=True), index=True)
+    mean = Column(Float)
+    min = Column(Float)
+    max = Column(Float)
+    state = Column(Float)
+    sum = Column(Float)
+
+    def to_native(self, validate_entity_id=True):
+        """Return self, native format is this model."""
+        return self
+
+
+class Statistics(Base, StatisticsBase):  # type: ignore
+    """Long-term statistics, one row per statistic and hour."""
+
+    __tablename__ = TABLE_STATISTICS
+    __table_args__ = (
+        Index("ix_statistics_statistic_id_start", "metadata_id", "start"),
+    )
+
+
+class StatisticsShortTerm(Base, StatisticsBase):  # type: ignore
+    """Short-term statistics, one row per statistic and 5 minutes."""
+
+    __tablename__ = TABLE_STATISTICS_SHORT_TERM
+    __table_args__ = (
+        Index(
+            "ix_statistics_short_term_statistic_id_start", "metadata_id", "start"
+        ),
+    )
+
+
+def context_id_to_db(context_id):
+    """Split a context id into the string and binary columns to store it in.
+
+    Context ids generated by Home Assistant are uuid hex strings and are
+    stored as 16 bytes. Anything that does not round trip is kept as is.
+    """
+    if context_id is None:
+        return None, None
+    if len(context_id) == 2 * CONTEXT_ID_BIN_MAX_LENGTH:
+        try:
+            context_id_bin = bytes.fromhex(context_id)
+        except ValueError:
+            pass
+        else:
+            if context_id_bin.hex() == context_id:
+                return None, context_id_bin
+    return context_id, None
+
+
+def context_id_from_db(context_id, context_id_bin):
+    """Return the context id from the string or binary column."""
+    if context_id_bin is not None:
+        return context_id_bin.hex()
+    return context_id
+
+
 def process_timestamp(ts):
     """Process a timestamp into datetime object."""
     if ts is None:
@@ -238,3 +548,12 @@ def process_timestamp_to_utc_isoformat(ts):
     if ts.tzinfo is None:
         return f"{ts.isoformat()}{DB_TIMEZONE}"
     return ts.astimezone(dt_util.UTC).isoformat()
+
+
+def process_timestamp_to_utc_timestamp(ts):
+    """Process a timestamp into a UTC epoch timestamp."""
+    if ts is None:
+        return None
+    if ts.tzinfo is None:
+        return ts.replace(tzinfo=dt_util.UTC).timestamp()
+    return ts.timestamp()
@@ -3,65 +3,66 @@ from datetime import timedelta
 import logging
 import time
 
+from sqlalchemy import exists
 from sqlalchemy.exc import OperationalError, SQLAlchemyError
 
 import homeassistant.util.dt as dt_util
 
-from .models import Events, RecorderRuns, States
-from .util import execute, session_scope
+from .models import (
+    EventData,
+    Events,
+    RecorderRuns,
+    StateAttributes,
+    States,
+    StatisticsShortTerm,
+)
+from .util import session_scope
 
 _LOGGER = logging.getLogger(__name__)
 
+# The maximum number of states and of events deleted per batch,
+# below the limit of 999 bind variables of older SQLite versions
+MAX_ROWS_TO_PURGE = 998
+
 
 def purge_old_data(instance, purge_days: int, repack: bool) -> bool:
     """Purge events and states older than purge_days ago.
 
-    Cleans up an timeframe of an hour, based on the oldest record.
+    Deletes at most MAX_ROWS_TO_PURGE states and events per call so the
+    recorder can process its queue between batches. Returns False when
+    the purge has not completed yet and should be called again.
     """
     purge_before = dt_util.utcnow() - timedelta(days=purge_days)
     _LOGGER.debug("Purging states and events before target %s", purge_before)
 
+    if instance.purge_started is None:
+        instance.purge_started = time.monotonic()
+        instance.purged_rows = 0
+
     try:
         with session_scope(session=instance.get_session()) as session:
-            # Purge a max of 1 hour, based on the oldest states or events record
-            batch_purge_before = purge_before
-
-            query = session.query(States).order_by(States.last_updated.asc()).limit(1)
-            states = execute(query, to_native=True, validate_entity_ids=False)
-            if states:
-                batch_purge_before = min(
-                    batch_purge_before,
-                    states[0].last_updated + timedelta(hours=1),
-                )
-
-            query = session.query(Events).order_by(Events.time_fired.asc()).limit(1)
-            events = execute(query, to_native=True)
-            if events:
-                batch_purge_before = min(
-                    batch_purge_before,
-                    events[0].time_fired + timedelta(hours=1),
-                )
-
-            _LOGGER.debug("Purging states and events before %s", batch_purge_before)
-
-            deleted_rows = (
-                session.query(States)
-                .filter(States.last_updated < batch_purge_before)
-                .delete(synchronize_session=False)
+            state_ids, events_purge_before = _select_state_ids_to_purge(
+                session, purge_before
             )
-            _LOGGER.debug("Deleted %s states", deleted_rows)
+            if state_ids:
+                _purge_state_ids(instance, session, state_ids)
 
-            deleted_rows = (
-                session.query(Events)
-                .filter(Events.time_fired < batch_purge_before)
-                .delete(synchronize_session=False)
-            )
-            _LOGGER.debug("Deleted %s events", deleted_rows)
+            # The events are purged up to the same time as the states so
+            # no state that is kept references a purged event
+            event_ids = _select_event_ids_to_purge(session, events_purge_before)
+            if event_ids:
+                _purge_event_ids(session, event_ids)
+
+            instance.purged_rows += len(state_ids) + len(event_ids)
 
-            # If states or events purging isn't processing the purge_before yet,
+            # If there may be more states or events to purge,
             # return false, as we are not done yet.
-            if batch_purge_before != purge_before:
+            if (
+                len(state_ids) == MAX_ROWS_TO_PURGE
+                or len(event_ids) == MAX_ROWS_TO_PURGE
+            ):
                 _LOGGER.debug("Purging hasn't fully completed yet")
+                _log_purge_progress(instance, logging.DEBUG, "Purge in progress")
                 return False
 
             # Recorder runs is small, no need to batch run it
@@ -73,6 +74,41 @@ def purge_old_data(instance, purge_days: int, repack: bool) -> bool:
             )
             _LOGGER.debug("Deleted %s recorder_runs", deleted_rows)
 
+            # Only the short-term statistics are purged, the
+            # hourly statistics are kept beyond the purge window
+            deleted_rows = (
+                session.query(StatisticsShortTerm)
+                .filter(StatisticsShortTerm.start < purge_before)
+                .delete(synchronize_session=False)
+            )
+            _LOGGER.debug("Deleted %s statistics_short_term", deleted_rows)
+
+            # Shared attributes can only be removed once
+            # no state references them anymore
+            deleted_rows = (
+                session.query(StateAttributes)
+                .filter(
+                    ~exists().where(
+                        States.attributes_id == StateAttributes.attributes_id
+                    )
+                )
+                .delete(synchronize_session=False)
+            )
+            _LOGGER.debug("Deleted %s state_attributes", deleted_rows)
+            if deleted_rows:
+                # pylint: disable=protected-access
+                instance._state_attributes_ids.clear()
+
+            deleted_rows = (
+                session.query(EventData)
+                .filter(~exists().where(Events.data_id == EventData.data_id))
+                .delete(synchronize_session=False)
+            )
+            _LOGGER.debug("Deleted %s event_data", deleted_rows)
+            if deleted_rows:
+                # pylint: disable=protected-access
+                instance._event_data_ids.clear()
+
         if repack:
             # Execute sqlite or postgresql vacuum command to free up space on disk
             if instance.engine.driver in ("pysqlite", "postgresql"):
@@ -81,7 +117,13 @@ def purge_old_data(instance, purge_days: int, repack: bool) -> bool:
             # Optimize mysql / mariadb tables to free up space on disk
             elif instance.engine.driver in ("mysqldb", "pymysql"):
                 _LOGGER.debug("Optimizing SQL DB to free space")
-                instance.engine.execute("OPTIMIZE TABLE states, events, recorder_runs")
+                instance.engine.execute(
+                    "OPTIMIZE TABLE states, state_attributes, events, event_data, "
+                    "recorder_runs, statistics_short_term"
+                )
+
+        if instance.purged_rows:
+            _log_purge_progress(instance, logging.INFO, "Purge completed")
 
     except OperationalError as err:
         # Retry when one of the following MySQL errors occurred:
@@ -100,4 +142,77 @@ def purge_old_data(instance, purge_days: int, repack: bool) -> bool:
         _LOGGER.warning("Error purging history: %s", err)
     except SQLAlchemyError as err:
         _LOGGER.warning("Error purging history: %s", err)
+
+    instance.purge_started = None
     return True
+
+
+def _select_state_ids_to_purge(session, purge_before):
+    """Return the ids of the oldest states to purge and the time they reach.
+
+    When more states are left to purge, the time is the last_updated of the
+    last state of the batch, otherwise it is purge_before.
+    """
+    rows = (
+        session.query(States.state_id, States.last_updated)
+        .filter(States.last_updated < purge_before)
+        .order_by(States.last_updated)
+        .limit(MAX_ROWS_TO_PURGE)
+        .all()
+    )
+    state_ids = [state_id for state_id, _ in rows]
+    if len(rows) < MAX_ROWS_TO_PURGE:
+        return state_ids, purge_before
+    return state_ids, rows[-1].last_updated
+
+
+def _select_event_ids_to_purge(session, purge_before):
+    """Return the ids of the oldest events to purge."""
+    return [
+        event_id
+        for event_id, in session.query(Events.event_id)
+        .filter(Events.time_fired < purge_before)
+        .order_by(Events.time_fired)
+        .limit(MAX_ROWS_TO_PURGE)
+    ]
+
+
+def _purge_state_ids(instance, session, state_ids):
+    """Delete states by id."""
+    deleted_rows = (
+        session.query(States)
+        .filter(States.state_id.in_(state_ids))
+        .delete(synchronize_session=False)
+    )
+    _LOGGER.debug("Deleted %s states", deleted_rows)
+
+    # The next state of an entity must not link to a purged state
+    purged_state_ids = set(state_ids)
+    # pylint: disable=protected-access
+    old_state_ids = instance._old_state_ids
+    for entity_id, state_id in list(old_state_ids.items()):
+        if state_id in purged_state_ids:
+            del old_state_ids[entity_id]
+
+
+def _purge_event_ids(session, event_ids):
+    """Delete events by id."""
+    deleted_rows = (
+        session.query(Events)
+        .filter(Events.event_id.in_(event_ids))
+        .delete(synchronize_session=False)
+    )
+    _LOGGER.debug("Deleted %s events", deleted_rows)
+
+
+def _log_purge_progress(instance, level, status):
+    """Log how many rows were purged and how fast."""
+    elapsed = time.monotonic() - instance.purge_started
+    _LOGGER.log(
+        level,
+        "%s: deleted %s states and events in %.1fs (%.0f rows/s)",
+        status,
+        instance.purged_rows,
+        elapsed,
+        instance.purged_rows / elapsed if elapsed else 0,
+    )
@@ -0,0 +1,74 @@
+"""Sensors reporting the load of the recorder."""
+from homeassistant.const import TIME_MILLISECONDS
+from homeassistant.helpers.entity import Entity
+
+from .const import DATA_INSTANCE
+
+ICON = "mdi:database"
+
+
+async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
+    """Set up the recorder sensor platform."""
+    instance = hass.data[DATA_INSTANCE]
+
+    async_add_entities(
+        [RecorderQueueDepthSensor(instance), RecorderBatchLatencySensor(instance)],
+        True,
+    )
+
+
+class RecorderSensor(Entity):
+    """Base class for sensors reporting on the recorder."""
+
+    def __init__(self, instance):
+        """Initialize the recorder sensor."""
+        self._instance = instance
+        self._state = None
+
+    @property
+    def icon(self):
+        """Return the icon of the sensor."""
+        return ICON
+
+    @property
+    def state(self):
+        """Return the state of the sensor."""
+        return self._state
+
+
+class RecorderQueueDepthSensor(RecorderSensor):
+    """Number of events waiting to be written by the recorder."""
+
+    @property
+    def name(self):
+        """Return the name of the sensor."""
+        return "Recorder queue depth"
+
+    @property
+    def unit_of_measurement(self):
+        """Return the unit of measurement."""
+        return "events"
+
+    def update(self):
+        """Read the queue size of the recorder."""
+        self._state = self._instance.queue.qsize()
+
+
+class RecorderBatchLatencySensor(RecorderSensor):
+    """Time the recorder took to write its last batch."""
+
+    @property
+    def name(self):
+        """Return the name of the sensor."""
+        return "Recorder batch latency"
+
+    @property
+    def unit_of_measurement(self):
+        """Return the unit of measurement."""
+        return TIME_MILLISECONDS
+
+    def update(self):
+        """Read the latency of the last batch written by the recorder."""
+        batch_latency = self._instance.batch_latency
+        if batch_latency is not None:
+            self._state = round(batch_latency * 1000, 1)
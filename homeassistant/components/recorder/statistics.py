@@ -0,0 +1,320 @@
+"""Long-term statistics compiled from the recorded states."""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from itertools import groupby
+import json
+import logging
+import math
+from typing import Dict, List, Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from homeassistant.const import (
+    ATTR_DEVICE_CLASS,
+    ATTR_UNIT_OF_MEASUREMENT,
+    DEVICE_CLASS_ENERGY,
+)
+import homeassistant.util.dt as dt_util
+
+from .models import (
+    EMPTY_JSON_OBJECT,
+    StateAttributes,
+    States,
+    Statistics,
+    StatisticsMeta,
+    StatisticsShortTerm,
+    process_timestamp,
+)
+from .util import execute, session_scope
+
+_LOGGER = logging.getLogger(__name__)
+
+STATISTICS_DOMAIN = "sensor"
+STATISTICS_SOURCE = "recorder"
+
+# Counters such as energy meters also keep
+# track of how much they increased
+SUM_DEVICE_CLASSES = {DEVICE_CLASS_ENERGY}
+
+PERIOD_5MINUTE = "5minute"
+PERIOD_HOUR = "hour"
+
+SHORT_TERM_PERIOD = timedelta(minutes=5)
+LONG_TERM_PERIOD = timedelta(hours=1)
+
+PERIOD_TABLES = {PERIOD_5MINUTE: StatisticsShortTerm, PERIOD_HOUR: Statistics}
+
+
+def get_start_time(now: datetime) -> datetime:
+    """Return the start of the last short-term period that ended before now."""
+    now = dt_util.as_utc(now)
+    period_end = now.replace(
+        minute=now.minute - now.minute % 5, second=0, microsecond=0
+    )
+    return period_end - SHORT_TERM_PERIOD
+
+
+def compile_statistics(instance, start: datetime) -> None:
+    """Compile the short-term statistics of the period starting at start.
+
+    The long-term statistics of the hour are compiled from the short-term
+    statistics once the period completes that hour.
+    """
+    end = start + SHORT_TERM_PERIOD
+    _LOGGER.debug("Compiling statistics for %s-%s", start, end)
+
+    try:
+        with session_scope(session=instance.get_session()) as session:
+            if _is_compiled(session, StatisticsShortTerm, start):
+                _LOGGER.debug("Statistics already compiled for %s", start)
+            else:
+                _compile_short_term_statistics(instance.hass, session, start, end)
+
+            if end.minute == 0 and not _is_compiled(
+                session, Statistics, end - LONG_TERM_PERIOD
+            ):
+                session.flush()
+                _compile_long_term_statistics(session, end - LONG_TERM_PERIOD)
+    except SQLAlchemyError as err:
+        _LOGGER.warning("Error compiling statistics: %s", err)
+
+
+def _is_compiled(session, table, start):
+    """Return if the statistics of the period starting at start exist."""
+    return session.query(table.id).filter(table.start == start).first() is not None
+
+
+def _compile_short_term_statistics(hass, session, start, end):
+    """Compile the statistics of all numeric sensors into 5-minute rows."""
+    metadata = {meta.statistic_id: meta for meta in session.query(StatisticsMeta)}
+    statistic_ids = {meta.id: statistic_id for statistic_id, meta in metadata.items()}
+
+    # The state at the end of the previous period holds until the first change
+    previous_states = {
+        statistic_ids[metadata_id]: state
+        for metadata_id, state in session.query(
+            StatisticsShortTerm.metadata_id, StatisticsShortTerm.state
+        ).filter(StatisticsShortTerm.start == start - SHORT_TERM_PERIOD)
+    }
+
+    query = (
+        session.query(
+            States.entity_id,
+            States.state,
+            States.last_updated,
+            States.attributes,
+            StateAttributes.shared_attrs,
+        )
+        .outerjoin(
+            StateAttributes, (States.attributes_id == StateAttributes.attributes_id)
+        )
+        .filter(States.domain == STATISTICS_DOMAIN)
+        .filter(States.last_updated >= start)
+        .filter(States.last_updated < end)
+        .order_by(States.entity_id, States.last_updated)
+    )
+
+    attributes_cache = {}
+    changed_statistic_ids = set()
+    for entity_id, rows in groupby(execute(query), lambda row: row.entity_id):
+        changed_statistic_ids.add(entity_id)
+        samples = []
+        attributes = None
+        for row in rows:
+            try:
+                value = float(row.state)
+            except (TypeError, ValueError):
+                continue
+            if not math.isfinite(value):
+                continue
+            samples.append((process_timestamp(row.last_updated), value))
+
+            shared_attrs = row.shared_attrs or row.attributes or EMPTY_JSON_OBJECT
+            attributes = attributes_cache.get(shared_attrs)
+            if attributes is None:
+                try:
+                    attributes = json.loads(shared_attrs)
+                except ValueError:
+                    _LOGGER.warning("Invalid attributes of %s", entity_id)
+                    attributes = {}
+                attributes_cache[shared_attrs] = attributes
+
+        unit = attributes.get(ATTR_UNIT_OF_MEASUREMENT) if attributes else None
+        if not samples or unit is None:
+            continue
+
+        meta = _update_or_add_metadata(
+            session,
+            metadata,
+            entity_id,
+            unit,
+            attributes.get(ATTR_DEVICE_CLASS) in SUM_DEVICE_CLASSES,
+        )
+        session.add(
+            _short_term_statistics(
+                meta, start, end, previous_states.get(entity_id), samples
+            )
+        )
+
+    # Statistics that did not change keep their state through the period
+    for statistic_id, state in previous_states.items():
+        if statistic_id in changed_statistic_ids or state is None:
+            continue
+        if hass.states.get(statistic_id) is None:
+            continue
+        meta = metadata[statistic_id]
+        session.add(
+            StatisticsShortTerm(
+                metadata_id=meta.id,
+                start=start,
+                mean=state,
+                min=state,
+                max=state,
+                state=state,
+                sum=0.0 if meta.has_sum else None,
+            )
+        )
+
+
+def _update_or_add_metadata(session, metadata, statistic_id, unit, has_sum):
+    """Return the metadata of a statistic, adding or updating it as needed."""
+    meta = metadata.get(statistic_id)
+    if meta is None:
+        meta = metadata[statistic_id] = StatisticsMeta(
+            statistic_id=statistic_id,
+            source=STATISTICS_SOURCE,
+            unit_of_measurement=unit,
+            has_sum=has_sum,
+        )
+        session.add(meta)
+        session.flush()
+    elif meta.unit_of_measurement != unit or meta.has_sum != has_sum:
+        meta.unit_of_measurement = unit
+        meta.has_sum = has_sum
+    return meta
+
+
+def _short_term_statistics(meta, start, end, previous_state, samples):
+    """Create the statistics of one period from the samples recorded in it.
+
+    The mean is weighted by how long each value was held.
+    """
+    points = samples
+    if previous_state is not None:
+        points = [(start, previous_state), *samples]
+
+    weighted_sum = 0.0
+    duration = 0.0
+    for (point_time, value), (next_time, _) in zip(points, [*points[1:], (end, None)]):
+        held = (next_time - point_time).total_seconds()
+        weighted_sum += value * held
+        duration += held
+    values = [value for _, value in points]
+
+    return StatisticsShortTerm(
+        metadata_id=meta.id,
+        start=start,
+        mean=weighted_sum / duration if duration else values[-1],
+        min=min(values),
+        max=max(values),
+        state=values[-1],
+        sum=_increase(values) if meta.has_sum else None,
+    )
+
+
+def _increase(values):
+    """Return how much a counter increased, treating a decrease as a reset."""
+    increase = 0.0
+    for last_value, value in zip(values, values[1:]):
+        if value >= last_value:
+            increase += value - last_value
+        else:
+            # The counter was reset to zero
+            increase += value
+    return increase
+
+
+def _compile_long_term_statistics(session, start):
+    """Compile the hourly statistics from the short-term statistics of the hour."""
+    query = (
+        session.query(StatisticsShortTerm)
+        .filter(StatisticsShortTerm.start >= start)
+        .filter(StatisticsShortTerm.start < start + LONG_TERM_PERIOD)
+        .order_by(StatisticsShortTerm.metadata_id, StatisticsShortTerm.start)
+    )
+    for metadata_id, rows in groupby(execute(query), lambda row: row.metadata_id):
+        rows = list(rows)
+        sums = [row.sum for row in rows if row.sum is not None]
+        session.add(
+            Statistics(
+                metadata_id=metadata_id,
+                start=start,
+                # All short-term periods have the same length
+                mean=sum(row.mean for row in rows) / len(rows),
+                min=min(row.min for row in rows),
+                max=max(row.max for row in rows),
+                state=rows[-1].state,
+                sum=sum(sums) if sums else None,
+            )
+        )
+
+
+def statistics_during_period(
+    hass,
+    start_time: datetime,
+    end_time: Optional[datetime] = None,
+    statistic_ids: Optional[List[str]] = None,
+    period: str = PERIOD_HOUR,
+) -> Dict[str, List[dict]]:
+    """Return the statistics of the periods starting between start and end time."""
+    table = PERIOD_TABLES[period]
+
+    with session_scope(hass=hass, read_only=True) as session:
+        query = (
+            session.query(
+                StatisticsMeta.statistic_id,
+                table.start,
+                table.mean,
+                table.min,
+                table.max,
+                table.state,
+                table.sum,
+            )
+            .join(StatisticsMeta, (table.metadata_id == StatisticsMeta.id))
+            .filter(table.start >= start_time)
+        )
+        if end_time is not None:
+            query = query.filter(table.start < end_time)
+        if statistic_ids is not None:
+            query = query.filter(StatisticsMeta.statistic_id.in_(statistic_ids))
+        query = query.order_by(StatisticsMeta.statistic_id, table.start)
+
+        result = defaultdict(list)
+        for row in execute(query):
+            result[row.statistic_id].append(
+                {
+                    "statistic_id": row.statistic_id,
+                    "start": process_timestamp(row.start),
+                    "mean": row.mean,
+                    "min": row.min,
+                    "max": row.max,
+                    "state": row.state,
+                    "sum": row.sum,
+                }
+            )
+        return dict(result)
+
+
+def list_statistic_ids(hass) -> List[dict]:
+    """Return the ids and units of all statistics."""
+    with session_scope(hass=hass, read_only=True) as session:
+        return [
+            {
+                "statistic_id": meta.statistic_id,
+                "unit_of_measurement": meta.unit_of_measurement,
+                "has_sum": meta.has_sum,
+            }
+            for meta in execute(
+                session.query(StatisticsMeta).order_by(StatisticsMeta.statistic_id)
+            )
+        ]
@@ -1,4 +1,5 @@
 """SQLAlchemy util functions."""
+from collections import OrderedDict
 from contextlib import contextmanager
 from datetime import timedelta
 import logging
@@ -10,7 +11,7 @@ from sqlalchemy.exc import OperationalError, SQLAlchemyError
 import homeassistant.util.dt as dt_util
 
 from .const import CONF_DB_INTEGRITY_CHECK, DATA_INSTANCE, SQLITE_URL_PREFIX
-from .models import ALL_TABLES, process_timestamp
+from .models import TABLES_TO_CHECK, process_timestamp
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -24,11 +25,40 @@ SQLITE3_POSTFIXES = ["", "-wal", "-shm"]
 MAX_RESTART_TIME = timedelta(minutes=10)
 
 
+class LRUCache(OrderedDict):
+    """A dict that discards the least recently used keys when full."""
+
+    def __init__(self, max_size: int) -> None:
+        """Initialize the cache."""
+        super().__init__()
+        self.max_size = max_size
+
+    def get(self, key, default=None):
+        """Return the value for key and mark it as recently used."""
+        if key not in self:
+            return default
+        self.move_to_end(key)
+        return self[key]
+
+    def __setitem__(self, key, value):
+        """Set the value for key and discard the oldest key if full."""
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if len(self) > self.max_size:
+            self.popitem(last=False)
+
+
 @contextmanager
-def session_scope(*, hass=None, session=None):
-    """Provide a transactional scope around a series of operations."""
+def session_scope(*, hass=None, session=None, read_only=False):
+    """Provide a transactional scope around a series of operations.
+
+    With read_only, the session of hass uses the read only connection pool.
+    """
     if session is None and hass is not None:
-        session = hass.data[DATA_INSTANCE].get_session()
+        instance = hass.data[DATA_INSTANCE]
+        get_session = instance.get_read_session if read_only else instance.get_session
+        if get_session is not None:
+            session = get_session()
 
     if session is None:
         raise RuntimeError("Session required")
@@ -148,7 +178,7 @@ def last_run_was_recently_clean(cursor):
 def basic_sanity_check(cursor):
     """Check tables to make sure select does not fail."""
 
-    for table in ALL_TABLES:
+    for table in TABLES_TO_CHECK:
         cursor.execute(f"SELECT * FROM {table} LIMIT 1;")  # nosec # not injection
 
     return True
@@ -0,0 +1,200 @@
+"""Sliding window of sensor values with statistics kept up to date."""
+from array import array
+from collections import deque
+import heapq
+import math
+from typing import Deque, Dict, List, Optional
+
+
+class SlidingWindow:
+    """The last values of a sensor and their statistics.
+
+    Values are added at the end and removed from the start of a ring buffer.
+    Adding or removing a value updates the statistics in O(log n) instead of
+    computing them again from all the values. The mean and variance are kept
+    with Welford's algorithm and computed again from the values once the
+    window has been renewed, so that rounding errors do not add up.
+    """
+
+    def __init__(self, size: int) -> None:
+        """Initialize the window."""
+        self._values = array("d", bytes(8 * size))
+        self._size = size
+        self._start = 0
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._removed = 0
+        # Candidates for the minimum and the maximum, in order
+        self._minimums: Deque[float] = deque()
+        self._maximums: Deque[float] = deque()
+        self._median = SlidingMedian()
+
+    def __len__(self) -> int:
+        """Return the number of values."""
+        return self._count
+
+    def __getitem__(self, index: int) -> float:
+        """Return a value, the oldest first."""
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("window index out of range")
+        return self._values[(self._start + index) % self._size]
+
+    def append(self, value: float) -> None:
+        """Add a value, removing the oldest one if the window is full."""
+        if self._count == self._size:
+            self.popleft()
+        self._values[(self._start + self._count) % self._size] = value
+        self._count += 1
+
+        delta = value - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (value - self._mean)
+
+        while self._minimums and self._minimums[-1] > value:
+            self._minimums.pop()
+        self._minimums.append(value)
+        while self._maximums and self._maximums[-1] < value:
+            self._maximums.pop()
+        self._maximums.append(value)
+        self._median.add(value)
+
+    def popleft(self) -> float:
+        """Remove and return the oldest value."""
+        if not self._count:
+            raise IndexError("pop from an empty window")
+        value = self._values[self._start]
+        self._start = (self._start + 1) % self._size
+        self._count -= 1
+
+        if self._minimums[0] == value:
+            self._minimums.popleft()
+        if self._maximums[0] == value:
+            self._maximums.popleft()
+        self._median.remove(value)
+
+        self._removed += 1
+        if not self._count:
+            self._mean = self._m2 = 0.0
+            self._removed = 0
+        elif self._removed >= self._size:
+            self._renew()
+        else:
+            delta = value - self._mean
+            self._mean -= delta / self._count
+            self._m2 = max(0.0, self._m2 - delta * (value - self._mean))
+        return value
+
+    def _renew(self) -> None:
+        """Compute the mean and variance again from the values."""
+        values = [self[index] for index in range(self._count)]
+        self._mean = math.fsum(values) / self._count
+        self._m2 = math.fsum((value - self._mean) ** 2 for value in values)
+        self._removed = 0
+
+    @property
+    def mean(self) -> float:
+        """Return the mean of the values."""
+        return self._mean
+
+    @property
+    def total(self) -> float:
+        """Return the sum of the values."""
+        return self._mean * self._count
+
+    @property
+    def variance(self) -> Optional[float]:
+        """Return the sample variance, if there are at least two values."""
+        if self._count < 2:
+            return None
+        return self._m2 / (self._count - 1)
+
+    @property
+    def minimum(self) -> float:
+        """Return the smallest value."""
+        return self._minimums[0]
+
+    @property
+    def maximum(self) -> float:
+        """Return the largest value."""
+        return self._maximums[0]
+
+    @property
+    def median(self) -> float:
+        """Return the median of the values."""
+        return self._median.median
+
+
+class SlidingMedian:
+    """Median of values that are added and removed.
+
+    The lower half of the values is kept in a max heap and the upper half in
+    a min heap. Removed values stay in the heaps until they reach the top.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the median."""
+        # The lower half is negated to use a min heap as a max heap
+        self._low: List[float] = []
+        self._high: List[float] = []
+        self._low_count = 0
+        self._high_count = 0
+        self._removed: Dict[float, int] = {}
+
+    def add(self, value: float) -> None:
+        """Add a value."""
+        if not self._low or value <= -self._low[0]:
+            heapq.heappush(self._low, -value)
+            self._low_count += 1
+        else:
+            heapq.heappush(self._high, value)
+            self._high_count += 1
+        self._balance()
+
+    def remove(self, value: float) -> None:
+        """Remove a value that was added."""
+        self._removed[value] = self._removed.get(value, 0) + 1
+        if value <= -self._low[0]:
+            self._low_count -= 1
+            if value == -self._low[0]:
+                self._prune(self._low, -1)
+        else:
+            self._high_count -= 1
+            if value == self._high[0]:
+                self._prune(self._high, 1)
+        self._balance()
+
+    @property
+    def median(self) -> float:
+        """Return the median of the values."""
+        if self._low_count > self._high_count:
+            return -self._low[0]
+        return (-self._low[0] + self._high[0]) / 2
+
+    def _balance(self) -> None:
+        """Keep the lower half as large as the upper half or one larger."""
+        if self._low_count > self._high_count + 1:
+            heapq.heappush(self._high, -heapq.heappop(self._low))
+            self._low_count -= 1
+            self._high_count += 1
+            self._prune(self._low, -1)
+        elif self._low_count < self._high_count:
+            heapq.heappush(self._low, -heapq.heappop(self._high))
+            self._high_count -= 1
+            self._low_count += 1
+            self._prune(self._high, 1)
+
+    def _prune(self, heap: List[float], sign: int) -> None:
+        """Drop the removed values from the top of a heap."""
+        while heap:
+            value = sign * heap[0]
+            removed = self._removed.get(value)
+            if not removed:
+                return
+            if removed == 1:
+                del self._removed[value]
+            else:
+                self._removed[value] = removed - 1
+            heapq.heappop(heap)
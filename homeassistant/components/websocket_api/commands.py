@@ -14,7 +14,11 @@ from homeassistant.exceptions import (
     Unauthorized,
 )
 from homeassistant.helpers import config_validation as cv, entity
-from homeassistant.helpers.event import TrackTemplate, async_track_template_result
+from homeassistant.helpers.event import (
+    TrackTemplate,
+    async_track_matching_state_change_event,
+    async_track_template_result,
+)
 from homeassistant.helpers.service import async_get_all_descriptions
 from homeassistant.helpers.template import Template
 from homeassistant.loader import IntegrationNotFound, async_get_integration
@@ -23,12 +27,19 @@ from . import const, decorators, messages
 
 # mypy: allow-untyped-calls, allow-untyped-defs
 
+_ENTITY_FILTER = {
+    vol.Optional("entity_ids"): cv.entity_ids,
+    vol.Optional("domains"): vol.All(cv.ensure_list, [cv.string]),
+    vol.Optional("entity_globs"): vol.All(cv.ensure_list, [cv.string]),
+}
+
 
 @callback
 def async_register_commands(hass, async_reg):
     """Register commands."""
     async_reg(hass, handle_subscribe_events)
     async_reg(hass, handle_unsubscribe_events)
+    async_reg(hass, handle_subscribe_entities)
     async_reg(hass, handle_call_service)
     async_reg(hass, handle_get_states)
     async_reg(hass, handle_get_services)
@@ -37,6 +48,7 @@ def async_register_commands(hass, async_reg):
     async_reg(hass, handle_render_template)
     async_reg(hass, handle_manifest_list)
     async_reg(hass, handle_manifest_get)
+    async_reg(hass, handle_supported_features)
     async_reg(hass, handle_entity_source)
     async_reg(hass, handle_subscribe_trigger)
     async_reg(hass, handle_test_condition)
@@ -52,10 +64,14 @@ def pong_message(iden):
     {
         vol.Required("type"): "subscribe_events",
         vol.Optional("event_type", default=MATCH_ALL): str,
+        **_ENTITY_FILTER,
     }
 )
 def handle_subscribe_events(hass, connection, msg):
-    """Handle subscribe events command."""
+    """Handle subscribe events command.
+
+    The state_changed events can be limited to entity ids, domains or globs.
+    """
     # Circular dep
     # pylint: disable=import-outside-toplevel
     from .permissions import SUBSCRIBE_ALLOWLIST
@@ -65,6 +81,14 @@ def handle_subscribe_events(hass, connection, msg):
     if event_type not in SUBSCRIBE_ALLOWLIST and not connection.user.is_admin:
         raise Unauthorized
 
+    if event_type != EVENT_STATE_CHANGED and _has_entity_filter(msg):
+        connection.send_error(
+            msg["id"],
+            const.ERR_INVALID_FORMAT,
+            "Entities can only be filtered for state_changed events.",
+        )
+        return
+
     if event_type == EVENT_STATE_CHANGED:
 
         @callback
@@ -75,7 +99,11 @@ def handle_subscribe_events(hass, connection, msg):
             ):
                 return
 
-            connection.send_message(messages.cached_event_message(msg["id"], event))
+            # A client that is behind only needs the latest state of an entity
+            connection.send_message(
+                messages.cached_event_message(msg["id"], event),
+                supersede_key=(msg["id"], event.data["entity_id"]),
+            )
 
     else:
 
@@ -87,13 +115,39 @@ def handle_subscribe_events(hass, connection, msg):
 
             connection.send_message(messages.cached_event_message(msg["id"], event))
 
-    connection.subscriptions[msg["id"]] = hass.bus.async_listen(
-        event_type, forward_events
-    )
+    if _has_entity_filter(msg):
+        connection.subscriptions[msg["id"]] = _async_track_entity_filter(
+            hass, msg, forward_events
+        ).async_remove
+    else:
+        connection.subscriptions[msg["id"]] = hass.bus.async_listen(
+            event_type, forward_events
+        )
 
     connection.send_message(messages.result_message(msg["id"]))
 
 
+def _has_entity_filter(msg):
+    """Return if a message filters the entities."""
+    return any(key in msg for key in ("entity_ids", "domains", "entity_globs"))
+
+
+@callback
+def _async_track_entity_filter(hass, msg, action):
+    """Track the state changes of the entities matching the filter of a message.
+
+    Only the state changes of the matching entities are dispatched to the
+    action.
+    """
+    return async_track_matching_state_change_event(
+        hass,
+        msg.get("entity_ids", ()),
+        msg.get("domains", ()),
+        msg.get("entity_globs", ()),
+        action,
+    )
+
+
 @callback
 @decorators.websocket_command(
     {
@@ -116,6 +170,61 @@ def handle_unsubscribe_events(hass, connection, msg):
         )
 
 
+@callback
+@decorators.websocket_command(
+    {
+        vol.Required("type"): "subscribe_entities",
+        **_ENTITY_FILTER,
+    }
+)
+def handle_subscribe_entities(hass, connection, msg):
+    """Handle subscribe entities command.
+
+    Sends the compressed states of the entities, then only the changes of
+    their states. The entities can be limited to entity ids, domains or globs.
+    """
+
+    @callback
+    def forward_entity_changes(event):
+        """Forward the changes of the entity states to websocket."""
+        if not connection.user.permissions.check_entity(
+            event.data["entity_id"], POLICY_READ
+        ):
+            return
+
+        connection.send_message(messages.cached_state_diff_message(msg["id"], event))
+
+    # The states are read and the listener added without awaiting in
+    # between so that no change is missed
+    if _has_entity_filter(msg):
+        tracker = _async_track_entity_filter(hass, msg, forward_entity_changes)
+        entity_perm = connection.user.permissions.check_entity
+        states = [
+            state
+            for state in map(hass.states.get, tracker.entity_ids)
+            if state is not None and entity_perm(state.entity_id, POLICY_READ)
+        ]
+        connection.subscriptions[msg["id"]] = tracker.async_remove
+    else:
+        states = _async_get_allowed_states(hass, connection)
+        connection.subscriptions[msg["id"]] = hass.bus.async_listen(
+            EVENT_STATE_CHANGED, forward_entity_changes
+        )
+
+    connection.send_message(messages.result_message(msg["id"]))
+    connection.send_message(
+        messages.event_message(
+            msg["id"],
+            {
+                messages.ENTITY_EVENT_ADD: {
+                    state.entity_id: messages.compressed_state_dict(state)
+                    for state in states
+                }
+            },
+        )
+    )
+
+
 @decorators.websocket_command(
     {
         vol.Required("type"): "call_service",
@@ -176,17 +285,30 @@ async def handle_call_service(hass, connection, msg):
 @decorators.websocket_command({vol.Required("type"): "get_states"})
 def handle_get_states(hass, connection, msg):
     """Handle get states command."""
-    if connection.user.permissions.access_all_entities("read"):
-        states = hass.states.async_all()
-    else:
-        entity_perm = connection.user.permissions.check_entity
-        states = [
-            state
-            for state in hass.states.async_all()
-            if entity_perm(state.entity_id, "read")
-        ]
+    states = _async_get_allowed_states(hass, connection)
 
-    connection.send_message(messages.result_message(msg["id"], states))
+    # The states are serialized once and joined for every connection
+    try:
+        states_json = f'[{",".join(state.as_json() for state in states)}]'
+    except (ValueError, TypeError):
+        # Let the message serialization report the bad data
+        connection.send_message(messages.result_message(msg["id"], states))
+        return
+
+    connection.send_message(messages.result_message_json(msg["id"], states_json))
+
+
+@callback
+def _async_get_allowed_states(hass, connection):
+    """Return the states the user of the connection may read."""
+    if connection.user.permissions.access_all_entities("read"):
+        return hass.states.async_all()
+    entity_perm = connection.user.permissions.check_entity
+    return [
+        state
+        for state in hass.states.async_all()
+        if entity_perm(state.entity_id, "read")
+    ]
 
 
 @decorators.websocket_command({vol.Required("type"): "get_services"})
@@ -241,6 +363,19 @@ def handle_ping(hass, connection, msg):
     connection.send_message(pong_message(msg["id"]))
 
 
+@callback
+@decorators.websocket_command(
+    {
+        vol.Required("type"): "supported_features",
+        vol.Required("features"): {str: cv.boolean},
+    }
+)
+def handle_supported_features(hass, connection, msg):
+    """Handle the features supported by the client."""
+    connection.supported_features = msg["features"]
+    connection.send_result(msg["id"])
+
+
 @decorators.websocket_command(
     {
         vol.Required("type"): "render_template",
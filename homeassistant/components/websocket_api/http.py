@@ -2,7 +2,7 @@
 import asyncio
 from contextlib import suppress
 import logging
-from typing import Optional
+from typing import Any, Dict, Hashable, Optional
 
 from aiohttp import WSMsgType, web
 import async_timeout
@@ -11,11 +11,14 @@ from homeassistant.components.http import HomeAssistantView
 from homeassistant.const import EVENT_HOMEASSISTANT_STOP
 from homeassistant.core import callback
 from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.json import json_loads
 
 from .auth import AuthPhase, auth_required_message
+from .connection import ActiveConnection
 from .const import (
     CANCELLATION_ERRORS,
     DATA_CONNECTIONS,
+    FEATURE_COALESCE_MESSAGES,
     MAX_PENDING_MSG,
     PENDING_MSG_PEAK,
     PENDING_MSG_PEAK_TIME,
@@ -50,6 +53,25 @@ class WebSocketAdapter(logging.LoggerAdapter):
         return f'[{self.extra["connid"]}] {msg}', kwargs
 
 
+class _PendingMessage:
+    """A queued message that a newer message with the same key can replace."""
+
+    __slots__ = ("key", "message")
+
+    def __init__(self, key: Hashable, message: Any) -> None:
+        """Initialize the pending message."""
+        self.key = key
+        self.message = message
+
+
+class _MessageQueue(asyncio.Queue):
+    """Queue of the outgoing messages that can drop a queued message."""
+
+    def remove(self, item: Any) -> None:
+        """Remove a queued item."""
+        self._queue.remove(item)  # type: ignore[attr-defined]
+
+
 class WebSocketHandler:
     """Handle an active websocket client connection."""
 
@@ -58,41 +80,87 @@ class WebSocketHandler:
         self.hass = hass
         self.request = request
         self.wsock: Optional[web.WebSocketResponse] = None
-        self._to_write: asyncio.Queue = asyncio.Queue(maxsize=MAX_PENDING_MSG)
+        self._to_write: _MessageQueue = _MessageQueue(maxsize=MAX_PENDING_MSG)
+        self._pending: Dict[Hashable, _PendingMessage] = {}
+        self._connection: Optional[ActiveConnection] = None
         self._handle_task = None
         self._writer_task = None
         self._logger = WebSocketAdapter(_WS_LOGGER, {"connid": id(self)})
         self._peak_checker_unsub = None
 
     async def _writer(self):
-        """Write outgoing messages."""
+        """Write outgoing messages.
+
+        When the client supports it, all the queued messages are written as
+        a JSON array in a single frame.
+        """
+        to_write = self._to_write
         # Exceptions if Socket disconnected or cancelled by connection handler
         with suppress(RuntimeError, ConnectionResetError, *CANCELLATION_ERRORS):
             while not self.wsock.closed:
-                message = await self._to_write.get()
-                if message is None:
+                queued = [await to_write.get()]
+                connection = self._connection
+                if connection is not None and connection.supported_features.get(
+                    FEATURE_COALESCE_MESSAGES
+                ):
+                    while not to_write.empty():
+                        queued.append(to_write.get_nowait())
+
+                closing = False
+                messages = []
+                for message in queued:
+                    if message is None:
+                        closing = True
+                        # Nothing is written after closing
+                        self._pending.clear()
+                        break
+
+                    if isinstance(message, _PendingMessage):
+                        if self._pending.get(message.key) is message:
+                            del self._pending[message.key]
+                        message = message.message
+
+                    self._logger.debug("Sending %s", message)
+
+                    if not isinstance(message, str):
+                        message = message_to_json(message)
+
+                    messages.append(message)
+
+                if len(messages) == 1:
+                    await self.wsock.send_str(messages[0])
+                elif messages:
+                    await self.wsock.send_str(f"[{','.join(messages)}]")
+
+                if closing:
                     break
 
-                self._logger.debug("Sending %s", message)
-
-                if not isinstance(message, str):
-                    message = message_to_json(message)
-
-                await self.wsock.send_str(message)
-
         # Clean up the peaker checker when we shut down the writer
         if self._peak_checker_unsub:
             self._peak_checker_unsub()
             self._peak_checker_unsub = None
 
     @callback
-    def _send_message(self, message):
+    def _send_message(self, message, supersede_key: Optional[Hashable] = None):
         """Send a message to the client.
 
+        While the client is behind, a message with a supersede key drops the
+        queued message with the same key. The message is queued at the tail,
+        after the messages that were queued after the dropped one.
+
         Closes connection if the client is not reading the messages.
 
         Async friendly.
         """
+        if supersede_key is not None:
+            pending = self._pending.get(supersede_key)
+            if pending is not None and self._to_write.qsize() >= PENDING_MSG_PEAK:
+                # Dropped before queueing so a full queue has room again
+                self._to_write.remove(pending)
+            message = self._pending[supersede_key] = _PendingMessage(
+                supersede_key, message
+            )
+
         try:
             self._to_write.put_nowait(message)
         except asyncio.QueueFull:
@@ -178,13 +246,13 @@ class WebSocketHandler:
                 raise Disconnect
 
             try:
-                msg_data = msg.json()
+                msg_data = msg.json(loads=json_loads)
             except ValueError as err:
                 disconnect_warn = "Received invalid JSON."
                 raise Disconnect from err
 
             self._logger.debug("Received %s", msg_data)
-            connection = await auth.async_handle(msg_data)
+            connection = self._connection = await auth.async_handle(msg_data)
             self.hass.data[DATA_CONNECTIONS] = (
                 self.hass.data.get(DATA_CONNECTIONS, 0) + 1
             )
@@ -204,7 +272,7 @@ class WebSocketHandler:
                     break
 
                 try:
-                    msg_data = msg.json()
+                    msg_data = msg.json(loads=json_loads)
                 except ValueError:
                     disconnect_warn = "Received invalid JSON."
                     break
@@ -137,6 +137,7 @@ CONF_PAYLOAD_ON = "payload_on"
 CONF_PENDING_TIME = "pending_time"
 CONF_PIN = "pin"
 CONF_PLATFORM = "platform"
+CONF_POLLING_SCHEDULER = "polling_scheduler"
 CONF_PORT = "port"
 CONF_PREFIX = "prefix"
 CONF_PROFILE_NAME = "profile_name"
@@ -5,6 +5,7 @@ Home Assistant is a Home Automation framework for observing the state
 of entities and react to changes.
 """
 import asyncio
+from collections import OrderedDict
 import datetime
 import enum
 import functools
@@ -13,6 +14,7 @@ import logging
 import os
 import pathlib
 import re
+import sys
 import threading
 from time import monotonic
 from types import MappingProxyType
@@ -29,6 +31,7 @@ from typing import (
     Mapping,
     Optional,
     Set,
+    Tuple,
     TypeVar,
     Union,
     cast,
@@ -77,6 +80,8 @@ from homeassistant.util.async_ import (
     shutdown_run_callback_threadsafe,
 )
 import homeassistant.util.dt as dt_util
+from homeassistant.util.job_timing import JobTimings
+from homeassistant.util.json_backend import json_dumps
 from homeassistant.util.timeout import TimeoutManager
 from homeassistant.util.unit_system import IMPERIAL_SYSTEM, METRIC_SYSTEM, UnitSystem
 import homeassistant.util.uuid as uuid_util
@@ -116,8 +121,15 @@ SOURCE_YAML = "yaml"
 # How long to wait until things that run on startup have to finish.
 TIMEOUT_EVENT_START = 15
 
+# How many removed entities the state machine remembers for
+# consumers of its changes
+STATE_CHANGES_REMOVED_LIMIT = 1000
+
 _LOGGER = logging.getLogger(__name__)
 
+# Shared by all the states without attributes
+_EMPTY_ATTRIBUTES: "MappingProxyType[str, Any]" = MappingProxyType({})
+
 
 def split_entity_id(entity_id: str) -> List[str]:
     """Split a state entity ID into domain and object ID."""
@@ -238,6 +250,8 @@ class HomeAssistant:
         self._stopped: Optional[asyncio.Event] = None
         # Timeout handler for Core/Helper namespace
         self.timeout: TimeoutManager = TimeoutManager()
+        # Timings of the jobs, only recorded when set
+        self.job_timings: Optional[JobTimings] = None
 
     @property
     def is_running(self) -> bool:
@@ -366,6 +380,10 @@ class HomeAssistant:
         hassjob: HassJob to call.
         args: parameters for method to call.
         """
+        job_timings = self.job_timings
+        if job_timings is not None and job_timings.enabled is True:
+            return self._async_add_timed_hass_job(job_timings, hassjob, *args)
+
         if hassjob.job_type == HassJobType.Coroutinefunction:
             task = self.loop.create_task(hassjob.target(*args))
         elif hassjob.job_type == HassJobType.Callback:
@@ -382,6 +400,29 @@ class HomeAssistant:
 
         return task
 
+    @callback
+    def _async_add_timed_hass_job(
+        self, job_timings: JobTimings, hassjob: HassJob, *args: Any
+    ) -> Optional[asyncio.Future]:
+        """Add a HassJob from within the event loop, timing it."""
+        if hassjob.job_type == HassJobType.Coroutinefunction:
+            task = self.loop.create_task(
+                job_timings.time_coroutine(hassjob.target, hassjob.target(*args))
+            )
+        elif hassjob.job_type == HassJobType.Callback:
+            self.loop.call_soon(job_timings.run_callback, hassjob.target, *args)
+            return None
+        else:
+            task = self.loop.run_in_executor(  # type: ignore
+                None, job_timings.run_executor_job, hassjob.target, *args
+            )
+
+        # If a task is scheduled
+        if self._track_task:
+            self._pending_tasks.append(task)
+
+        return task
+
     @callback
     def async_create_task(self, target: Coroutine) -> asyncio.tasks.Task:
         """Create a task from within the eventloop.
@@ -402,7 +443,13 @@ class HomeAssistant:
         self, target: Callable[..., T], *args: Any
     ) -> Awaitable[T]:
         """Add an executor job from within the event loop."""
-        task = self.loop.run_in_executor(None, target, *args)
+        job_timings = self.job_timings
+        if job_timings is not None and job_timings.enabled is True:
+            task = self.loop.run_in_executor(
+                None, job_timings.run_executor_job, target, *args
+            )
+        else:
+            task = self.loop.run_in_executor(None, target, *args)
 
         # If a task is scheduled
         if self._track_task:
@@ -432,7 +479,11 @@ class HomeAssistant:
         args: parameters for method to call.
         """
         if hassjob.job_type == HassJobType.Callback:
-            hassjob.target(*args)
+            job_timings = self.job_timings
+            if job_timings is not None and job_timings.enabled is True:
+                job_timings.run_callback(hassjob.target, *args)
+            else:
+                hassjob.target(*args)
             return None
 
         return self.async_add_hass_job(hassjob, *args)
@@ -663,7 +714,12 @@ class EventBus:
     def __init__(self, hass: HomeAssistant) -> None:
         """Initialize a new event bus."""
         self._listeners: Dict[str, List[HassJob]] = {}
+        # The callbacks and the other jobs to dispatch each event type to,
+        # rebuilt when the listeners change instead of on every event
+        self._dispatch: Dict[str, Tuple[Tuple[Callable, ...], Tuple[HassJob, ...]]] = {}
         self._hass = hass
+        # Resumes the timer when something starts listening to its ticks
+        self._async_resume_timer: Optional[CALLBACK_TYPE] = None
 
     @callback
     def async_listeners(self) -> Dict[str, int]:
@@ -701,6 +757,33 @@ class EventBus:
     ) -> None:
         """Fire an event.
 
+        This method must be run in the event loop.
+        """
+        dispatch = self._dispatch.get(event_type)
+        if dispatch is None:
+            dispatch = self._async_build_dispatch(event_type)
+        callbacks, jobs = dispatch
+
+        if not callbacks and not jobs and not _LOGGER.isEnabledFor(logging.DEBUG):
+            return
+
+        event = Event(event_type, event_data, origin, time_fired, context)
+
+        if event_type != EVENT_TIME_CHANGED:
+            _LOGGER.debug("Bus:Handling %s", event)
+
+        if callbacks:
+            self._hass.loop.call_soon(self._async_run_callbacks, callbacks, event)
+
+        for job in jobs:
+            self._hass.async_add_hass_job(job, event)
+
+    @callback
+    def _async_build_dispatch(
+        self, event_type: str
+    ) -> Tuple[Tuple[Callable, ...], Tuple[HassJob, ...]]:
+        """Build the callbacks and the other jobs to dispatch an event type to.
+
         This method must be run in the event loop.
         """
         listeners = self._listeners.get(event_type, [])
@@ -710,16 +793,43 @@ class EventBus:
         if match_all_listeners is not None and event_type != EVENT_HOMEASSISTANT_CLOSE:
             listeners = match_all_listeners + listeners
 
-        event = Event(event_type, event_data, origin, time_fired, context)
+        dispatch = self._dispatch[event_type] = (
+            tuple(
+                job.target for job in listeners if job.job_type == HassJobType.Callback
+            ),
+            tuple(job for job in listeners if job.job_type != HassJobType.Callback),
+        )
+        return dispatch
 
-        if event_type != EVENT_TIME_CHANGED:
-            _LOGGER.debug("Bus:Handling %s", event)
+    @callback
+    def _async_run_callbacks(
+        self, callbacks: Tuple[Callable, ...], event: Event
+    ) -> None:
+        """Run the callbacks listening to an event in a single pass.
 
-        if not listeners:
-            return
+        This method must be run in the event loop.
+        """
+        job_timings = self._hass.job_timings
+        if job_timings is not None and job_timings.enabled is not True:
+            job_timings = None
+        for target in callbacks:
+            try:
+                if job_timings is not None:
+                    job_timings.run_callback(target, event)
+                else:
+                    target(event)
+            except Exception as err:  # pylint: disable=broad-except
+                self._hass.loop.call_exception_handler(
+                    {"message": f"Exception in callback {target}", "exception": err}
+                )
 
-        for job in listeners:
-            self._hass.async_add_hass_job(job, event)
+    @callback
+    def _async_invalidate_dispatch(self, event_type: str) -> None:
+        """Rebuild the dispatch of an event type on its next event."""
+        if event_type == MATCH_ALL:
+            self._dispatch.clear()
+        else:
+            self._dispatch.pop(event_type, None)
 
     def listen(self, event_type: str, listener: Callable) -> CALLBACK_TYPE:
         """Listen for all events or events of a specific type.
@@ -751,6 +861,9 @@ class EventBus:
     @callback
     def _async_listen_job(self, event_type: str, hassjob: HassJob) -> CALLBACK_TYPE:
         self._listeners.setdefault(event_type, []).append(hassjob)
+        self._async_invalidate_dispatch(event_type)
+        if event_type == EVENT_TIME_CHANGED and self._async_resume_timer is not None:
+            self._async_resume_timer()
 
         def remove_listener() -> None:
             """Remove the listener."""
@@ -821,6 +934,7 @@ class EventBus:
             # delete event_type list if empty
             if not self._listeners[event_type]:
                 self._listeners.pop(event_type)
+            self._async_invalidate_dispatch(event_type)
         except (KeyError, ValueError):
             # KeyError is key event_type listener did not exist
             # ValueError if listener did not exist within event_type
@@ -830,6 +944,11 @@ class EventBus:
 class State:
     """Object to represent a state within the state machine.
 
+    States are kept in large numbers by the state machine and the
+    integrations that track history, so they share what they can: the
+    attributes of a state that did not change them are those of the previous
+    state and the domain and object id strings are interned.
+
     entity_id: the entity that is represented.
     state: the state of the entity
     attributes: extra information on entity and state
@@ -850,6 +969,7 @@ class State:
         "domain",
         "object_id",
         "_as_dict",
+        "_as_json",
     ]
 
     def __init__(
@@ -879,12 +999,20 @@ class State:
 
         self.entity_id = entity_id.lower()
         self.state = state
-        self.attributes = MappingProxyType(attributes or {})
+        if isinstance(attributes, MappingProxyType):
+            self.attributes = attributes
+        elif attributes:
+            self.attributes = MappingProxyType(attributes)
+        else:
+            self.attributes = _EMPTY_ATTRIBUTES
         self.last_updated = last_updated or dt_util.utcnow()
         self.last_changed = last_changed or self.last_updated
         self.context = context or Context()
-        self.domain, self.object_id = split_entity_id(self.entity_id)
+        domain, object_id = split_entity_id(self.entity_id)
+        self.domain = sys.intern(domain)
+        self.object_id = sys.intern(object_id)
         self._as_dict: Optional[Dict[str, Collection[Any]]] = None
+        self._as_json: Optional[str] = None
 
     @property
     def name(self) -> str:
@@ -917,6 +1045,18 @@ class State:
             }
         return self._as_dict
 
+    def as_json(self) -> str:
+        """Return the State serialized to JSON.
+
+        Async friendly.
+
+        Serialized once as states do not change, so that a list of states
+        can be serialized by joining them.
+        """
+        if self._as_json is None:
+            self._as_json = json_dumps(self.as_dict())
+        return self._as_json
+
     @classmethod
     def from_dict(cls, json_dict: Dict) -> Any:
         """Initialize a state from a dict.
@@ -977,9 +1117,18 @@ class StateMachine:
     def __init__(self, bus: EventBus, loop: asyncio.events.AbstractEventLoop) -> None:
         """Initialize state machine."""
         self._states: Dict[str, State] = {}
+        self._domain_index: Dict[str, Dict[str, State]] = {}
+        # The attributes fingerprint of the last write of each entity
+        self._fingerprints: Dict[str, Any] = {}
+        self._suppressed_writes = 0
         self._reservations: Set[str] = set()
         self._bus = bus
         self._loop = loop
+        # Sequence of the last change of each entity, oldest change first
+        self._sequence = 0
+        self._changes: "OrderedDict[str, int]" = OrderedDict()
+        self._removed: "OrderedDict[str, int]" = OrderedDict()
+        self._changes_floor = 0
 
     def entity_ids(self, domain_filter: Optional[str] = None) -> List[str]:
         """List of entity ids that are being tracked."""
@@ -1000,12 +1149,12 @@ class StateMachine:
             return list(self._states)
 
         if isinstance(domain_filter, str):
-            domain_filter = (domain_filter.lower(),)
+            return list(self._domain_index.get(domain_filter.lower(), ()))
 
         return [
-            state.entity_id
-            for state in self._states.values()
-            if state.domain in domain_filter
+            entity_id
+            for domain in domain_filter
+            for entity_id in self._domain_index.get(domain, ())
         ]
 
     @callback
@@ -1022,9 +1171,7 @@ class StateMachine:
         if isinstance(domain_filter, str):
             domain_filter = (domain_filter.lower(),)
 
-        return len(
-            [None for state in self._states.values() if state.domain in domain_filter]
-        )
+        return sum(len(self._domain_index.get(domain, ())) for domain in domain_filter)
 
     def all(self, domain_filter: Optional[Union[str, Iterable]] = None) -> List[State]:
         """Create a list of all states."""
@@ -1044,12 +1191,63 @@ class StateMachine:
             return list(self._states.values())
 
         if isinstance(domain_filter, str):
-            domain_filter = (domain_filter.lower(),)
+            return list(self._domain_index.get(domain_filter.lower(), {}).values())
 
         return [
-            state for state in self._states.values() if state.domain in domain_filter
+            state
+            for domain in domain_filter
+            for state in self._domain_index.get(domain, {}).values()
         ]
 
+    @property
+    def suppressed_writes(self) -> int:
+        """Return how many writes did not change the state they were setting."""
+        return self._suppressed_writes
+
+    @property
+    def sequence(self) -> int:
+        """Return the sequence number of the last change of the states."""
+        return self._sequence
+
+    @callback
+    def async_changed_since(
+        self, sequence: int
+    ) -> Optional[Dict[str, Optional[State]]]:
+        """Return the states that changed after the change numbered sequence.
+
+        Removed entities map to None. Returns None when the changes no longer
+        go back to sequence, the caller then has to fetch all states.
+
+        This method must be run in the event loop.
+        """
+        if sequence < self._changes_floor:
+            return None
+
+        changed: Dict[str, Optional[State]] = {}
+        for entity_id, change in reversed(self._changes.items()):
+            if change <= sequence:
+                break
+            changed[entity_id] = self._states[entity_id]
+        for entity_id, change in reversed(self._removed.items()):
+            if change <= sequence:
+                break
+            changed[entity_id] = None
+        return changed
+
+    @callback
+    def _async_track_change(self, entity_id: str, removed: bool) -> None:
+        """Number a change of the state of an entity."""
+        self._sequence += 1
+        self._changes.pop(entity_id, None)
+        self._removed.pop(entity_id, None)
+        if removed:
+            self._removed[entity_id] = self._sequence
+        else:
+            self._changes[entity_id] = self._sequence
+
+        if len(self._removed) > STATE_CHANGES_REMOVED_LIMIT:
+            _, self._changes_floor = self._removed.popitem(last=False)
+
     def get(self, entity_id: str) -> Optional[State]:
         """Retrieve state of entity_id or None if not found.
 
@@ -1084,6 +1282,7 @@ class StateMachine:
         """
         entity_id = entity_id.lower()
         old_state = self._states.pop(entity_id, None)
+        self._fingerprints.pop(entity_id, None)
 
         if entity_id in self._reservations:
             self._reservations.remove(entity_id)
@@ -1091,6 +1290,12 @@ class StateMachine:
         if old_state is None:
             return False
 
+        domain_states = self._domain_index[old_state.domain]
+        del domain_states[entity_id]
+        if not domain_states:
+            del self._domain_index[old_state.domain]
+        self._async_track_change(entity_id, True)
+
         self._bus.async_fire(
             EVENT_STATE_CHANGED,
             {"entity_id": entity_id, "old_state": old_state, "new_state": None},
@@ -1106,6 +1311,7 @@ class StateMachine:
         attributes: Optional[Mapping[str, Any]] = None,
         force_update: bool = False,
         context: Optional[Context] = None,
+        attributes_fingerprint: Any = None,
     ) -> None:
         """Set the state of an entity, add entity if it does not exist.
 
@@ -1122,6 +1328,7 @@ class StateMachine:
             attributes,
             force_update,
             context,
+            attributes_fingerprint,
         ).result()
 
     @callback
@@ -1155,6 +1362,7 @@ class StateMachine:
         attributes: Optional[Mapping[str, Any]] = None,
         force_update: bool = False,
         context: Optional[Context] = None,
+        attributes_fingerprint: Any = None,
     ) -> None:
         """Set the state of an entity, add entity if it does not exist.
 
@@ -1163,11 +1371,15 @@ class StateMachine:
         If you just update the attributes and not the state, last changed will
         not be affected.
 
+        Passing the attributes of the current state, or an attributes
+        fingerprint equal to the one of the previous write, tells the
+        attributes did not change without comparing them. A fingerprint is
+        any value that compares equal only when the attributes are equal.
+
         This method must be run in the event loop.
         """
         entity_id = entity_id.lower()
         new_state = str(new_state)
-        attributes = attributes or {}
         old_state = self._states.get(entity_id)
         if old_state is None:
             same_state = False
@@ -1175,12 +1387,29 @@ class StateMachine:
             last_changed = None
         else:
             same_state = old_state.state == new_state and not force_update
-            same_attr = old_state.attributes == MappingProxyType(attributes)
+            same_attr = (
+                attributes is old_state.attributes
+                or (
+                    attributes_fingerprint is not None
+                    and attributes_fingerprint == self._fingerprints.get(entity_id)
+                )
+                or old_state.attributes == (attributes or {})
+            )
             last_changed = old_state.last_changed if same_state else None
 
+        if attributes_fingerprint is None:
+            self._fingerprints.pop(entity_id, None)
+        else:
+            self._fingerprints[entity_id] = attributes_fingerprint
+
         if same_state and same_attr:
+            self._suppressed_writes += 1
             return
 
+        if old_state is not None and same_attr:
+            # Share the unchanged attributes with the previous state
+            attributes = old_state.attributes
+
         if context is None:
             context = Context()
 
@@ -1196,6 +1425,8 @@ class StateMachine:
             old_state is None,
         )
         self._states[entity_id] = state
+        self._domain_index.setdefault(state.domain, {})[entity_id] = state
+        self._async_track_change(entity_id, False)
         self._bus.async_fire(
             EVENT_STATE_CHANGED,
             {"entity_id": entity_id, "old_state": old_state, "new_state": state},
@@ -1539,6 +1770,9 @@ class Config:
         # Use legacy template behavior
         self.legacy_templates: bool = False
 
+        # Poll the entities from the shared polling scheduler
+        self.polling_scheduler: bool = False
+
     def distance(self, lat: float, lon: float) -> Optional[float]:
         """Calculate distance from Home Assistant.
 
@@ -1749,7 +1983,11 @@ class Config:
 
 
 def _async_create_timer(hass: HomeAssistant) -> None:
-    """Create a timer that will start on HOMEASSISTANT_START."""
+    """Create a timer that will start on HOMEASSISTANT_START.
+
+    The timer only ticks while something listens to EVENT_TIME_CHANGED, the
+    time listeners of the helpers are scheduled on their own.
+    """
     handle = None
     timer_context = Context()
 
@@ -1764,6 +2002,7 @@ def _async_create_timer(hass: HomeAssistant) -> None:
     @callback
     def fire_time_event(target: float) -> None:
         """Fire next time event."""
+        nonlocal handle
         now = dt_util.utcnow()
 
         hass.bus.async_fire(
@@ -1780,15 +2019,29 @@ def _async_create_timer(hass: HomeAssistant) -> None:
                 context=timer_context,
             )
 
-        schedule_tick(now)
+        if EVENT_TIME_CHANGED in hass.bus.async_listeners():
+            schedule_tick(now)
+        else:
+            _LOGGER.debug("Timer:pausing")
+            handle = None
+
+    @callback
+    def resume_timer() -> None:
+        """Resume the timer when it is paused."""
+        if handle is None:
+            _LOGGER.debug("Timer:resuming")
+            schedule_tick(dt_util.utcnow())
 
     @callback
     def stop_timer(_: Event) -> None:
         """Stop the timer."""
+        hass.bus._async_resume_timer = None  # pylint: disable=protected-access
         if handle is not None:
             handle.cancel()
 
     hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, stop_timer)
+    hass.bus._async_resume_timer = resume_timer  # pylint: disable=protected-access
 
     _LOGGER.info("Timer:starting")
-    schedule_tick(dt_util.utcnow())
+    if EVENT_TIME_CHANGED in hass.bus.async_listeners():
+        schedule_tick(dt_util.utcnow())
@@ -175,6 +175,16 @@ class Entity(ABC):
         """
         return None
 
+    @property
+    def attributes_fingerprint(self) -> Any:
+        """Return a value that changes whenever the entity attributes change.
+
+        Covers the capability, state and device state attributes. Lets the
+        state machine skip comparing large attributes when they did not
+        change. None when the attributes have to be compared.
+        """
+        return None
+
     @property
     def device_info(self) -> Optional[Dict[str, Any]]:
         """Return device specific attributes.
@@ -314,7 +324,8 @@ class Entity(ABC):
         attr = self.capability_attributes
         attr = dict(attr) if attr else {}
 
-        if not self.available:
+        available = self.available
+        if not available:
             state = STATE_UNAVAILABLE
         else:
             sstate = self.state
@@ -379,8 +390,10 @@ class Entity(ABC):
 
         # Overwrite properties that have been set in the config file.
         assert self.hass is not None
+        customize = None
         if DATA_CUSTOMIZE in self.hass.data:
-            attr.update(self.hass.data[DATA_CUSTOMIZE].get(self.entity_id))
+            customize = self.hass.data[DATA_CUSTOMIZE].get(self.entity_id)
+            attr.update(customize)
 
         # Convert temperature if we detect one
         try:
@@ -405,8 +418,31 @@ class Entity(ABC):
             self._context = None
             self._context_set = None
 
+        fingerprint = self.attributes_fingerprint
+        if fingerprint is not None:
+            # The other attributes are few and small, compare them as part
+            # of the fingerprint
+            fingerprint = (
+                fingerprint,
+                available,
+                unit_of_measurement,
+                name,
+                icon,
+                entity_picture,
+                assumed_state,
+                supported_features,
+                device_class,
+                customize,
+                self.hass.config.units.temperature_unit,
+            )
+
         self.hass.states.async_set(
-            self.entity_id, state, attr, self.force_update, self._context
+            self.entity_id,
+            state,
+            attr,
+            self.force_update,
+            self._context,
+            fingerprint,
         )
 
     def schedule_update_ha_state(self, force_refresh: bool = False) -> None:
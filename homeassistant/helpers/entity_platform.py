@@ -22,6 +22,7 @@ from homeassistant.util.async_ import run_callback_threadsafe
 
 from .entity_registry import DISABLED_INTEGRATION
 from .event import async_call_later, async_track_time_interval
+from .polling import async_get_polling_scheduler
 
 if TYPE_CHECKING:
     from .entity import Entity
@@ -333,6 +334,11 @@ class EntityPlatform:
         ):
             return
 
+        if self.hass.config.polling_scheduler:
+            scheduler = async_get_polling_scheduler(self.hass)
+            self._async_unsub_polling = scheduler.async_add(self)
+            return
+
         self._async_unsub_polling = async_track_time_interval(
             self.hass,
             self._update_entity_states,
@@ -3,10 +3,14 @@ import asyncio
 import copy
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+import fnmatch
 import functools as ft
+import heapq
 import logging
+import re
 import time
 from typing import (
+    AbstractSet,
     Any,
     Awaitable,
     Callable,
@@ -45,10 +49,12 @@ from homeassistant.helpers.entity_registry import EVENT_ENTITY_REGISTRY_UPDATED
 from homeassistant.helpers.ratelimit import KeyedRateLimit
 from homeassistant.helpers.sun import get_astral_event_next
 from homeassistant.helpers.template import RenderInfo, Template, result_as_boolean
+from homeassistant.helpers.template_timing import DATA_TEMPLATE_TIMINGS, template_owner
 from homeassistant.helpers.typing import TemplateVarsType
 from homeassistant.loader import bind_hass
 from homeassistant.util import dt as dt_util
 from homeassistant.util.async_ import run_callback_threadsafe
+from homeassistant.util.job_timing import target_name
 
 TRACK_STATE_CHANGE_CALLBACKS = "track_state_change_callbacks"
 TRACK_STATE_CHANGE_LISTENER = "track_state_change_listener"
@@ -62,6 +68,8 @@ TRACK_STATE_REMOVED_DOMAIN_LISTENER = "track_state_removed_domain_listener"
 TRACK_ENTITY_REGISTRY_UPDATED_CALLBACKS = "track_entity_registry_updated_callbacks"
 TRACK_ENTITY_REGISTRY_UPDATED_LISTENER = "track_entity_registry_updated_listener"
 
+TIMER_WHEEL = "event_timer_wheel"
+
 _ALL_LISTENER = "all"
 _DOMAINS_LISTENER = "domains"
 _ENTITIES_LISTENER = "entities"
@@ -642,6 +650,114 @@ def async_track_state_change_filtered(
     return tracker
 
 
+class _TrackMatchingStateChange:
+    """Track the state changes of the entities matching ids, domains or globs.
+
+    The entities that match are tracked with async_track_state_change_event
+    and the entities added later with async_track_state_added_domain, so
+    the state changes of other entities are not dispatched to the action.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entity_ids: Iterable[str],
+        domains: Iterable[str],
+        entity_globs: Iterable[str],
+        action: Callable[[Event], Any],
+    ):
+        """Handle tracking of the matching entities init."""
+        self.hass = hass
+        self._action = action
+        self._job = HassJob(action)
+        self._domains = {domain.lower() for domain in domains}
+        globs = [glob.lower() for glob in entity_globs]
+        self._glob_re = (
+            re.compile("|".join(fnmatch.translate(glob) for glob in globs))
+            if globs
+            else None
+        )
+        self._glob_domains = {glob.partition(".")[0] for glob in globs}
+        self.entity_ids: Set[str] = {entity_id.lower() for entity_id in entity_ids}
+        self._listeners: List[CALLBACK_TYPE] = []
+
+    @callback
+    def async_setup(self) -> None:
+        """Create listeners to track the matching entities."""
+        hass = self.hass
+        added_domains = self._domains | self._glob_domains
+        if any(_has_wildcard(domain) for domain in self._glob_domains):
+            added_domains = {MATCH_ALL}
+            glob_entity_ids = hass.states.async_entity_ids()
+        else:
+            glob_entity_ids = hass.states.async_entity_ids(self._glob_domains)
+
+        self.entity_ids.update(hass.states.async_entity_ids(self._domains))
+        if self._glob_re is not None:
+            glob_match = self._glob_re.match
+            self.entity_ids.update(
+                entity_id for entity_id in glob_entity_ids if glob_match(entity_id)
+            )
+
+        self._listeners.append(
+            async_track_state_change_event(hass, self.entity_ids, self._action)
+        )
+        self._listeners.append(
+            async_track_state_added_domain(
+                hass, added_domains, self._async_entity_added
+            )
+        )
+
+    @callback
+    def async_remove(self) -> None:
+        """Cancel the listeners."""
+        while self._listeners:
+            self._listeners.pop()()
+
+    @callback
+    def _async_entity_added(self, event: Event) -> None:
+        """Start tracking an added entity if it matches."""
+        entity_id = event.data["entity_id"]
+        # The entities already tracked get the event from their listener
+        if entity_id in self.entity_ids:
+            return
+
+        if split_entity_id(entity_id)[0] not in self._domains and (
+            self._glob_re is None or not self._glob_re.match(entity_id)
+        ):
+            return
+
+        self.entity_ids.add(entity_id)
+        self._listeners.append(
+            async_track_state_change_event(self.hass, entity_id, self._action)
+        )
+        self.hass.async_run_hass_job(self._job, event)
+
+
+def _has_wildcard(pattern: str) -> bool:
+    """Return if a glob pattern has wildcards."""
+    return any(char in pattern for char in "*?[")
+
+
+@callback
+@bind_hass
+def async_track_matching_state_change_event(
+    hass: HomeAssistant,
+    entity_ids: Iterable[str],
+    domains: Iterable[str],
+    entity_globs: Iterable[str],
+    action: Callable[[Event], Any],
+) -> _TrackMatchingStateChange:
+    """Track the state change events of entities by ids, domains or globs.
+
+    Returns an object with the tracked entity_ids, used to cancel the
+    tracking (async_remove).
+    """
+    tracker = _TrackMatchingStateChange(hass, entity_ids, domains, entity_globs, action)
+    tracker.async_setup()
+    return tracker
+
+
 @callback
 @bind_hass
 def async_track_template(
@@ -732,8 +848,96 @@ def async_track_template(
 track_template = threaded_listener_factory(async_track_template)
 
 
+class _TemplateIndex:
+    """Index of the templates by the states their last render depends on."""
+
+    def __init__(self) -> None:
+        """Initialize the index."""
+        self.all_states: Set[Template] = set()
+        self.entities: Dict[str, Set[Template]] = {}
+        self.domains: Dict[str, Set[Template]] = {}
+        self._keys: Dict[Template, Tuple[bool, AbstractSet, AbstractSet]] = {}
+
+    @callback
+    def async_update(self, template: Template, info: RenderInfo) -> bool:
+        """Index the states a template depends on.
+
+        Returns True if a state started or stopped being depended on.
+        """
+        keys = (
+            _render_infos_needs_all_listener([info]),
+            info.entities,
+            info.domains | info.domains_lifecycle,
+        )
+        old_keys = self._keys.get(template)
+        if keys == old_keys:
+            return False
+        self._keys[template] = keys
+
+        was_all, old_entities, old_domains = old_keys or (False, set(), set())
+        is_all, entities, domains = keys
+        changed = False
+        if is_all and not was_all:
+            changed = not self.all_states
+            self.all_states.add(template)
+        elif was_all and not is_all:
+            self.all_states.discard(template)
+            changed = not self.all_states
+
+        if _async_move_template(self.entities, template, old_entities, entities):
+            changed = True
+        if _async_move_template(self.domains, template, old_domains, domains):
+            changed = True
+        return changed
+
+    @callback
+    def async_templates_for(self, entity_id: str) -> Set[Template]:
+        """Return the templates that may depend on the state of an entity."""
+        templates = set(self.all_states)
+        templates.update(self.entities.get(entity_id, ()))
+        templates.update(self.domains.get(split_entity_id(entity_id)[0], ()))
+        return templates
+
+    @callback
+    def async_track_states(self) -> TrackStates:
+        """Return the states to track for all the templates."""
+        if self.all_states:
+            return TrackStates(True, set(), set())
+        return TrackStates(False, set(self.entities), set(self.domains))
+
+
+@callback
+def _async_move_template(
+    index: Dict[str, Set[Template]],
+    template: Template,
+    old_keys: AbstractSet[str],
+    new_keys: AbstractSet[str],
+) -> bool:
+    """Move a template between keys, return True if a key was added or removed."""
+    changed = False
+    for key in old_keys - new_keys:
+        templates = index[key]
+        templates.discard(template)
+        if not templates:
+            del index[key]
+            changed = True
+    for key in new_keys - old_keys:
+        templates = index.get(key)
+        if templates is None:
+            templates = index[key] = set()
+            changed = True
+        templates.add(template)
+    return changed
+
+
 class _TrackTemplateResultInfo:
-    """Handle removal / refresh of tracker."""
+    """Handle removal / refresh of tracker.
+
+    The templates are indexed by the entities and domains they depend on so
+    that a state change only considers the templates it concerns, and the
+    state change listeners are only updated when a template starts or stops
+    depending on a state.
+    """
 
     def __init__(
         self,
@@ -744,10 +948,20 @@ class _TrackTemplateResultInfo:
         """Handle removal / refresh of tracker init."""
         self.hass = hass
         self._job = HassJob(action)
+        self._owner = _template_tracker_owner(action)
 
         for track_template_ in track_templates:
             track_template_.template.hass = hass
         self._track_templates = track_templates
+        self._track_templates_by_template: Dict[Template, List[TrackTemplate]] = {}
+        for track_template_ in track_templates:
+            self._track_templates_by_template.setdefault(
+                track_template_.template, []
+            ).append(track_template_)
+        self._template_positions = {
+            template: position
+            for position, template in enumerate(self._track_templates_by_template)
+        }
 
         self._last_result: Dict[Template, Union[str, TemplateError]] = {}
 
@@ -755,13 +969,16 @@ class _TrackTemplateResultInfo:
         self._info: Dict[Template, RenderInfo] = {}
         self._track_state_changes: Optional[_TrackStateChangeFiltered] = None
         self._time_listeners: Dict[Template, Callable] = {}
+        # Templates by the states their last render depends on
+        self._render_index = _TemplateIndex()
+        # Same, without the domains and all states of the rate limited templates
+        self._listener_index = _TemplateIndex()
 
     def async_setup(self, raise_on_template_error: bool) -> None:
         """Activation of template tracking."""
         for track_template_ in self._track_templates:
             template = track_template_.template
-            variables = track_template_.variables
-            self._info[template] = info = template.async_render_to_info(variables)
+            self._info[template] = info = self._async_render_to_info(track_template_)
 
             if info.exception:
                 if raise_on_template_error:
@@ -771,9 +988,10 @@ class _TrackTemplateResultInfo:
                     track_template_.template,
                     exc_info=info.exception,
                 )
+            self._async_index_template(template)
 
         self._track_state_changes = async_track_state_change_filtered(
-            self.hass, _render_infos_to_track_states(self._info.values()), self._refresh
+            self.hass, self._listener_index.async_track_states(), self._refresh
         )
         self._update_time_listeners()
         _LOGGER.debug(
@@ -835,6 +1053,39 @@ class _TrackTemplateResultInfo:
         """Force recalculate the template."""
         self._refresh(None)
 
+    @callback
+    def _async_render_to_info(self, track_template_: TrackTemplate) -> RenderInfo:
+        """Render a template on behalf of the owner of the tracker."""
+        token = template_owner.set(self._owner)
+        try:
+            return track_template_.template.async_render_to_info(
+                track_template_.variables
+            )
+        finally:
+            template_owner.reset(token)
+
+    @callback
+    def _async_index_template(self, template: Template) -> bool:
+        """Index the states the last render of a template depends on.
+
+        Returns True if the state change listeners must be updated.
+        """
+        info = self._info[template]
+        self._render_index.async_update(template, info)
+        if self._rate_limit.async_has_timer(template):
+            info = _suppress_domain_all_in_render_info(info)
+        return self._listener_index.async_update(template, info)
+
+    @callback
+    def _async_track_templates_for(self, event: Event) -> List[TrackTemplate]:
+        """Return the tracked templates that may depend on the event, in order."""
+        templates = self._render_index.async_templates_for(event.data[ATTR_ENTITY_ID])
+        return [
+            track_template_
+            for template in sorted(templates, key=self._template_positions.get)
+            for track_template_ in self._track_templates_by_template[template]
+        ]
+
     def _render_template_if_ready(
         self,
         track_template_: TrackTemplate,
@@ -870,6 +1121,9 @@ class _TrackTemplateResultInfo:
                 (track_template_,),
                 True,
             ):
+                timings = self.hass.data.get(DATA_TEMPLATE_TIMINGS)
+                if timings is not None:
+                    timings.record_rate_limited(template.template, self._owner)
                 return not had_timer
 
             _LOGGER.debug(
@@ -879,9 +1133,7 @@ class _TrackTemplateResultInfo:
             )
 
         self._rate_limit.async_triggered(template, now)
-        self._info[template] = info = template.async_render_to_info(
-            track_template_.variables
-        )
+        self._info[template] = info = self._async_render_to_info(track_template_)
 
         try:
             result: Union[str, TemplateError] = info.result()
@@ -912,17 +1164,24 @@ class _TrackTemplateResultInfo:
         to be considered.
 
         track_templates is an optional list of TrackTemplate objects
-        to refresh.  If not provided, all tracked templates will be
-        considered.
+        to refresh.  If not provided, the tracked templates depending
+        on the entity of the event, or all of them without an event,
+        will be considered.
 
         replayed is True if the event is being replayed because the
         rate limit was hit.
         """
         updates = []
-        info_changed = False
+        listeners_changed = False
         now = event.time_fired if not replayed and event else dt_util.utcnow()
 
-        for track_template_ in track_templates or self._track_templates:
+        if track_templates is None:
+            if event is None:
+                track_templates = self._track_templates
+            else:
+                track_templates = self._async_track_templates_for(event)
+
+        for track_template_ in track_templates:
             update = self._render_template_if_ready(track_template_, now, event)
             if not update:
                 continue
@@ -930,22 +1189,16 @@ class _TrackTemplateResultInfo:
             template = track_template_.template
             self._setup_time_listener(template, self._info[template].has_time)
 
-            info_changed = True
+            if self._async_index_template(template):
+                listeners_changed = True
 
             if isinstance(update, TrackTemplateResult):
                 updates.append(update)
 
-        if info_changed:
+        if listeners_changed:
             assert self._track_state_changes
             self._track_state_changes.async_update_listeners(
-                _render_infos_to_track_states(
-                    [
-                        _suppress_domain_all_in_render_info(self._info[template])
-                        if self._rate_limit.async_has_timer(template)
-                        else self._info[template]
-                        for template in self._info
-                    ]
-                )
+                self._listener_index.async_track_states()
             )
             _LOGGER.debug(
                 "Template group %s listens for %s",
@@ -962,6 +1215,16 @@ class _TrackTemplateResultInfo:
         self.hass.async_run_hass_job(self._job, event, updates)
 
 
+def _template_tracker_owner(action: Callable) -> Optional[str]:
+    """Return who tracks templates, the entity of the action if it has one."""
+    entity_id: Optional[str] = getattr(
+        getattr(action, "__self__", None), "entity_id", None
+    )
+    if entity_id is not None:
+        return entity_id
+    return template_owner.get() or target_name(action)
+
+
 TrackTemplateResultListener = Callable[
     [
         Event,
@@ -1097,6 +1360,134 @@ def async_track_same_state(
 track_same_state = threaded_listener_factory(async_track_same_state)
 
 
+class _WheelTimer:
+    """A time listener waiting in the timer wheel."""
+
+    __slots__ = ("when", "utc_point_in_time", "job")
+
+    def __init__(self, utc_point_in_time: datetime, job: HassJob) -> None:
+        """Initialize the timer."""
+        self.when = utc_point_in_time.timestamp()
+        self.utc_point_in_time = utc_point_in_time
+        self.job = job
+
+
+class _TimerWheel:
+    """Run all the time listeners from a single loop timer.
+
+    The listeners are kept in buckets of a second and the buckets are ordered
+    by a heap of their seconds. Adding or cancelling a listener in an existing
+    bucket is O(1) and the loop only wakes up when a listener is due.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the timer wheel."""
+        self.hass = hass
+        self._buckets: Dict[int, Dict[_WheelTimer, None]] = {}
+        # The seconds of the buckets, may hold the seconds of removed buckets
+        self._seconds: List[int] = []
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._next_when: Optional[float] = None
+
+    @callback
+    def async_add(self, job: HassJob, utc_point_in_time: datetime) -> CALLBACK_TYPE:
+        """Run a job at a point in UTC time."""
+        timer = _WheelTimer(utc_point_in_time, job)
+        second = int(timer.when)
+        bucket = self._buckets.get(second)
+        if bucket is None:
+            bucket = self._buckets[second] = {}
+            heapq.heappush(self._seconds, second)
+        bucket[timer] = None
+
+        if self._next_when is None or timer.when < self._next_when:
+            self._async_schedule(timer.when, time.time())
+
+        @callback
+        def cancel() -> None:
+            """Cancel the timer."""
+            self._async_cancel(second, timer)
+
+        return cancel
+
+    @callback
+    def _async_cancel(self, second: int, timer: _WheelTimer) -> None:
+        """Remove a timer that did not run yet."""
+        bucket = self._buckets.get(second)
+        if bucket is None or timer not in bucket:
+            return
+        del bucket[timer]
+        if bucket:
+            return
+        del self._buckets[second]
+        # Drop the seconds of the removed buckets once they are the majority
+        if len(self._seconds) > 2 * len(self._buckets) + 64:
+            self._seconds = list(self._buckets)
+            heapq.heapify(self._seconds)
+
+    @callback
+    def _async_schedule(self, when: float, now: float) -> None:
+        """Wake up at a UTC timestamp, now is the current UTC timestamp."""
+        if self._handle is not None:
+            self._handle.cancel()
+        self._next_when = when
+        self._handle = self.hass.loop.call_later(when - now, self._async_run_due)
+
+    @callback
+    def _async_run_due(self) -> None:
+        """Run the timers that are due."""
+        self._handle = None
+        self._next_when = None
+        now = time_tracker_utcnow().timestamp()
+        seconds = self._seconds
+        due: List[_WheelTimer] = []
+
+        while seconds:
+            bucket = self._buckets.get(seconds[0])
+            if bucket is None:
+                heapq.heappop(seconds)
+                continue
+            if seconds[0] > now:
+                break
+            for timer in [timer for timer in bucket if timer.when <= now]:
+                del bucket[timer]
+                due.append(timer)
+            # Depending on the available clock support (including timer
+            # hardware and the OS kernel) it can happen that we wake up a
+            # little bit too early, the rest of the bucket is not due yet
+            if bucket:
+                break
+            del self._buckets[heapq.heappop(seconds)]
+
+        # Rearm for the remaining time as measured by the clock the timers
+        # were checked against, so timers that were missed or drifted because
+        # the clock jumped are still run at their point in time
+        if seconds:
+            bucket = self._buckets[seconds[0]]
+            self._async_schedule(min(timer.when for timer in bucket), now)
+
+        due.sort(key=lambda timer: timer.when)
+        for timer in due:
+            try:
+                self.hass.async_run_hass_job(timer.job, timer.utc_point_in_time)
+            except Exception as err:  # pylint: disable=broad-except
+                self.hass.loop.call_exception_handler(
+                    {
+                        "message": f"Exception in time listener {timer.job}",
+                        "exception": err,
+                    }
+                )
+
+
+@callback
+def _async_get_timer_wheel(hass: HomeAssistant) -> _TimerWheel:
+    """Return the timer wheel of the instance."""
+    wheel: Optional[_TimerWheel] = hass.data.get(TIMER_WHEEL)
+    if wheel is None:
+        wheel = hass.data[TIMER_WHEEL] = _TimerWheel(hass)
+    return wheel
+
+
 @callback
 @bind_hass
 def async_track_point_in_time(
@@ -1134,39 +1525,7 @@ def async_track_point_in_utc_time(
     # having to figure out how to call the action every time its called.
     job = action if isinstance(action, HassJob) else HassJob(action)
 
-    cancel_callback: Optional[asyncio.TimerHandle] = None
-
-    @callback
-    def run_action() -> None:
-        """Call the action."""
-        nonlocal cancel_callback
-
-        now = time_tracker_utcnow()
-
-        # Depending on the available clock support (including timer hardware
-        # and the OS kernel) it can happen that we fire a little bit too early
-        # as measured by utcnow(). That is bad when callbacks have assumptions
-        # about the current time. Thus, we rearm the timer for the remaining
-        # time.
-        delta = (utc_point_in_time - now).total_seconds()
-        if delta > 0:
-            _LOGGER.debug("Called %f seconds too early, rearming", delta)
-
-            cancel_callback = hass.loop.call_later(delta, run_action)
-            return
-
-        hass.async_run_hass_job(job, utc_point_in_time)
-
-    delta = utc_point_in_time.timestamp() - time.time()
-    cancel_callback = hass.loop.call_later(delta, run_action)
-
-    @callback
-    def unsub_point_in_time_listener() -> None:
-        """Cancel the call_later."""
-        assert cancel_callback is not None
-        cancel_callback.cancel()
-
-    return unsub_point_in_time_listener
+    return _async_get_timer_wheel(hass).async_add(job, utc_point_in_time)
 
 
 track_point_in_utc_time = threaded_listener_factory(async_track_point_in_utc_time)
@@ -1332,7 +1691,8 @@ def async_track_utc_time_change(
 
     job = HassJob(action)
     # We do not have to wrap the function with time pattern matching logic
-    # if no pattern given
+    # if no pattern given. The core timer only ticks while there are such
+    # listeners, they are kept off the timer wheel.
     if all(val is None for val in (hour, minute, second)):
 
         @callback
@@ -1415,24 +1775,6 @@ def process_state_match(
     return lambda state: state in parameter_set
 
 
-@callback
-def _entities_domains_from_render_infos(
-    render_infos: Iterable[RenderInfo],
-) -> Tuple[Set, Set]:
-    """Combine from multiple RenderInfo."""
-    entities = set()
-    domains = set()
-
-    for render_info in render_infos:
-        if render_info.entities:
-            entities.update(render_info.entities)
-        if render_info.domains:
-            domains.update(render_info.domains)
-        if render_info.domains_lifecycle:
-            domains.update(render_info.domains_lifecycle)
-    return entities, domains
-
-
 @callback
 def _render_infos_needs_all_listener(render_infos: Iterable[RenderInfo]) -> bool:
     """Determine if an all listener is needed from RenderInfo."""
@@ -1450,15 +1792,6 @@ def _render_infos_needs_all_listener(render_infos: Iterable[RenderInfo]) -> bool
     return False
 
 
-@callback
-def _render_infos_to_track_states(render_infos: Iterable[RenderInfo]) -> TrackStates:
-    """Create a TrackStates dataclass from the latest RenderInfo."""
-    if _render_infos_needs_all_listener(render_infos):
-        return TrackStates(True, set(), set())
-
-    return TrackStates(False, *_entities_domains_from_render_infos(render_infos))
-
-
 @callback
 def _event_triggers_rerender(event: Event, info: RenderInfo) -> bool:
     """Determine if a template should be re-rendered from an event."""
@@ -3,6 +3,14 @@ from datetime import datetime
 import json
 from typing import Any
 
+from homeassistant.util.json_backend import (  # noqa: F401
+    JSON_BACKEND,
+    json_bytes,
+    json_dumps,
+    json_encoder_default,
+    json_loads,
+)
+
 
 class JSONEncoder(json.JSONEncoder):
     """JSONEncoder that supports Home Assistant objects."""
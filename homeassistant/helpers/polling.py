@@ -0,0 +1,176 @@
+"""Poll the entities of all the entity platforms from a shared scheduler."""
+import asyncio
+from datetime import datetime
+import math
+import random
+from typing import TYPE_CHECKING, Any, Dict, Optional, Set
+
+from homeassistant.core import CALLBACK_TYPE, HassJob, callback
+from homeassistant.helpers.typing import HomeAssistantType
+from homeassistant.util import dt as dt_util
+
+from .event import async_track_point_in_utc_time
+
+if TYPE_CHECKING:
+    from .entity_platform import EntityPlatform
+
+
+DATA_POLLING_SCHEDULER = "polling_scheduler"
+
+# Polls that are due within the same window run as one batch
+BATCH_WINDOW = 1.0  # seconds
+
+# Delay the first poll of a platform by up to this share of its interval
+# so that platforms set up together do not poll together
+JITTER = 0.1
+
+# How many platforms poll at once. Platforms updating their entities in the
+# executor update one entity at a time unless they set PARALLEL_UPDATES.
+MAX_PARALLEL_POLLS = 8
+
+
+class PollStats:
+    """Poll count, duration and overruns of the platforms of an integration."""
+
+    __slots__ = ("polls", "overruns", "last_duration", "max_duration", "total_duration")
+
+    def __init__(self) -> None:
+        """Initialize the stats."""
+        self.polls = 0
+        self.overruns = 0
+        self.last_duration: Optional[float] = None
+        self.max_duration = 0.0
+        self.total_duration = 0.0
+
+    def record(self, duration: float) -> None:
+        """Record how long a poll took, waiting for its turn included."""
+        self.polls += 1
+        self.last_duration = duration
+        self.max_duration = max(self.max_duration, duration)
+        self.total_duration += duration
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the stats as a dict."""
+        return {
+            "polls": self.polls,
+            "overruns": self.overruns,
+            "last_duration": self.last_duration,
+            "max_duration": self.max_duration,
+            "mean_duration": self.total_duration / self.polls if self.polls else None,
+        }
+
+
+class PollingScheduler:
+    """Poll the entity platforms in batches with a shared budget.
+
+    The polls of all platforms are aligned on batch windows so that the loop
+    wakes up once per batch. At most max_parallel_polls platforms poll at
+    once, the other due platforms wait for their turn.
+    """
+
+    def __init__(
+        self, hass: HomeAssistantType, max_parallel_polls: int = MAX_PARALLEL_POLLS
+    ) -> None:
+        """Initialize the polling scheduler."""
+        self.hass = hass
+        self._semaphore = asyncio.Semaphore(max_parallel_polls)
+        self._due: Dict["EntityPlatform", float] = {}
+        self._polling: Set["EntityPlatform"] = set()
+        self._stats: Dict[str, PollStats] = {}
+        self._next_batch: Optional[float] = None
+        self._unsub_timer: Optional[CALLBACK_TYPE] = None
+        self._job = HassJob(self._async_run_batch)
+
+    @callback
+    def async_add(self, platform: "EntityPlatform") -> CALLBACK_TYPE:
+        """Poll a platform every scan interval until removed."""
+        interval = platform.scan_interval.total_seconds()
+        first_poll = (
+            dt_util.utcnow().timestamp()
+            + interval
+            + random.uniform(0, interval * JITTER)
+        )
+        due = self._due[platform] = _align(first_poll)
+        if self._next_batch is None or due < self._next_batch:
+            self._async_schedule(due)
+
+        @callback
+        def remove() -> None:
+            """Stop polling the platform."""
+            self._due.pop(platform, None)
+
+        return remove
+
+    @callback
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        """Return the poll stats by integration and domain."""
+        return {key: stats.as_dict() for key, stats in sorted(self._stats.items())}
+
+    @callback
+    def _async_schedule(self, batch: float) -> None:
+        """Run the batch starting at a UTC timestamp."""
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+        self._next_batch = batch
+        self._unsub_timer = async_track_point_in_utc_time(
+            self.hass, self._job, dt_util.utc_from_timestamp(batch)
+        )
+
+    @callback
+    def _async_run_batch(self, now: datetime) -> None:
+        """Poll the platforms that are due."""
+        self._unsub_timer = None
+        self._next_batch = None
+        timestamp = now.timestamp()
+
+        for platform, due in list(self._due.items()):
+            if due > timestamp:
+                continue
+            # Keep the phase of the platform unless it fell behind
+            interval = platform.scan_interval.total_seconds()
+            self._due[platform] = _align(max(due + interval, timestamp + interval))
+            self.hass.async_create_task(self._async_poll(platform, now))
+
+        if self._due:
+            self._async_schedule(min(self._due.values()))
+
+    async def _async_poll(self, platform: "EntityPlatform", now: datetime) -> None:
+        """Poll a platform once it has its turn."""
+        # pylint: disable=protected-access
+        key = f"{platform.platform_name}.{platform.domain}"
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = PollStats()
+
+        if platform in self._polling:
+            stats.overruns += 1
+            platform.logger.warning(
+                "Updating %s %s took longer than the scheduled update interval %s",
+                platform.platform_name,
+                platform.domain,
+                platform.scan_interval,
+            )
+            return
+
+        self._polling.add(platform)
+        start = self.hass.loop.time()
+        try:
+            async with self._semaphore:
+                await platform._update_entity_states(now)
+        finally:
+            self._polling.discard(platform)
+            stats.record(self.hass.loop.time() - start)
+
+
+def _align(timestamp: float) -> float:
+    """Return the start of the first batch window at or after a timestamp."""
+    return math.ceil(timestamp / BATCH_WINDOW) * BATCH_WINDOW
+
+
+@callback
+def async_get_polling_scheduler(hass: HomeAssistantType) -> PollingScheduler:
+    """Return the polling scheduler of the instance."""
+    scheduler: Optional[PollingScheduler] = hass.data.get(DATA_POLLING_SCHEDULER)
+    if scheduler is None:
+        scheduler = hass.data[DATA_POLLING_SCHEDULER] = PollingScheduler(hass)
+    return scheduler
@@ -64,6 +64,7 @@ from homeassistant.core import (
 from homeassistant.helpers import condition, config_validation as cv, service, template
 from homeassistant.helpers.event import async_call_later, async_track_template
 from homeassistant.helpers.script_variables import ScriptVariables
+from homeassistant.helpers.template_timing import template_owner
 from homeassistant.helpers.trigger import (
     async_initialize_triggers,
     async_validate_trigger_config,
@@ -236,6 +237,12 @@ class _ScriptRun:
 
     async def async_run(self) -> None:
         """Run script."""
+        # The templates rendered by a top level run are its own
+        owner_token = None
+        if self._script._top_level:  # pylint: disable=protected-access
+            owner_token = template_owner.set(
+                f"{self._script.domain}: {self._script.name}"
+            )
         try:
             if self._stop.is_set():
                 return
@@ -248,6 +255,8 @@ class _ScriptRun:
             pass
         finally:
             self._finish()
+            if owner_token is not None:
+                template_owner.reset(owner_token)
 
     async def _async_step(self, log_exceptions):
         try:
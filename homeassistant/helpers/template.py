@@ -2,18 +2,32 @@
 from ast import literal_eval
 import asyncio
 import base64
+from collections import OrderedDict
 import collections.abc
 from datetime import datetime, timedelta
 from functools import partial, wraps
 import json
 import logging
 import math
+import operator
 from operator import attrgetter
 import random
 import re
-from typing import Any, Dict, Generator, Iterable, Optional, Type, Union, cast
+import threading
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
 from urllib.parse import urlencode as urllib_urlencode
-import weakref
 
 import jinja2
 from jinja2 import contextfilter, contextfunction
@@ -32,6 +46,7 @@ from homeassistant.const import (
 from homeassistant.core import State, callback, split_entity_id, valid_entity_id
 from homeassistant.exceptions import TemplateError
 from homeassistant.helpers import location as loc_helper
+from homeassistant.helpers.template_timing import DATA_TEMPLATE_TIMINGS, template_owner
 from homeassistant.helpers.typing import HomeAssistantType, TemplateVarsType
 from homeassistant.loader import bind_hass
 from homeassistant.util import convert, dt as dt_util, location as loc_util
@@ -51,6 +66,25 @@ _RE_JINJA_DELIMITERS = re.compile(r"\{%|\{\{|\{#")
 # Match "simple" ints and floats. -1.0, 1, +5, 5.0
 _IS_NUMERIC = re.compile(r"^[+-]?(?!0\d)\d*(?:\.\d*)?$")
 
+# Trivial templates rendered without Jinja
+_FAST_STATES = re.compile(r"^\{\{\s*states\(\s*(['\"])([^'\"\\]+)\1\s*\)\s*\}\}$")
+_FAST_STATE_ATTR = re.compile(
+    r"^\{\{\s*state_attr\(\s*(['\"])([^'\"\\]+)\1\s*,"
+    r"\s*(['\"])([^'\"\\]+)\3\s*\)\s*\}\}$"
+)
+_FAST_VALUE_JSON = re.compile(
+    r"^\{\{\s*value_json((?:\.[A-Za-z_][A-Za-z0-9_]*)+)\s*\}\}$"
+)
+_FAST_VALUE_FLOAT = re.compile(
+    r"^\{\{\s*value\s*\|\s*float(?:\s*([-+*/])\s*(\d+(?:\.\d+)?))?\s*\}\}$"
+)
+_FAST_OPERATORS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+}
+
 _RESERVED_NAMES = {"contextfunction", "evalcontextfunction", "environmentfunction"}
 
 _GROUP_DOMAIN_PREFIX = "group."
@@ -66,6 +100,9 @@ _COLLECTABLE_STATE_ATTRIBUTES = {
     "name",
 }
 
+# Compiled template code kept across Template instances and reloads
+COMPILED_CACHE_SIZE = 4096
+
 ALL_STATES_RATE_LIMIT = timedelta(minutes=1)
 DOMAIN_STATES_RATE_LIMIT = timedelta(seconds=1)
 
@@ -282,6 +319,7 @@ class Template:
         "_compiled_code",
         "_compiled",
         "_limited",
+        "_fast_render",
     )
 
     def __init__(self, template, hass=None):
@@ -295,6 +333,9 @@ class Template:
         self.hass = hass
         self.is_static = not is_template_string(template)
         self._limited = None
+        self._fast_render: Optional[
+            Callable[[HomeAssistantType, Dict[str, Any]], Any]
+        ] = None
 
     @property
     def _env(self) -> "TemplateEnvironment":
@@ -355,13 +396,14 @@ class Template:
                 return self.template
             return self._parse_result(self.template)
 
-        compiled = self._compiled or self._ensure_compiled(limited)
+        if self._compiled is None:
+            self._ensure_compiled(limited)
 
         if variables is not None:
             kwargs.update(variables)
 
         try:
-            render_result = compiled.render(kwargs)
+            render_result = self._render_compiled(kwargs)
         except Exception as err:  # pylint: disable=broad-except
             raise TemplateError(err) from err
 
@@ -519,7 +561,7 @@ class Template:
             pass
 
         try:
-            return self._compiled.render(variables).strip()
+            return self._render_compiled(variables).strip()
         except jinja2.TemplateError as ex:
             if error_value is _SENTINEL:
                 _LOGGER.error(
@@ -530,6 +572,23 @@ class Template:
                 )
             return value if error_value is _SENTINEL else error_value
 
+    def _render_compiled(self, variables: Dict[str, Any]) -> str:
+        """Render the compiled template, without Jinja if it is trivial."""
+        timings = self.hass.data.get(DATA_TEMPLATE_TIMINGS)
+        if timings is not None:
+            start = time.perf_counter()
+        try:
+            if self._fast_render is not None:
+                render_result = self._fast_render(self.hass, variables)
+                if render_result is not _SENTINEL:
+                    return cast(str, render_result)
+            return cast(Template, self._compiled).render(variables)
+        finally:
+            if timings is not None:
+                timings.record(
+                    self.template, template_owner.get(), time.perf_counter() - start
+                )
+
     def _ensure_compiled(self, limited: bool = False) -> "Template":
         """Bind a template to a specific hass instance."""
         self.ensure_valid()
@@ -546,6 +605,7 @@ class Template:
             Template,
             jinja2.Template.from_code(env, self._compiled_code, env.globals, None),
         )
+        self._fast_render = _fast_renderer(self.template, env, limited)
 
         return self._compiled
 
@@ -566,6 +626,79 @@ class Template:
         return 'Template("' + self.template + '")'
 
 
+def _fast_renderer(
+    source: str, env: "TemplateEnvironment", limited: bool
+) -> Optional[Callable[[HomeAssistantType, Dict[str, Any]], Any]]:
+    """Return a function rendering a trivial template without Jinja.
+
+    The function renders the same output as Jinja and collects the same
+    render info. It returns _SENTINEL for variables it cannot render like
+    Jinja would, the template is then rendered by Jinja.
+    """
+    match = _FAST_STATES.match(source)
+    if match is not None and not limited:
+        entity_id = match.group(2)
+
+        def render_states(hass, variables):
+            if "states" in variables:
+                return _SENTINEL
+            state = _get_state(hass, entity_id)
+            return STATE_UNKNOWN if state is None else state.state
+
+        return render_states
+
+    match = _FAST_STATE_ATTR.match(source)
+    if match is not None and not limited:
+        entity_id, name = match.group(2), match.group(4)
+
+        def render_state_attr(hass, variables):
+            if "state_attr" in variables:
+                return _SENTINEL
+            return str(state_attr(hass, entity_id, name))
+
+        return render_state_attr
+
+    match = _FAST_VALUE_JSON.match(source)
+    if match is not None:
+        keys = match.group(1)[1:].split(".")
+        # Jinja returns the attribute of the dict, not the item, for these
+        if any(key.startswith("_") or hasattr(dict, key) for key in keys):
+            return None
+
+        def render_value_json(hass, variables):
+            value = variables.get("value_json")
+            for key in keys:
+                if type(value) is not dict or key not in value:
+                    return _SENTINEL
+                value = value[key]
+            return str(value)
+
+        return render_value_json
+
+    match = _FAST_VALUE_FLOAT.match(source)
+    if match is not None:
+        to_float = env.filters["float"]
+        symbol, number = match.groups()
+        operation = _FAST_OPERATORS.get(symbol)
+        if number is not None:
+            operand = float(number) if "." in number else int(number)
+
+        def render_value_float(hass, variables):
+            if "value" not in variables:
+                return _SENTINEL
+            value = to_float(variables["value"])
+            if operation is None:
+                return str(value)
+            try:
+                return str(operation(value, operand))
+            except ArithmeticError:
+                return _SENTINEL
+
+        return render_value_float
+
+    return None
+
+
 class AllStates:
     """Class to expose all HA states as attributes."""
 
@@ -1307,6 +1440,61 @@ def urlencode(value):
     return urllib_urlencode(value).encode("utf-8")
 
 
+class CompiledCodeCache:
+    """Least recently used cache of compiled template code.
+
+    The code compiled from a source does not depend on the instance, so it is
+    shared by all the environments of the process. Limited templates are kept
+    apart as they compile against the environment without hass.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        """Initialize the cache."""
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._code: "OrderedDict[Tuple[str, bool], Any]" = OrderedDict()
+
+    def get(self, source: str, limited: bool) -> Any:
+        """Return the code compiled from a source, if cached."""
+        key = (source, limited)
+        with self._lock:
+            code = self._code.get(key)
+            if code is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._code.move_to_end(key)
+            return code
+
+    def set(self, source: str, limited: bool, code: Any) -> None:
+        """Cache the code compiled from a source."""
+        with self._lock:
+            self._code[(source, limited)] = code
+            if len(self._code) > self.maxsize:
+                self._code.popitem(last=False)
+
+    def clear(self) -> None:
+        """Empty the cache and reset its statistics."""
+        with self._lock:
+            self._code.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        """Return the size and statistics of the cache."""
+        return {
+            "size": len(self._code),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+COMPILED_CODE_CACHE = CompiledCodeCache(COMPILED_CACHE_SIZE)
+
+
 class TemplateEnvironment(ImmutableSandboxedEnvironment):
     """The Home Assistant template environment."""
 
@@ -1314,7 +1502,6 @@ class TemplateEnvironment(ImmutableSandboxedEnvironment):
         """Initialise template environment."""
         super().__init__()
         self.hass = hass
-        self.template_cache = weakref.WeakValueDictionary()
         self.filters["round"] = forgiving_round
         self.filters["multiply"] = multiply
         self.filters["log"] = logarithm
@@ -1446,10 +1633,12 @@ class TemplateEnvironment(ImmutableSandboxedEnvironment):
             # any instance of this.
             return super().compile(source, name, filename, raw, defer_init)
 
-        cached = self.template_cache.get(source)
+        limited = self.hass is None
+        cached = COMPILED_CODE_CACHE.get(source, limited)
 
         if cached is None:
-            cached = self.template_cache[source] = super().compile(source)
+            cached = super().compile(source)
+            COMPILED_CODE_CACHE.set(source, limited, cached)
 
         return cached
 
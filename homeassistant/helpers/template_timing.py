@@ -0,0 +1,71 @@
+"""Timing of the template renders.
+
+Records how often each template renders, how long it takes and how often
+its renders are deferred by a rate limit, per template source and owner. The
+owner is the entity, automation or script rendering the template. Only used
+when started as it adds a timer around every render.
+"""
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+DATA_TEMPLATE_TIMINGS = "template_timings"
+
+# The entity, automation or script rendering templates
+template_owner: ContextVar[Optional[str]] = ContextVar("template_owner", default=None)
+
+
+class RenderTimings:
+    """Render count, durations and rate limit hits of a template."""
+
+    __slots__ = ("count", "total", "max", "rate_limited")
+
+    def __init__(self) -> None:
+        """Initialize the timings."""
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rate_limited = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the timings as a dict."""
+        return {
+            "count": self.count,
+            "total": self.total,
+            "max": self.max,
+            "rate_limited": self.rate_limited,
+        }
+
+
+class TemplateTimings:
+    """Timings of the template renders by template source and owner."""
+
+    def __init__(self) -> None:
+        """Initialize the template timings."""
+        self._templates: Dict[Tuple[str, Optional[str]], RenderTimings] = {}
+
+    def _get(self, source: str, owner: Optional[str]) -> RenderTimings:
+        """Return the timings of a template rendered by an owner."""
+        timings = self._templates.get((source, owner))
+        if timings is None:
+            timings = self._templates[(source, owner)] = RenderTimings()
+        return timings
+
+    def record(self, source: str, owner: Optional[str], duration: float) -> None:
+        """Record a render of a template."""
+        timings = self._get(source, owner)
+        timings.count += 1
+        timings.total += duration
+        timings.max = max(timings.max, duration)
+
+    def record_rate_limited(self, source: str, owner: Optional[str]) -> None:
+        """Record a render of a template deferred by its rate limit."""
+        self._get(source, owner).rate_limited += 1
+
+    def as_dict(self) -> List[Dict[str, Any]]:
+        """Return the timings, the slowest templates first."""
+        return [
+            {"template": source, "owner": owner, **timings.as_dict()}
+            for (source, owner), timings in sorted(
+                self._templates.items(), key=lambda item: item[1].total, reverse=True
+            )
+        ]
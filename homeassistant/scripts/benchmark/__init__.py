@@ -3,17 +3,23 @@ import argparse
 import asyncio
 import collections
 from contextlib import suppress
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 import logging
 from timeit import default_timer as timer
+import tracemalloc
 from typing import Callable, Dict, TypeVar
 
 from homeassistant import core
 from homeassistant.components.websocket_api.const import JSON_DUMP
-from homeassistant.const import ATTR_NOW, EVENT_STATE_CHANGED, EVENT_TIME_CHANGED
+from homeassistant.const import (
+    ATTR_NOW,
+    EVENT_STATE_CHANGED,
+    EVENT_TIME_CHANGED,
+    MATCH_ALL,
+)
 from homeassistant.helpers.entityfilter import convert_include_exclude_filter
-from homeassistant.helpers.json import JSONEncoder
+from homeassistant.helpers.json import JSON_BACKEND, JSONEncoder, json_dumps
 from homeassistant.util import dt as dt_util
 
 # mypy: allow-untyped-calls, allow-untyped-defs, no-check-untyped-defs
@@ -85,6 +91,49 @@ async def fire_events(hass):
     return timer() - start
 
 
+@benchmark
+async def bus_throughput(hass):
+    """Fire a million state changed events to several listeners."""
+    count = 0
+    listeners = 5
+    event = asyncio.Event()
+
+    @core.callback
+    def listener(_):
+        """Handle event."""
+        nonlocal count
+        count += 1
+
+        if count == listeners * 10 ** 6:
+            event.set()
+
+    @core.callback
+    def match_all_listener(_):
+        """Handle all events."""
+
+    hass.bus.async_listen(MATCH_ALL, match_all_listener)
+    for _ in range(listeners):
+        hass.bus.async_listen(EVENT_STATE_CHANGED, listener)
+
+    event_data = {
+        "entity_id": "light.kitchen",
+        "old_state": core.State("light.kitchen", "off"),
+        "new_state": core.State("light.kitchen", "on"),
+    }
+
+    # Include the time to fire the events
+    start = timer()
+
+    for _ in range(10 ** 6):
+        hass.bus.async_fire(EVENT_STATE_CHANGED, event_data)
+
+    await event.wait()
+
+    runtime = timer() - start
+    print(f"{10 ** 6 / runtime:.0f} events/s")
+    return runtime
+
+
 @benchmark
 async def time_changed_helper(hass):
     """Run a million events through time changed helper."""
@@ -113,6 +162,38 @@ async def time_changed_helper(hass):
     return timer() - start
 
 
+@benchmark
+async def point_in_time_helper(hass):
+    """Run 100,000 time listeners through the timer wheel, half cancelled."""
+    count = 0
+    listeners = 10 ** 5
+    event = asyncio.Event()
+
+    @core.callback
+    def listener(_):
+        """Handle time."""
+        nonlocal count
+        count += 1
+
+        if count == listeners // 2:
+            event.set()
+
+    start = timer()
+
+    # Already due, so they all run on the next iteration of the loop
+    point_in_time = dt_util.utcnow() - timedelta(seconds=1)
+    for index in range(listeners):
+        unsub = hass.helpers.event.async_track_point_in_utc_time(
+            listener, point_in_time + timedelta(microseconds=index)
+        )
+        if index % 2:
+            unsub()
+
+    await event.wait()
+
+    return timer() - start
+
+
 @benchmark
 async def state_changed_helper(hass):
     """Run a million events through state changed helper with 1000 entities."""
@@ -301,6 +382,41 @@ async def filtering_entity_id(hass):
     return timer() - start
 
 
+@benchmark
+async def state_memory(hass):
+    """Measure the memory held by the states of 10,000 changing entities."""
+    entities = 10 ** 4
+    updates = 10
+    # Keep every state like the integrations tracking history do
+    states = []
+
+    @core.callback
+    def listener(event):
+        """Handle event."""
+        states.append(event.data["new_state"])
+
+    hass.bus.async_listen(EVENT_STATE_CHANGED, listener)
+
+    tracemalloc.start()
+    start = timer()
+    before = tracemalloc.get_traced_memory()[0]
+
+    for update in range(updates):
+        for entity in range(entities):
+            hass.states.async_set(
+                f"sensor.power_{entity}",
+                str(update),
+                {"friendly_name": f"Power {entity}", "unit_of_measurement": "W"},
+            )
+        await hass.async_block_till_done()
+
+    used = tracemalloc.get_traced_memory()[0] - before
+    runtime = timer() - start
+    tracemalloc.stop()
+    print(f"{used / len(states):.0f} bytes per state")
+    return runtime
+
+
 @benchmark
 async def valid_entity_id(hass):
     """Run valid entity ID a million times."""
@@ -323,6 +439,32 @@ async def json_serialize_states(hass):
     return timer() - start
 
 
+@benchmark
+async def json_serialize_get_states(hass):
+    """Serialize the get_states result of 5,000 entities with both JSON backends."""
+    states = [
+        core.State(
+            f"sensor.power_{entity}",
+            "12.5",
+            {"friendly_name": f"Power {entity}", "unit_of_measurement": "W"},
+        )
+        for entity in range(5000)
+    ]
+    message = {"id": 1, "type": "result", "success": True, "result": states}
+
+    start = timer()
+    for _ in range(10):
+        json.dumps(message, cls=JSONEncoder, allow_nan=False)
+    print(f"json: {timer() - start}s")
+
+    start = timer()
+    for _ in range(10):
+        json_dumps(message)
+    runtime = timer() - start
+    print(f"{JSON_BACKEND}: {runtime}s")
+    return runtime
+
+
 def _create_state_changed_event_from_old_new(
     entity_id, event_time_fired, old_state, new_state
 ):
@@ -359,6 +501,12 @@ def _create_state_changed_event_from_old_new(
     row.domain = entity_id and core.split_entity_id(entity_id)[0]
     row.context_id = None
     row.context_user_id = None
+    row.context_parent_id = None
+    row.context_id_bin = None
+    row.context_user_id_bin = None
+    row.context_parent_id_bin = None
+    row.shared_attrs = None
+    row.shared_data = None
     row.old_state_id = old_state and 1
     row.state_id = new_state and 1
 
@@ -0,0 +1,213 @@
+"""Timing of the jobs run by Home Assistant.
+
+Records how often each job target runs and how long it takes, and how late
+the event loop runs its callbacks. Only used when enabled on the instance as
+it adds a timer around every job.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Coroutine
+import functools
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+# Durations kept per target to compute the percentiles
+DURATION_SAMPLES = 1000
+
+# How often the lag of the event loop is measured
+LOOP_LAG_INTERVAL = 1.0
+LOOP_LAG_SAMPLES = 300
+
+JOB_TYPE_CALLBACK = "callback"
+JOB_TYPE_COROUTINE = "coroutine"
+JOB_TYPE_EXECUTOR = "executor"
+
+
+def target_name(target: Callable) -> str:
+    """Return the name of a job target."""
+    while isinstance(target, functools.partial):
+        target = target.func
+    qualname = getattr(target, "__qualname__", None)
+    if qualname is None:
+        return repr(target)
+    return f"{getattr(target, '__module__', None)}.{qualname}"
+
+
+def percentile(samples: List[float], fraction: float) -> Optional[float]:
+    """Return the percentile of samples, nearest rank."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class TargetTimings:
+    """Call count and durations of a job target."""
+
+    __slots__ = ("job_type", "count", "total", "durations")
+
+    def __init__(self, job_type: str) -> None:
+        """Initialize the timings."""
+        self.job_type = job_type
+        self.count = 0
+        self.total = 0.0
+        self.durations: Deque[float] = deque(maxlen=DURATION_SAMPLES)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the timings as a dict."""
+        return {
+            "job_type": self.job_type,
+            "count": self.count,
+            "total": self.total,
+            "p99": percentile(list(self.durations), 0.99),
+        }
+
+
+class _TimedCoroutine(Coroutine):
+    """Coroutine timing the steps its task runs on the event loop.
+
+    The time the coroutine waits between the steps is not included, so only
+    the time it blocks the event loop is recorded once it is done.
+    """
+
+    __slots__ = ("_coro", "_timings", "_target", "_duration")
+
+    def __init__(self, timings: JobTimings, target: Callable, coro: Coroutine) -> None:
+        """Initialize the timed coroutine."""
+        self._coro = coro
+        self._timings = timings
+        self._target = target
+        self._duration = 0.0
+
+    def send(self, value: Any) -> Any:
+        """Run the next step of the coroutine."""
+        return self._step(self._coro.send, value)
+
+    def throw(self, *args: Any) -> Any:
+        """Raise an exception in the coroutine."""
+        return self._step(self._coro.throw, *args)
+
+    def close(self) -> None:
+        """Close the coroutine."""
+        self._coro.close()
+
+    def __await__(self) -> _TimedCoroutine:
+        """Return the iterator of the coroutine."""
+        return self
+
+    def __iter__(self) -> _TimedCoroutine:
+        """Return the iterator of the coroutine."""
+        return self
+
+    def __next__(self) -> Any:
+        """Run the next step of the coroutine."""
+        return self.send(None)
+
+    def _step(self, method: Callable, *args: Any) -> Any:
+        """Run and time a step, recording the duration once done."""
+        done = False
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        except BaseException:
+            done = True
+            raise
+        finally:
+            self._duration += time.perf_counter() - start
+            if done:
+                self._timings.record(self._target, JOB_TYPE_COROUTINE, self._duration)
+
+
+class JobTimings:
+    """Timings of the jobs and the lag of the event loop.
+
+    Only the time a job blocks runs for is recorded. Callbacks and executor
+    jobs are timed while they run and coroutines while the steps of their
+    task run, without the time they await.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Initialize the job timings."""
+        self._loop = loop
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._targets: Dict[str, TargetTimings] = {}
+        self._lag_handle: Optional[asyncio.TimerHandle] = None
+        self.loop_lags: Deque[float] = deque(maxlen=LOOP_LAG_SAMPLES)
+
+    def record(self, target: Callable, job_type: str, duration: float) -> None:
+        """Record a run of a target."""
+        name = target_name(target)
+        with self._lock:
+            timings = self._targets.get(name)
+            if timings is None:
+                timings = self._targets[name] = TargetTimings(job_type)
+            timings.count += 1
+            timings.total += duration
+            timings.durations.append(duration)
+
+    def run_callback(self, target: Callable, *args: Any) -> Any:
+        """Run and time a callback."""
+        start = time.perf_counter()
+        try:
+            return target(*args)
+        finally:
+            self.record(target, JOB_TYPE_CALLBACK, time.perf_counter() - start)
+
+    def run_executor_job(self, target: Callable, *args: Any) -> Any:
+        """Run and time an executor job."""
+        start = time.perf_counter()
+        try:
+            return target(*args)
+        finally:
+            self.record(target, JOB_TYPE_EXECUTOR, time.perf_counter() - start)
+
+    def time_coroutine(self, target: Callable, coro: Coroutine) -> Coroutine:
+        """Return the coroutine of a coroutine function, timing its steps."""
+        return _TimedCoroutine(self, target, coro)
+
+    def async_start(self) -> None:
+        """Start timing the jobs and measuring the lag of the event loop."""
+        self.enabled = True
+        self._async_schedule_lag_check()
+
+    def async_stop(self) -> None:
+        """Stop timing the jobs and measuring the lag of the event loop."""
+        self.enabled = False
+        if self._lag_handle is not None:
+            self._lag_handle.cancel()
+            self._lag_handle = None
+
+    def _async_schedule_lag_check(self) -> None:
+        """Schedule the next measure of the loop lag."""
+        expected = self._loop.time() + LOOP_LAG_INTERVAL
+        self._lag_handle = self._loop.call_at(expected, self._async_check_lag, expected)
+
+    def _async_check_lag(self, expected: float) -> None:
+        """Measure how late the loop ran the check."""
+        self.loop_lags.append(max(0.0, self._loop.time() - expected))
+        self._async_schedule_lag_check()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the timings, the slowest targets first."""
+        with self._lock:
+            targets = {
+                name: timings.as_dict() for name, timings in self._targets.items()
+            }
+        loop_lags = list(self.loop_lags)
+        return {
+            "loop_lag": {
+                "last": loop_lags[-1] if loop_lags else None,
+                "max": max(loop_lags, default=None),
+                "p99": percentile(loop_lags, 0.99),
+            },
+            "jobs": [
+                {"target": name, **timings}
+                for name, timings in sorted(
+                    targets.items(), key=lambda item: item[1]["total"], reverse=True
+                )
+            ],
+        }
@@ -0,0 +1,90 @@
+"""JSON serialization for the hot paths of the websocket and HTTP APIs.
+
+Uses orjson when it is installed and the json module of the standard library
+otherwise. Both backends write the same compact JSON and both reject NaN and
+infinity. The files written by homeassistant.util.json keep using the json
+module so that their content does not depend on the installed backend.
+"""
+from collections.abc import Mapping
+from datetime import datetime
+import json
+import math
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def json_encoder_default(obj: Any) -> Any:
+    """Convert the objects the JSON backend does not serialize itself.
+
+    Raises TypeError for objects that can not be converted.
+    """
+    if isinstance(obj, (set, tuple)):
+        return list(obj)
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if hasattr(obj, "as_dict"):
+        return obj.as_dict()
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _json_dumps_stdlib(data: Any) -> str:
+    """Dump Home Assistant objects to a JSON string with the json module."""
+    return json.dumps(
+        data,
+        default=json_encoder_default,
+        allow_nan=False,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+
+
+def _json_bytes_stdlib(data: Any) -> bytes:
+    """Dump Home Assistant objects to JSON bytes with the json module."""
+    return _json_dumps_stdlib(data).encode("UTF-8")
+
+
+def _has_non_finite_float(obj: Any) -> bool:
+    """Return if NaN or infinity is found in the data."""
+    if isinstance(obj, float):
+        return not math.isfinite(obj)
+    if isinstance(obj, (str, int)) or obj is None:
+        return False
+    if isinstance(obj, dict):
+        return any(_has_non_finite_float(value) for value in obj.values())
+    if isinstance(obj, list):
+        return any(_has_non_finite_float(value) for value in obj)
+    return _has_non_finite_float(json_encoder_default(obj))
+
+
+def _json_bytes_orjson(data: Any) -> bytes:
+    """Dump Home Assistant objects to JSON bytes with orjson."""
+    result: bytes = orjson.dumps(
+        data, option=orjson.OPT_NON_STR_KEYS, default=json_encoder_default
+    )
+    # orjson writes NaN and infinity as null, the json module rejects them
+    if b"null" in result and _has_non_finite_float(data):
+        raise ValueError("Out of range float values are not JSON compliant")
+    return result
+
+
+def _json_dumps_orjson(data: Any) -> str:
+    """Dump Home Assistant objects to a JSON string with orjson."""
+    return _json_bytes_orjson(data).decode("UTF-8")
+
+
+if orjson is None:  # pragma: no cover
+    JSON_BACKEND = "json"
+    json_bytes = _json_bytes_stdlib
+    json_dumps = _json_dumps_stdlib
+    json_loads = json.loads
+else:
+    JSON_BACKEND = "orjson"
+    json_bytes = _json_bytes_orjson
+    json_dumps = _json_dumps_orjson
+    json_loads = orjson.loads
@@ -7,7 +7,9 @@ import unittest
 from unittest.mock import patch, sentinel
 
 from homeassistant.components import history, recorder
+from homeassistant.components.recorder import StatisticsTask
 from homeassistant.components.recorder.models import process_timestamp
+from homeassistant.components.recorder.statistics import get_start_time
 import homeassistant.core as ha
 from homeassistant.helpers.json import JSONEncoder
 from homeassistant.setup import async_setup_component, setup_component
@@ -59,6 +61,20 @@ class TestComponentHistory(unittest.TestCase):
         self.init_recorder()
         assert setup_component(self.hass, history.DOMAIN, config)
 
+    def test_lazy_state_as_json(self):
+        """Test the states read from the database serialize to JSON."""
+        self.test_setup()
+        state = ha.State("test.lazy", "on", {"attribute_test": 1})
+        mock_state_change_event(self.hass, state)
+        wait_recording_done(self.hass)
+
+        lazy_state = history.get_states(self.hass, dt_util.utcnow())[0]
+        assert isinstance(lazy_state, history.LazyState)
+        assert json.loads(lazy_state.as_json()) == json.loads(
+            json.dumps(lazy_state.as_dict(), cls=JSONEncoder)
+        )
+        assert lazy_state.as_json() is lazy_state.as_json()
+
     def test_get_states(self):
         """Test getting states at a specific point in time."""
         self.test_setup()
@@ -1008,3 +1024,155 @@ async def test_entity_ids_limit_via_api_with_skip_initial_state(hass, hass_clien
     assert len(response_json) == 2
     assert response_json[0][0]["entity_id"] == "light.kitchen"
     assert response_json[1][0]["entity_id"] == "light.cow"
+
+
+async def test_statistics_during_period(hass, hass_ws_client, hass_client):
+    """Test fetching the long-term statistics over websocket and the api."""
+    await hass.async_add_executor_job(init_recorder_component, hass)
+    await async_setup_component(hass, "history", {})
+    instance = hass.data[recorder.DATA_INSTANCE]
+    await hass.async_add_executor_job(instance.block_till_done)
+
+    start = get_start_time(dt_util.utcnow()) - timedelta(minutes=5)
+    with patch("homeassistant.components.recorder.dt_util.utcnow", return_value=start):
+        hass.states.async_set("sensor.power", "10", {"unit_of_measurement": "W"})
+        await hass.async_block_till_done()
+        await hass.async_add_executor_job(trigger_db_commit, hass)
+        await hass.async_block_till_done()
+        await hass.async_add_executor_job(instance.block_till_done)
+
+    instance.queue.put(StatisticsTask(start))
+    await hass.async_add_executor_job(instance.block_till_done)
+
+    client = await hass_ws_client(hass)
+    await client.send_json(
+        {
+            "id": 1,
+            "type": "history/statistics_during_period",
+            "start_time": start.isoformat(),
+            "period": "5minute",
+        }
+    )
+    response = await client.receive_json()
+    assert response["success"]
+    assert response["result"] == {
+        "sensor.power": [
+            {
+                "statistic_id": "sensor.power",
+                "start": start.isoformat(),
+                "mean": 10.0,
+                "min": 10.0,
+                "max": 10.0,
+                "state": 10.0,
+                "sum": None,
+            }
+        ]
+    }
+
+    await client.send_json(
+        {
+            "id": 2,
+            "type": "history/statistics_during_period",
+            "start_time": "invalid",
+        }
+    )
+    response = await client.receive_json()
+    assert not response["success"]
+    assert response["error"]["code"] == "invalid_start_time"
+
+    await client.send_json({"id": 3, "type": "history/list_statistic_ids"})
+    response = await client.receive_json()
+    assert response["success"]
+    assert response["result"] == [
+        {"statistic_id": "sensor.power", "unit_of_measurement": "W", "has_sum": False}
+    ]
+
+    http_client = await hass_client()
+    response = await http_client.get(
+        f"/api/history/statistics/{start.isoformat()}?period=5minute"
+        "&statistic_ids=sensor.power"
+    )
+    assert response.status == 200
+    response_json = await response.json()
+    assert response_json["sensor.power"][0]["mean"] == 10.0
+
+    response = await http_client.get(
+        f"/api/history/statistics/{start.isoformat()}?period=day"
+    )
+    assert response.status == 400
+
+
+async def test_history_during_period_columnar(hass, hass_ws_client):
+    """Test fetching the history in the columnar format over websocket."""
+    await hass.async_add_executor_job(init_recorder_component, hass)
+    await async_setup_component(hass, "history", {})
+    instance = hass.data[recorder.DATA_INSTANCE]
+    await hass.async_add_executor_job(instance.block_till_done)
+
+    start = dt_util.utcnow() - timedelta(minutes=10)
+    points = [
+        (start + timedelta(minutes=1), "on", {"brightness": 1}),
+        (start + timedelta(minutes=2), "off", {"brightness": 1}),
+        (start + timedelta(minutes=3), "on", {"brightness": 2}),
+    ]
+    for point, state, attributes in points:
+        with patch(
+            "homeassistant.components.recorder.dt_util.utcnow", return_value=point
+        ), patch("homeassistant.core.dt_util.utcnow", return_value=point):
+            hass.states.async_set("light.kitchen", state, attributes)
+            await hass.async_block_till_done()
+            await hass.async_add_executor_job(trigger_db_commit, hass)
+            await hass.async_block_till_done()
+            await hass.async_add_executor_job(instance.block_till_done)
+
+    client = await hass_ws_client(hass)
+    await client.send_json(
+        {
+            "id": 1,
+            "type": "history/history_during_period",
+            "start_time": start.isoformat(),
+            "entity_ids": ["light.kitchen"],
+        }
+    )
+    response = await client.receive_json()
+    assert response["success"]
+    assert response["result"] == {
+        "light.kitchen": {
+            "s": ["on", "off", "on"],
+            "lu": [point.timestamp() for point, _, _ in points],
+            "a": {"0": {"brightness": 1}, "2": {"brightness": 2}},
+        }
+    }
+
+    await client.send_json(
+        {
+            "id": 2,
+            "type": "history/history_during_period",
+            "start_time": (start + timedelta(minutes=2, seconds=30)).isoformat(),
+            "entity_ids": ["light.kitchen"],
+            "minimal_response": True,
+        }
+    )
+    response = await client.receive_json()
+    assert response["success"]
+    assert response["result"] == {
+        "light.kitchen": {
+            "s": ["off", "on"],
+            "lu": [
+                (start + timedelta(minutes=2, seconds=30)).timestamp(),
+                points[2][0].timestamp(),
+            ],
+            "a": {"0": {"brightness": 1}},
+        }
+    }
+
+    await client.send_json(
+        {
+            "id": 3,
+            "type": "history/history_during_period",
+            "start_time": "invalid",
+        }
+    )
+    response = await client.receive_json()
+    assert not response["success"]
+    assert response["error"]["code"] == "invalid_start_time"
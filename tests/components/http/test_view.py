@@ -1,5 +1,5 @@
 """Tests for Home Assistant View."""
-from unittest.mock import AsyncMock, Mock
+from unittest.mock import AsyncMock, Mock, patch
 
 from aiohttp.web_exceptions import (
     HTTPBadRequest,
@@ -14,6 +14,7 @@ from homeassistant.components.http.view import (
     request_handler_factory,
 )
 from homeassistant.exceptions import ServiceNotFound, Unauthorized
+from homeassistant.util import json_backend as json_backend_module
 
 
 @pytest.fixture
@@ -28,7 +29,19 @@ def mock_request_with_stopping():
     return Mock(app={"hass": Mock(is_stopping=True)}, match_info={})
 
 
-async def test_invalid_json(caplog):
+@pytest.fixture(params=["stdlib", "orjson"])
+def json_backend(request):
+    """Serialize the view responses with each JSON backend."""
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    with patch(
+        "homeassistant.components.http.view.json_bytes",
+        getattr(json_backend_module, f"_json_bytes_{request.param}"),
+    ):
+        yield request.param
+
+
+async def test_invalid_json(json_backend, caplog):
     """Test trying to return invalid JSON."""
     view = HomeAssistantView()
 
@@ -38,6 +51,16 @@ async def test_invalid_json(caplog):
     assert str(float("NaN")) in caplog.text
 
 
+async def test_unserializable_json(json_backend, caplog):
+    """Test trying to return an object that can not be serialized."""
+    view = HomeAssistantView()
+
+    with pytest.raises(HTTPInternalServerError):
+        view.json(object())
+
+    assert "Unable to serialize to JSON" in caplog.text
+
+
 async def test_handling_unauthorized(mock_request):
     """Test handling unauth exceptions."""
     with pytest.raises(HTTPUnauthorized):
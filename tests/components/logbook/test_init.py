@@ -279,22 +279,29 @@ def create_state_changed_event_from_old_new(
         [
             "event_type"
             "event_data"
+            "shared_data"
             "time_fired"
             "context_id"
             "context_user_id"
             "context_parent_id"
+            "context_id_bin"
+            "context_user_id_bin"
+            "context_parent_id_bin"
             "state"
             "entity_id"
             "domain"
             "attributes"
+            "shared_attrs"
             "state_id",
             "old_state_id",
         ],
     )
 
     row.event_type = EVENT_STATE_CHANGED
-    row.event_data = "{}"
-    row.attributes = attributes_json
+    row.event_data = None
+    row.shared_data = None
+    row.attributes = None
+    row.shared_attrs = attributes_json
     row.time_fired = event_time_fired
     row.state = new_state and new_state.get("state")
     row.entity_id = entity_id
@@ -302,6 +309,9 @@ def create_state_changed_event_from_old_new(
     row.context_id = None
     row.context_user_id = None
     row.context_parent_id = None
+    row.context_id_bin = None
+    row.context_user_id_bin = None
+    row.context_parent_id_bin = None
     row.old_state_id = old_state and 1
     row.state_id = new_state and 1
     return logbook.LazyEventPartialState(row)
@@ -1876,3 +1886,132 @@ class MockLazyEventPartialState(ha.Event):
     def time_fired_isoformat(self):
         """Time event was fired in utc isoformat."""
         return process_timestamp_to_utc_isoformat(self.time_fired)
+
+
+async def _async_set_states_at(hass, start, entity_id, changes):
+    """Set the states of an entity as if they changed at minutes after start."""
+    for minute, state in changes:
+        with patch(
+            "homeassistant.core.dt_util.utcnow",
+            return_value=start + timedelta(minutes=minute),
+        ):
+            hass.states.async_set(entity_id, state)
+    await _async_commit_and_wait(hass)
+
+
+async def test_get_events_in_pages(hass, hass_ws_client):
+    """Test the logbook is fetched a page at a time over websocket."""
+    await hass.async_add_executor_job(init_recorder_component, hass)
+    await async_setup_component(hass, "logbook", {})
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+    start = dt_util.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(
+        hours=3
+    )
+    await _async_set_states_at(
+        hass,
+        start,
+        "switch.kitchen",
+        ((0, STATE_OFF), (1, STATE_ON), (2, STATE_OFF), (16, STATE_ON)),
+    )
+
+    client = await hass_ws_client(hass)
+    await client.send_json(
+        {
+            "id": 1,
+            "type": "logbook/get_events",
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(hours=1)).isoformat(),
+            "page_size": 1,
+        }
+    )
+    response = await client.receive_json()
+    assert response["success"]
+    # The page ends with the group of its first event
+    entries = response["result"]["events"]
+    assert [entry["state"] for entry in entries] == [STATE_ON, STATE_OFF]
+    cursor = response["result"]["cursor"]
+    assert dt_util.parse_datetime(cursor) == start + timedelta(minutes=2)
+
+    await client.send_json(
+        {
+            "id": 2,
+            "type": "logbook/get_events",
+            "start_time": cursor,
+            "end_time": (start + timedelta(hours=1)).isoformat(),
+            "page_size": 1,
+        }
+    )
+    response = await client.receive_json()
+    assert response["success"]
+    entries = response["result"]["events"]
+    assert [entry["state"] for entry in entries] == [STATE_ON]
+    assert response["result"]["cursor"] is None
+
+    await client.send_json(
+        {
+            "id": 3,
+            "type": "logbook/get_events",
+            "start_time": "invalid",
+            "end_time": start.isoformat(),
+        }
+    )
+    response = await client.receive_json()
+    assert not response["success"]
+    assert response["error"]["code"] == "invalid_start_time"
+
+
+async def test_event_stream(hass, hass_ws_client):
+    """Test the logbook stream continues from the recorded pages with live events."""
+    await hass.async_add_executor_job(init_recorder_component, hass)
+    await async_setup_component(hass, "logbook", {})
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+    start = dt_util.utcnow() - timedelta(hours=1)
+    await _async_set_states_at(
+        hass,
+        start,
+        "switch.kitchen",
+        ((0, STATE_OFF), (1, STATE_ON), (16, STATE_OFF)),
+    )
+    await _async_set_states_at(
+        hass, start, "switch.hall", ((0, STATE_OFF), (2, STATE_ON))
+    )
+
+    client = await hass_ws_client(hass)
+    await client.send_json(
+        {
+            "id": 1,
+            "type": "logbook/event_stream",
+            "start_time": start.isoformat(),
+            "entity_ids": ["switch.kitchen"],
+            "page_size": 1,
+        }
+    )
+    response = await client.receive_json()
+    assert response["success"]
+
+    recorded = []
+    for _ in range(2):
+        response = await client.receive_json()
+        assert response["type"] == "event"
+        recorded.extend(response["event"]["events"])
+    assert [(entry["entity_id"], entry["state"]) for entry in recorded] == [
+        ("switch.kitchen", STATE_ON),
+        ("switch.kitchen", STATE_OFF),
+    ]
+
+    hass.states.async_set("switch.hall", STATE_OFF)
+    hass.states.async_set("switch.kitchen", STATE_ON)
+    await hass.async_block_till_done()
+
+    response = await client.receive_json()
+    assert response["type"] == "event"
+    entries = response["event"]["events"]
+    assert len(entries) == 1
+    _assert_entry(entries[0], name="kitchen", entity_id="switch.kitchen")
+    assert entries[0]["state"] == STATE_ON
+
+    await client.send_json({"id": 2, "type": "unsubscribe_events", "subscription": 1})
+    response = await client.receive_json()
+    assert response["success"]
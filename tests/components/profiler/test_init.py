@@ -1,6 +1,7 @@
 """Test the Profiler config flow."""
 from datetime import timedelta
 import os
+import time
 from unittest.mock import patch
 
 from homeassistant import setup
@@ -11,10 +12,18 @@ from homeassistant.components.profiler import (
     SERVICE_DUMP_LOG_OBJECTS,
     SERVICE_MEMORY,
     SERVICE_START,
+    SERVICE_START_JOB_TIMING,
     SERVICE_START_LOG_OBJECTS,
+    SERVICE_START_TEMPLATE_TIMING,
+    SERVICE_STOP_JOB_TIMING,
     SERVICE_STOP_LOG_OBJECTS,
+    SERVICE_STOP_TEMPLATE_TIMING,
 )
 from homeassistant.components.profiler.const import DOMAIN
+from homeassistant.const import STATE_UNKNOWN
+from homeassistant.core import callback
+from homeassistant.helpers.polling import async_get_polling_scheduler
+from homeassistant.helpers.template import Template
 import homeassistant.util.dt as dt_util
 
 from tests.common import MockConfigEntry, async_fire_time_changed
@@ -147,3 +156,124 @@ async def test_dump_log_object(hass, caplog):
 
     assert await hass.config_entries.async_unload(entry.entry_id)
     await hass.async_block_till_done()
+
+
+async def test_job_timing(hass, hass_ws_client):
+    """Test the job timings are recorded once started and reported."""
+
+    await setup.async_setup_component(hass, "persistent_notification", {})
+    entry = MockConfigEntry(domain=DOMAIN)
+    entry.add_to_hass(hass)
+
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert hass.services.has_service(DOMAIN, SERVICE_START_JOB_TIMING)
+    assert hass.services.has_service(DOMAIN, SERVICE_STOP_JOB_TIMING)
+    assert hass.states.get("sensor.slowest_job").state == STATE_UNKNOWN
+
+    client = await hass_ws_client(hass)
+    await client.send_json({"id": 1, "type": "profiler/job_timings"})
+    response = await client.receive_json()
+    assert not response["success"]
+    assert response["error"]["code"] == "not_started"
+
+    await hass.services.async_call(DOMAIN, SERVICE_START_JOB_TIMING, {})
+    await hass.async_block_till_done()
+    assert hass.job_timings is not None
+
+    @callback
+    def _slow_listener(event):
+        time.sleep(0.01)
+
+    hass.bus.async_listen("test_slow_event", _slow_listener)
+    hass.bus.async_fire("test_slow_event")
+    await hass.async_block_till_done()
+
+    await client.send_json({"id": 2, "type": "profiler/job_timings"})
+    response = await client.receive_json()
+    assert response["success"]
+    jobs = {job["target"]: job for job in response["result"]["jobs"]}
+    slow_job = jobs[f"{__name__}.test_job_timing.<locals>._slow_listener"]
+    assert slow_job["job_type"] == "callback"
+    assert slow_job["count"] == 1
+    assert slow_job["total"] >= 0.01
+    assert slow_job["p99"] >= 0.01
+    assert "loop_lag" in response["result"]
+    suppressed_writes = response["result"]["suppressed_writes"]
+
+    hass.states.async_set("test.suppressed", "on", {"attr": 1})
+    hass.states.async_set("test.suppressed", "on", {"attr": 1})
+    await client.send_json({"id": 3, "type": "profiler/job_timings"})
+    response = await client.receive_json()
+    assert response["success"]
+    assert response["result"]["suppressed_writes"] == suppressed_writes + 1
+
+    await hass.helpers.entity_component.async_update_entity("sensor.slowest_job")
+    assert hass.states.get("sensor.slowest_job").state != STATE_UNKNOWN
+
+    await hass.services.async_call(DOMAIN, SERVICE_STOP_JOB_TIMING, {})
+    await hass.async_block_till_done()
+    assert hass.job_timings is None
+
+    await hass.services.async_call(DOMAIN, SERVICE_START_JOB_TIMING, {})
+    await hass.async_block_till_done()
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    assert hass.job_timings is None
+
+
+async def test_polling_stats(hass, hass_ws_client):
+    """Test the poll stats are reported once the polling scheduler is used."""
+    entry = MockConfigEntry(domain=DOMAIN)
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    client = await hass_ws_client(hass)
+    await client.send_json({"id": 1, "type": "profiler/polling"})
+    response = await client.receive_json()
+    assert not response["success"]
+    assert response["error"]["code"] == "not_enabled"
+
+    async_get_polling_scheduler(hass)
+    await client.send_json({"id": 2, "type": "profiler/polling"})
+    response = await client.receive_json()
+    assert response["success"]
+    assert response["result"] == {}
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def test_template_timing(hass, hass_ws_client):
+    """Test the template renders are timed once started and reported."""
+    entry = MockConfigEntry(domain=DOMAIN)
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    client = await hass_ws_client(hass)
+    await client.send_json({"id": 1, "type": "profiler/template_timings"})
+    response = await client.receive_json()
+    assert not response["success"]
+    assert response["error"]["code"] == "not_started"
+
+    await hass.services.async_call(DOMAIN, SERVICE_START_TEMPLATE_TIMING, {})
+    await hass.async_block_till_done()
+    Template("{{ states('sensor.one') }}", hass).async_render()
+
+    await client.send_json({"id": 2, "type": "profiler/template_timings"})
+    response = await client.receive_json()
+    assert response["success"]
+    assert response["result"][0]["template"] == "{{ states('sensor.one') }}"
+    assert response["result"][0]["count"] == 1
+
+    await hass.services.async_call(DOMAIN, SERVICE_STOP_TEMPLATE_TIMING, {})
+    await hass.async_block_till_done()
+    await client.send_json({"id": 3, "type": "profiler/template_timings"})
+    response = await client.receive_json()
+    assert not response["success"]
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
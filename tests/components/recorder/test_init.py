@@ -1,8 +1,10 @@
 """The tests for the Recorder component."""
 # pylint: disable=protected-access
 from datetime import datetime, timedelta
+import logging
 from unittest.mock import patch
 
+import pytest
 from sqlalchemy.exc import OperationalError
 
 from homeassistant.components.recorder import (
@@ -14,11 +16,22 @@ from homeassistant.components.recorder import (
     run_information_with_session,
 )
 from homeassistant.components.recorder.const import DATA_INSTANCE
-from homeassistant.components.recorder.models import Events, RecorderRuns, States
+from homeassistant.components.recorder.models import (
+    EventData,
+    Events,
+    RecorderRuns,
+    StateAttributes,
+    States,
+)
 from homeassistant.components.recorder.util import session_scope
-from homeassistant.const import MATCH_ALL, STATE_LOCKED, STATE_UNLOCKED
+from homeassistant.const import (
+    EVENT_STATE_CHANGED,
+    MATCH_ALL,
+    STATE_LOCKED,
+    STATE_UNLOCKED,
+)
 from homeassistant.core import Context, callback
-from homeassistant.setup import async_setup_component
+from homeassistant.setup import async_setup_component, setup_component
 from homeassistant.util import dt as dt_util
 
 from .common import wait_recording_done
@@ -47,6 +60,31 @@ def test_saving_state(hass, hass_recorder):
     assert state == _state_empty_context(hass, entity_id)
 
 
+def test_saving_states_shares_attributes(hass, hass_recorder):
+    """Test states with identical attributes share one attributes row."""
+    hass = hass_recorder()
+
+    attributes = {"test_attr": 5, "test_attr_10": "nice"}
+    for idx in range(3):
+        hass.states.set("test.recorder", f"state{idx}", attributes)
+        wait_recording_done(hass)
+    hass.states.set("test.recorder", "state3", {"test_attr": 6})
+    hass.states.set("test.recorder_other", "state0", attributes)
+    wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        db_state_attributes = list(session.query(StateAttributes))
+        assert len(db_state_attributes) == 2
+
+        db_states = list(session.query(States).order_by(States.state_id))
+        assert len(db_states) == 5
+        assert all(db_state.attributes is None for db_state in db_states)
+        assert len({db_state.attributes_id for db_state in db_states}) == 2
+        assert db_states[-1].attributes_id == db_states[0].attributes_id
+        assert db_states[-1].to_native().attributes == attributes
+        assert db_states[-2].to_native().attributes == {"test_attr": 6}
+
+
 def test_saving_state_with_exception(hass, hass_recorder, caplog):
     """Test saving and restoring a state."""
     hass = hass_recorder()
@@ -55,17 +93,18 @@ def test_saving_state_with_exception(hass, hass_recorder, caplog):
     state = "restoring_from_db"
     attributes = {"test_attr": 5, "test_attr_10": "nice"}
 
-    def _throw_if_state_in_session(*args, **kwargs):
-        for obj in hass.data[DATA_INSTANCE].event_session:
-            if isinstance(obj, States):
-                raise OperationalError(
-                    "insert the state", "fake params", "forced to fail"
-                )
+    event_session = hass.data[DATA_INSTANCE].event_session
+    original_execute = event_session.execute
+
+    def _throw_if_inserting_states(statement, *args, **kwargs):
+        if getattr(statement, "table", None) is States.__table__:
+            raise OperationalError("insert the state", "fake params", "forced to fail")
+        return original_execute(statement, *args, **kwargs)
 
     with patch("time.sleep"), patch.object(
-        hass.data[DATA_INSTANCE].event_session,
-        "flush",
-        side_effect=_throw_if_state_in_session,
+        event_session,
+        "execute",
+        side_effect=_throw_if_inserting_states,
     ):
         hass.states.set(entity_id, "fail", attributes)
         wait_recording_done(hass)
@@ -126,6 +165,42 @@ def test_saving_event(hass, hass_recorder):
     )
 
 
+def test_saving_events_shares_event_data(hass, hass_recorder):
+    """Test events with identical data share one event data row."""
+    hass = hass_recorder()
+
+    event_data = {"test_attr": 5, "test_attr_10": "nice"}
+    for _ in range(3):
+        hass.bus.fire("EVENT_TEST", event_data)
+        wait_recording_done(hass)
+    hass.bus.fire("EVENT_TEST", {"test_attr": 6})
+    hass.states.set("test.recorder", "on", event_data)
+    wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        db_events = list(
+            session.query(Events)
+            .filter_by(event_type="EVENT_TEST")
+            .order_by(Events.event_id)
+        )
+        assert len(db_events) == 4
+        assert all(db_event.event_data is None for db_event in db_events)
+        data_ids = {db_event.data_id for db_event in db_events}
+        assert len(data_ids) == 2
+        assert (
+            session.query(EventData).filter(EventData.data_id.in_(data_ids)).count()
+            == 2
+        )
+        assert db_events[0].to_native().data == event_data
+        assert db_events[-1].to_native().data == {"test_attr": 6}
+
+        db_state_changed = (
+            session.query(Events).filter_by(event_type=EVENT_STATE_CHANGED).one()
+        )
+        assert db_state_changed.data_id is None
+        assert db_state_changed.event_data is None
+
+
 def _add_entities(hass, entity_ids):
     """Add entities."""
     attributes = {"test_attr": 5, "test_attr_10": "nice"}
@@ -432,6 +507,70 @@ def test_saving_sets_old_state(hass_recorder):
         assert states[3].old_state_id == states[1].state_id
 
 
+def test_saving_sets_old_state_in_same_batch(hass_recorder):
+    """Test saving links states of the same entity written in one batch."""
+    hass = hass_recorder()
+
+    hass.states.set("test.one", "on", {})
+    hass.states.set("test.one", "off", {})
+    hass.states.set("test.two", "on", {})
+    hass.states.set("test.one", "on", {})
+    wait_recording_done(hass)
+    hass.states.set("test.one", "off", {})
+    wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        states = list(
+            session.query(States)
+            .filter_by(entity_id="test.one")
+            .order_by(States.state_id)
+        )
+        assert [state.state for state in states] == ["on", "off", "on", "off"]
+        assert states[0].old_state_id is None
+        assert states[1].old_state_id == states[0].state_id
+        assert states[2].old_state_id == states[1].state_id
+        assert states[3].old_state_id == states[2].state_id
+
+        for state in states:
+            assert state.event.event_type == EVENT_STATE_CHANGED
+
+    assert hass.data[DATA_INSTANCE].batch_latency is not None
+
+
+def test_saving_state_with_another_writer(hass_recorder, caplog):
+    """Test the rows are inserted one by one when another writer added rows."""
+    hass = hass_recorder()
+
+    hass.states.set("test.one", "on", {})
+    wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        session.add(Events(event_type="other_writer", origin="LOCAL"))
+
+    with caplog.at_level(logging.DEBUG):
+        hass.states.set("test.one", "off", {})
+        hass.bus.fire("EVENT_TEST", {"test_attr": 5})
+        wait_recording_done(hass)
+    assert "inserting the rows one by one" in caplog.text
+
+    with session_scope(hass=hass) as session:
+        states = list(
+            session.query(States)
+            .filter_by(entity_id="test.one")
+            .order_by(States.state_id)
+        )
+        assert [state.state for state in states] == ["on", "off"]
+        assert states[1].old_state_id == states[0].state_id
+        for state in states:
+            assert state.event.event_type == EVENT_STATE_CHANGED
+
+    # The next inserts are bulk inserts again
+    caplog.clear()
+    hass.states.set("test.one", "on", {})
+    wait_recording_done(hass)
+    assert "inserting the rows one by one" not in caplog.text
+
+
 def test_saving_state_with_serializable_data(hass_recorder, caplog):
     """Test saving data that cannot be serialized does not crash."""
     hass = hass_recorder()
@@ -488,3 +627,29 @@ def test_run_information(hass_recorder):
 
 class CannotSerializeMe:
     """A class that the JSONEncoder cannot serialize."""
+
+
+def test_read_only_connection_pool(tmp_path):
+    """Test the reads of a database file use the read only connection pool."""
+    hass = get_test_home_assistant()
+    db_url = f"sqlite:///{tmp_path / 'pool.db'}"
+    assert setup_component(hass, DOMAIN, {DOMAIN: {"db_url": db_url}})
+    hass.start()
+    wait_recording_done(hass)
+
+    hass.states.set("test.pool", "on")
+    wait_recording_done(hass)
+
+    instance = hass.data[DATA_INSTANCE]
+    assert instance.read_engine is not None
+    with session_scope(hass=hass, read_only=True) as session:
+        assert session.bind is instance.read_engine
+        assert session.query(States).filter_by(entity_id="test.pool").count() == 1
+
+    with pytest.raises(OperationalError), session_scope(
+        hass=hass, read_only=True
+    ) as session:
+        session.execute("DELETE FROM states")
+
+    hass.stop()
+    assert instance.read_engine is None
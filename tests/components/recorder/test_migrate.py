@@ -60,6 +60,88 @@ async def test_schema_migrate(hass):
         assert setup_run.called
 
 
+def test_migrate_state_attributes():
+    """Test inline state attributes are moved to the shared table."""
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    models_original.Base.metadata.create_all(engine)
+    for idx, attributes in enumerate(['{"a": 1}', '{"a": 1}', '{"b": 2}']):
+        engine.execute(
+            "INSERT INTO states (entity_id, state, attributes) "
+            f"VALUES ('sensor.test', '{idx}', '{attributes}')"
+        )
+    models.Base.metadata.create_all(engine)
+
+    with patch.object(migration, "SHARED_TABLE_MIGRATION_CHUNK_SIZE", 2):
+        migration._apply_update(engine, 12, 11)
+
+    rows = engine.execute(
+        "SELECT attributes, attributes_id FROM states ORDER BY state_id"
+    ).fetchall()
+    assert [row[0] for row in rows] == [None, None, None]
+    assert rows[0][1] == rows[1][1]
+    assert rows[0][1] != rows[2][1]
+    assert sorted(
+        row[0] for row in engine.execute("SELECT shared_attrs FROM state_attributes")
+    ) == ['{"a": 1}', '{"b": 2}']
+
+
+def test_migrate_event_data():
+    """Test inline event data is moved to the shared table."""
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    models_original.Base.metadata.create_all(engine)
+    # The context ids were added by earlier schema versions
+    migration._add_columns(
+        engine,
+        "events",
+        [
+            "context_id CHARACTER(36)",
+            "context_user_id CHARACTER(36)",
+            "context_parent_id CHARACTER(36)",
+        ],
+    )
+    context_id = "0123456789abcdef0123456789abcdef"
+    for event_type, event_data, user_id in (
+        ("test_event", '{"a": 1}', None),
+        ("state_changed", "{}", context_id),
+        ("test_event", '{"a": 1}', "not-a-uuid"),
+        ("test_event", '{"b": 2}', None),
+    ):
+        engine.execute(
+            "INSERT INTO events (event_type, event_data, context_id, context_user_id) "
+            f"VALUES ('{event_type}', '{event_data}', '{context_id}', "
+            f"{repr(user_id) if user_id else 'NULL'})"
+        )
+    models.Base.metadata.create_all(engine)
+    migration._apply_update(engine, 12, 11)
+
+    with patch.object(migration, "SHARED_TABLE_MIGRATION_CHUNK_SIZE", 2):
+        migration._apply_update(engine, 13, 12)
+        # Migrating again keeps the migrated rows
+        migration._apply_update(engine, 13, 12)
+
+    rows = engine.execute(
+        "SELECT event_data, data_id, context_id, context_id_bin, "
+        "context_user_id, context_user_id_bin FROM events ORDER BY event_id"
+    ).fetchall()
+    assert [row[0] for row in rows] == [None, None, None, None]
+    assert rows[1][1] is None
+    assert rows[0][1] == rows[2][1]
+    assert rows[0][1] != rows[3][1]
+    assert sorted(
+        row[0] for row in engine.execute("SELECT shared_data FROM event_data")
+    ) == ['{"a": 1}', '{"b": 2}']
+
+    assert [row[2] for row in rows] == [None, None, None, None]
+    assert [bytes(row[3]) for row in rows] == [bytes.fromhex(context_id)] * 4
+    assert [row[4] for row in rows] == [None, None, "not-a-uuid", None]
+    assert [row[5] and bytes(row[5]) for row in rows] == [
+        None,
+        bytes.fromhex(context_id),
+        None,
+        None,
+    ]
+
+
 def test_invalid_update():
     """Test that an invalid new version raises an exception."""
     with pytest.raises(ValueError):
@@ -8,9 +8,13 @@ from sqlalchemy.orm import scoped_session, sessionmaker
 
 from homeassistant.components.recorder.models import (
     Base,
+    EventData,
     Events,
     RecorderRuns,
+    StateAttributes,
     States,
+    context_id_from_db,
+    context_id_to_db,
     process_timestamp,
     process_timestamp_to_utc_isoformat,
 )
@@ -24,7 +28,41 @@ import homeassistant.util.dt as dt_util
 def test_from_event_to_db_event():
     """Test converting event to db event."""
     event = ha.Event("test_event", {"some_data": 15})
-    assert event == Events.from_event(event).to_native()
+    db_event = Events.from_event(event)
+    db_event.event_data_rel = EventData.from_event(event)
+    assert event == db_event.to_native()
+
+
+def test_from_event_to_db_event_data():
+    """Test converting event to db event data."""
+    event = ha.Event("test_event", {"some_data": 15})
+    db_event_data = EventData.from_event(event)
+    assert db_event_data.to_native() == {"some_data": 15}
+    assert db_event_data.hash == EventData.hash_shared_data('{"some_data": 15}')
+
+
+def test_context_id_to_and_from_db():
+    """Test context ids are stored in the binary column when possible."""
+    context = ha.Context(user_id="b6a8a3ebd5c942c2a8e1dcb7f5b2b0a4")
+    context_id, context_id_bin = context_id_to_db(context.id)
+    assert context_id is None
+    assert len(context_id_bin) == 16
+    assert context_id_from_db(context_id, context_id_bin) == context.id
+
+    for legacy_id in ("not-a-uuid", "B6A8A3EBD5C942C2A8E1DCB7F5B2B0A4", "z" * 32):
+        assert context_id_to_db(legacy_id) == (legacy_id, None)
+        assert context_id_from_db(legacy_id, None) == legacy_id
+
+    assert context_id_to_db(None) == (None, None)
+    assert context_id_from_db(None, None) is None
+
+    event = ha.Event("test_event", {}, context=context)
+    db_event = Events.from_event(event)
+    assert db_event.context_id is None
+    assert db_event.context_user_id is None
+    assert db_event.context_parent_id is None
+    assert db_event.context_parent_id_bin is None
+    assert db_event.to_native() == event
 
 
 def test_from_event_to_db_state():
@@ -41,6 +79,27 @@ def test_from_event_to_db_state():
     assert state == States.from_event(event).to_native()
 
 
+def test_from_event_to_db_state_attributes():
+    """Test converting event to db state attributes."""
+    attrs = {"this_attr": True}
+    state = ha.State("sensor.temperature", "18", attrs)
+    event = ha.Event(
+        EVENT_STATE_CHANGED,
+        {"entity_id": "sensor.temperature", "old_state": None, "new_state": state},
+        context=state.context,
+    )
+    db_state_attributes = StateAttributes.from_event(event)
+    assert db_state_attributes.to_native() == attrs
+    assert db_state_attributes.hash == StateAttributes.hash_shared_attrs(
+        '{"this_attr": true}'
+    )
+
+    db_state = States.from_event(event)
+    assert db_state.attributes is None
+    db_state.state_attributes = db_state_attributes
+    assert db_state.to_native().attributes == attrs
+
+
 def test_from_event_to_delete_state():
     """Test converting deleting state event to db state."""
     event = ha.Event(
@@ -210,9 +269,11 @@ async def test_event_to_db_model():
     event = ha.Event(
         "state_changed", {"some": "attr"}, ha.EventOrigin.local, dt_util.utcnow()
     )
-    native = Events.from_event(event).to_native()
+    db_event = Events.from_event(event)
+    db_event.event_data_rel = EventData.from_event(event)
+    native = db_event.to_native()
     assert native == event
 
-    native = Events.from_event(event, event_data="{}").to_native()
+    native = Events.from_event(event).to_native()
     event.data = {}
     assert native == event
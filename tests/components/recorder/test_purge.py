@@ -1,13 +1,24 @@
 """Test data purging."""
 from datetime import datetime, timedelta
 import json
-from unittest.mock import patch
+from unittest.mock import call, patch
 
 from homeassistant.components import recorder
+from homeassistant.components.recorder import purge
 from homeassistant.components.recorder.const import DATA_INSTANCE
-from homeassistant.components.recorder.models import Events, RecorderRuns, States
+from homeassistant.components.recorder.models import (
+    EventData,
+    Events,
+    RecorderRuns,
+    StateAttributes,
+    States,
+    Statistics,
+    StatisticsMeta,
+    StatisticsShortTerm,
+)
 from homeassistant.components.recorder.purge import purge_old_data
 from homeassistant.components.recorder.util import session_scope
+from homeassistant.const import EVENT_STATE_CHANGED
 from homeassistant.util import dt as dt_util
 
 from .common import wait_recording_done
@@ -23,18 +34,26 @@ def test_purge_old_states(hass, hass_recorder):
         states = session.query(States)
         assert states.count() == 6
 
-        # run purge_old_data()
-        finished = purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
-        assert not finished
-        assert states.count() == 4
+        # run purge_old_data() in batches of 2 rows
+        with patch.object(purge, "MAX_ROWS_TO_PURGE", 2):
+            finished = purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
+            assert not finished
+            assert states.count() == 4
 
-        finished = purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
-        assert not finished
-        assert states.count() == 2
+            finished = purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
+            assert not finished
+            assert states.count() == 2
 
+            finished = purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
+            assert finished
+            assert states.count() == 2
+
+        # run purge_old_data() in a single batch
+        _add_test_states(hass)
+        assert states.count() == 8
         finished = purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
         assert finished
-        assert states.count() == 2
+        assert states.count() == 4
 
 
 def test_purge_old_events(hass, hass_recorder):
@@ -46,19 +65,79 @@ def test_purge_old_events(hass, hass_recorder):
         events = session.query(Events).filter(Events.event_type.like("EVENT_TEST%"))
         assert events.count() == 6
 
-        # run purge_old_data()
-        finished = purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
-        assert not finished
-        assert events.count() == 4
+        # run purge_old_data() in batches of 2 rows
+        with patch.object(purge, "MAX_ROWS_TO_PURGE", 2):
+            finished = purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
+            assert not finished
+            assert events.count() == 4
 
-        finished = purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
-        assert not finished
-        assert events.count() == 2
+            finished = purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
+            assert not finished
+            assert events.count() == 2
 
-        # we should only have 2 events left
-        finished = purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
-        assert finished
-        assert events.count() == 2
+            # we should only have 2 events left
+            finished = purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
+            assert finished
+            assert events.count() == 2
+
+
+def test_purge_keeps_events_of_kept_states(hass, hass_recorder):
+    """Test events are only purged up to the states purged in the batch."""
+    hass = hass_recorder()
+    eleven_days_ago = datetime.now() - timedelta(days=11)
+    wait_recording_done(hass)
+
+    with recorder.session_scope(hass=hass) as session:
+        # Older states without an event fill the first batch
+        for minute in range(-2, 0):
+            timestamp = eleven_days_ago + timedelta(minutes=minute)
+            session.add(
+                States(
+                    entity_id="test.recorder1",
+                    domain="test",
+                    state=str(minute),
+                    last_changed=timestamp,
+                    last_updated=timestamp,
+                    created=timestamp,
+                )
+            )
+        for minute in range(4):
+            timestamp = eleven_days_ago + timedelta(minutes=minute)
+            event = Events(
+                event_type=EVENT_STATE_CHANGED,
+                origin="LOCAL",
+                created=timestamp,
+                time_fired=timestamp,
+            )
+            session.add(event)
+            session.flush()
+            session.add(
+                States(
+                    entity_id="test.recorder2",
+                    domain="test",
+                    state=str(minute),
+                    last_changed=timestamp,
+                    last_updated=timestamp,
+                    created=timestamp,
+                    event_id=event.event_id,
+                )
+            )
+
+    with session_scope(hass=hass) as session:
+        events = session.query(Events).filter(Events.event_type == EVENT_STATE_CHANGED)
+        states = session.query(States)
+
+        with patch.object(purge, "MAX_ROWS_TO_PURGE", 2):
+            finished = purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
+            assert not finished
+            assert states.count() == 4
+            event_ids = {event.event_id for event in events}
+            assert all(state.event_id in event_ids for state in states)
+
+            while not purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False):
+                pass
+            assert states.count() == 0
+            assert events.count() == 0
 
 
 def test_purge_old_recorder_runs(hass, hass_recorder):
@@ -137,12 +216,88 @@ def test_purge_method(hass, hass_recorder):
             hass.block_till_done()
             hass.data[DATA_INSTANCE].block_till_done()
             wait_recording_done(hass)
-            assert (
-                mock_logger.debug.mock_calls[5][1][0]
-                == "Vacuuming SQL DB to free space"
+            assert call("Vacuuming SQL DB to free space") in (
+                mock_logger.debug.mock_calls
             )
 
 
+def test_purge_unused_shared_data(hass, hass_recorder):
+    """Test purging removes shared attributes and data nothing references."""
+    hass = hass_recorder()
+    _add_test_states(hass)
+
+    with session_scope(hass=hass) as session:
+        session.add(StateAttributes(hash=1, shared_attrs='{"unused": true}'))
+        session.add(EventData(hash=1, shared_data='{"unused": true}'))
+
+    with session_scope(hass=hass) as session:
+        state_attributes = session.query(StateAttributes)
+        assert state_attributes.count() == 1
+        event_data = session.query(EventData).filter_by(hash=1)
+        assert event_data.count() == 1
+
+        # Not removed until the purge has fully completed
+        with patch.object(purge, "MAX_ROWS_TO_PURGE", 2):
+            finished = purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
+            assert not finished
+            assert state_attributes.count() == 1
+
+            while not finished:
+                finished = purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
+        assert state_attributes.count() == 0
+        assert event_data.count() == 0
+
+
+def test_purge_keeps_long_term_statistics(hass, hass_recorder):
+    """Test purging removes old short-term but no long-term statistics."""
+    hass = hass_recorder()
+    _add_test_states(hass)
+
+    now = dt_util.utcnow().replace(minute=0, second=0, microsecond=0)
+    eleven_days_ago = now - timedelta(days=11)
+    with session_scope(hass=hass) as session:
+        meta = StatisticsMeta(statistic_id="sensor.power", unit_of_measurement="W")
+        session.add(meta)
+        session.flush()
+        for start in (eleven_days_ago, now - timedelta(hours=1)):
+            for table in (Statistics, StatisticsShortTerm):
+                session.add(
+                    table(metadata_id=meta.id, start=start, mean=1, min=1, max=1)
+                )
+
+    finished = False
+    while not finished:
+        finished = purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
+
+    with session_scope(hass=hass) as session:
+        assert session.query(Statistics).count() == 2
+        short_term = session.query(StatisticsShortTerm).one()
+        assert short_term.start.replace(tzinfo=None) == (
+            now - timedelta(hours=1)
+        ).replace(tzinfo=None)
+
+
+def test_purge_forgets_purged_old_states(hass, hass_recorder):
+    """Test new states do not link to a purged old state."""
+    hass = hass_recorder()
+    hass.states.set("test.recorder", "on")
+    wait_recording_done(hass)
+
+    with patch(
+        "homeassistant.components.recorder.purge.dt_util.utcnow",
+        return_value=dt_util.utcnow() + timedelta(days=5),
+    ):
+        assert purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
+
+    hass.states.set("test.recorder", "off")
+    wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        state = session.query(States).one()
+        assert state.state == "off"
+        assert state.old_state_id is None
+
+
 def _add_test_states(hass):
     """Add multiple states to the db for testing."""
     now = datetime.now()
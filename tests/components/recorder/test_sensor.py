@@ -0,0 +1,22 @@
+"""The tests for the recorder sensor platform."""
+from homeassistant.setup import setup_component
+
+from .common import wait_recording_done
+
+
+def test_recorder_sensors(hass_recorder):
+    """Test the queue depth and batch latency sensors."""
+    hass = hass_recorder()
+    hass.states.set("test.recorder", "on")
+    wait_recording_done(hass)
+
+    assert setup_component(hass, "sensor", {"sensor": {"platform": "recorder"}})
+    hass.block_till_done()
+
+    state = hass.states.get("sensor.recorder_queue_depth")
+    assert int(state.state) >= 0
+    assert state.attributes["unit_of_measurement"] == "events"
+
+    state = hass.states.get("sensor.recorder_batch_latency")
+    assert float(state.state) >= 0
+    assert state.attributes["unit_of_measurement"] == "ms"
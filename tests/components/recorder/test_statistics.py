@@ -0,0 +1,147 @@
+"""The tests for the recorder statistics."""
+from datetime import timedelta
+from unittest.mock import patch
+
+from pytest import approx
+
+from homeassistant.components.recorder import StatisticsTask
+from homeassistant.components.recorder.const import DATA_INSTANCE
+from homeassistant.components.recorder.models import StatisticsShortTerm
+from homeassistant.components.recorder.statistics import (
+    PERIOD_5MINUTE,
+    get_start_time,
+    list_statistic_ids,
+    statistics_during_period,
+)
+from homeassistant.components.recorder.util import session_scope
+import homeassistant.util.dt as dt_util
+
+from .common import wait_recording_done
+
+POWER_ATTRIBUTES = {"unit_of_measurement": "W"}
+ENERGY_ATTRIBUTES = {"unit_of_measurement": "kWh", "device_class": "energy"}
+
+
+def _set_state(hass, when, entity_id, state, attributes):
+    """Set a state as if it changed at when."""
+    with patch("homeassistant.core.dt_util.utcnow", return_value=when):
+        hass.states.set(entity_id, state, attributes)
+        wait_recording_done(hass)
+
+
+def _compile(hass, start):
+    """Compile the statistics of the period starting at start."""
+    hass.data[DATA_INSTANCE].queue.put(StatisticsTask(start))
+    wait_recording_done(hass)
+
+
+def test_get_start_time():
+    """Test the start of the last complete period is returned."""
+    now = dt_util.parse_datetime("2021-05-01 12:17:42+00:00")
+    assert get_start_time(now) == dt_util.parse_datetime("2021-05-01 12:10:00+00:00")
+
+
+def test_compile_short_term_statistics(hass_recorder):
+    """Test the short-term statistics of numeric sensors."""
+    hass = hass_recorder()
+    start = get_start_time(dt_util.utcnow()) - timedelta(minutes=10)
+
+    _set_state(hass, start, "sensor.power", "10", POWER_ATTRIBUTES)
+    for minute, state in ((1, "20"), (4, "30")):
+        _set_state(
+            hass,
+            start + timedelta(minutes=minute),
+            "sensor.power",
+            state,
+            POWER_ATTRIBUTES,
+        )
+    for minute, state in ((0, "100"), (1, "105"), (2, "2"), (3, "4")):
+        _set_state(
+            hass,
+            start + timedelta(minutes=minute),
+            "sensor.energy",
+            state,
+            ENERGY_ATTRIBUTES,
+        )
+    _set_state(hass, start, "sensor.no_unit", "10", {})
+    _set_state(hass, start, "sensor.text", "on", POWER_ATTRIBUTES)
+    _set_state(hass, start, "input_number.number", "10", POWER_ATTRIBUTES)
+
+    _compile(hass, start)
+    _compile(hass, start + timedelta(minutes=5))
+
+    stats = statistics_during_period(hass, start, period=PERIOD_5MINUTE)
+    assert set(stats) == {"sensor.power", "sensor.energy"}
+
+    power = stats["sensor.power"]
+    assert len(power) == 2
+    assert power[0]["start"] == start
+    # 10 for 1 minute, 20 for 3 minutes and 30 for 1 minute
+    assert power[0]["mean"] == approx(20)
+    assert power[0]["min"] == 10
+    assert power[0]["max"] == 30
+    assert power[0]["state"] == 30
+    assert power[0]["sum"] is None
+    # Unchanged in the next period
+    assert power[1]["start"] == start + timedelta(minutes=5)
+    assert power[1]["mean"] == power[1]["min"] == power[1]["max"] == 30
+
+    energy = stats["sensor.energy"]
+    # The meter was reset between 105 and 2
+    assert energy[0]["sum"] == approx(9)
+    assert energy[0]["state"] == 4
+    assert energy[1]["sum"] == 0
+
+    assert list_statistic_ids(hass) == [
+        {
+            "statistic_id": "sensor.energy",
+            "unit_of_measurement": "kWh",
+            "has_sum": True,
+        },
+        {
+            "statistic_id": "sensor.power",
+            "unit_of_measurement": "W",
+            "has_sum": False,
+        },
+    ]
+
+    # Compiling a period again does not add rows
+    _compile(hass, start)
+    with session_scope(hass=hass) as session:
+        assert session.query(StatisticsShortTerm).count() == 4
+
+
+def test_compile_long_term_statistics(hass_recorder):
+    """Test the hourly statistics are compiled from the short-term statistics."""
+    hass = hass_recorder()
+    hour = dt_util.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(
+        hours=1
+    )
+
+    for minute, state in ((1, "10"), (31, "20")):
+        _set_state(
+            hass,
+            hour + timedelta(minutes=minute),
+            "sensor.power",
+            state,
+            POWER_ATTRIBUTES,
+        )
+    for period in range(12):
+        _compile(hass, hour + period * timedelta(minutes=5))
+
+    stats = statistics_during_period(hass, hour - timedelta(hours=1))
+    assert len(stats["sensor.power"]) == 1
+    power = stats["sensor.power"][0]
+    assert power["start"] == hour
+    assert power["mean"] == approx((6 * 10 + 18 + 5 * 20) / 12)
+    assert power["min"] == 10
+    assert power["max"] == 20
+    assert power["state"] == 20
+
+    assert statistics_during_period(hass, hour + timedelta(hours=1)) == {}
+    assert (
+        statistics_during_period(
+            hass, hour, statistic_ids=["sensor.other"], period=PERIOD_5MINUTE
+        )
+        == {}
+    )
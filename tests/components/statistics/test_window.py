@@ -0,0 +1,47 @@
+"""The tests for the sliding window of the statistics sensor."""
+import random
+import statistics
+
+import pytest
+
+from homeassistant.components.statistics.window import SlidingWindow
+
+
+def test_sliding_window():
+    """Test the statistics are kept up to date as values are added and removed."""
+    rng = random.Random(1)
+    window = SlidingWindow(10)
+    values = []
+
+    for _ in range(500):
+        if values and rng.random() < 0.3:
+            assert window.popleft() == values.pop(0)
+        else:
+            value = float(rng.choice([rng.randint(-5, 5), rng.uniform(-100, 100)]))
+            window.append(value)
+            values = [*values, value][-10:]
+
+        assert len(window) == len(values)
+        if not values:
+            continue
+        assert window[0] == values[0]
+        assert window[-1] == values[-1]
+        assert window.minimum == min(values)
+        assert window.maximum == max(values)
+        assert window.median == statistics.median(values)
+        assert window.mean == pytest.approx(statistics.mean(values))
+        assert window.total == pytest.approx(sum(values))
+        if len(values) > 1:
+            assert window.variance == pytest.approx(statistics.variance(values))
+        else:
+            assert window.variance is None
+
+
+def test_sliding_window_empty():
+    """Test an empty window."""
+    window = SlidingWindow(2)
+    assert not window
+    with pytest.raises(IndexError):
+        window.popleft()
+    with pytest.raises(IndexError):
+        window[0]  # pylint: disable=pointless-statement
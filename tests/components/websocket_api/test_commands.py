@@ -1,4 +1,6 @@
 """Tests for WebSocket API commands."""
+from unittest.mock import patch
+
 from async_timeout import timeout
 import voluptuous as vol
 
@@ -12,6 +14,7 @@ from homeassistant.components.websocket_api.const import URL
 from homeassistant.core import Context, callback
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers import entity
+from homeassistant.helpers.json import json_dumps
 from homeassistant.helpers.typing import HomeAssistantType
 from homeassistant.loader import async_get_integration
 from homeassistant.setup import async_setup_component
@@ -260,6 +263,188 @@ async def test_subscribe_unsubscribe_events(hass, websocket_client):
     assert sum(hass.bus.async_listeners().values()) == init_count
 
 
+async def test_subscribe_state_changed_events_filtered(hass, websocket_client):
+    """Test subscribe events only forwards the state changes of the filter."""
+    init_count = sum(hass.bus.async_listeners().values())
+
+    await websocket_client.send_json(
+        {
+            "id": 5,
+            "type": "subscribe_events",
+            "event_type": "state_changed",
+            "entity_ids": ["light.kitchen"],
+            "domains": ["switch"],
+            "entity_globs": ["sensor.*_temp"],
+        }
+    )
+
+    msg = await websocket_client.receive_json()
+    assert msg["id"] == 5
+    assert msg["type"] == const.TYPE_RESULT
+    assert msg["success"]
+
+    hass.states.async_set("light.hall", "on")
+    hass.states.async_set("light.kitchen", "on")
+    hass.states.async_set("sensor.humidity", "50")
+    hass.states.async_set("switch.fan", "on")
+    hass.states.async_set("sensor.hall_temp", "20")
+
+    for entity_id in ("light.kitchen", "switch.fan", "sensor.hall_temp"):
+        with timeout(3):
+            msg = await websocket_client.receive_json()
+
+        assert msg["id"] == 5
+        assert msg["type"] == "event"
+        assert msg["event"]["event_type"] == "state_changed"
+        assert msg["event"]["data"]["entity_id"] == entity_id
+
+    await websocket_client.send_json(
+        {"id": 6, "type": "unsubscribe_events", "subscription": 5}
+    )
+
+    msg = await websocket_client.receive_json()
+    assert msg["id"] == 6
+    assert msg["success"]
+
+    # Check our listeners got unsubscribed
+    assert sum(hass.bus.async_listeners().values()) == init_count
+
+
+async def test_subscribe_events_filtered_not_state_changed(hass, websocket_client):
+    """Test entities can only be filtered for state_changed events."""
+    await websocket_client.send_json(
+        {
+            "id": 5,
+            "type": "subscribe_events",
+            "event_type": "test_event",
+            "entity_ids": ["light.kitchen"],
+        }
+    )
+
+    msg = await websocket_client.receive_json()
+    assert msg["id"] == 5
+    assert msg["type"] == const.TYPE_RESULT
+    assert not msg["success"]
+    assert msg["error"]["code"] == const.ERR_INVALID_FORMAT
+
+
+async def test_subscribe_unsubscribe_entities(hass, websocket_client):
+    """Test subscribe/unsubscribe entities command."""
+    hass.states.async_set("light.permitted", "off", {"color": "red"})
+    original_state = hass.states.get("light.permitted")
+    init_count = sum(hass.bus.async_listeners().values())
+
+    await websocket_client.send_json({"id": 5, "type": "subscribe_entities"})
+
+    msg = await websocket_client.receive_json()
+    assert msg["id"] == 5
+    assert msg["type"] == const.TYPE_RESULT
+    assert msg["success"]
+
+    # Verify we have a new listener
+    assert sum(hass.bus.async_listeners().values()) == init_count + 1
+
+    msg = await websocket_client.receive_json()
+    assert msg["id"] == 5
+    assert msg["type"] == "event"
+    assert msg["event"] == {
+        "a": {
+            "light.permitted": {
+                "a": {"color": "red"},
+                "c": original_state.context.id,
+                "lc": original_state.last_changed.timestamp(),
+                "s": "off",
+            }
+        }
+    }
+
+    hass.states.async_set("light.permitted", "on", {"effect": "help"})
+
+    with timeout(3):
+        msg = await websocket_client.receive_json()
+
+    new_state = hass.states.get("light.permitted")
+    assert msg["id"] == 5
+    assert msg["type"] == "event"
+    assert msg["event"] == {
+        "c": {
+            "light.permitted": {
+                "+": {
+                    "a": {"effect": "help"},
+                    "c": new_state.context.id,
+                    "lc": new_state.last_changed.timestamp(),
+                    "s": "on",
+                },
+                "-": {"a": ["color"]},
+            }
+        }
+    }
+
+    hass.states.async_remove("light.permitted")
+
+    with timeout(3):
+        msg = await websocket_client.receive_json()
+
+    assert msg["id"] == 5
+    assert msg["type"] == "event"
+    assert msg["event"] == {"r": ["light.permitted"]}
+
+    await websocket_client.send_json(
+        {"id": 6, "type": "unsubscribe_events", "subscription": 5}
+    )
+
+    msg = await websocket_client.receive_json()
+    assert msg["id"] == 6
+    assert msg["type"] == const.TYPE_RESULT
+    assert msg["success"]
+
+    # Check our listener got unsubscribed
+    assert sum(hass.bus.async_listeners().values()) == init_count
+
+
+async def test_subscribe_entities_with_entity_ids(
+    hass, websocket_client, hass_admin_user
+):
+    """Test subscribe entities only sends the requested, readable entities."""
+    hass.states.async_set("light.permitted", "off")
+    hass.states.async_set("light.other", "off")
+    hass.states.async_set("light.not_permitted", "off")
+    hass_admin_user.groups = []
+    hass_admin_user.mock_policy(
+        {"entities": {"entity_ids": {"light.permitted": True, "light.other": True}}}
+    )
+
+    await websocket_client.send_json(
+        {
+            "id": 5,
+            "type": "subscribe_entities",
+            "entity_ids": ["light.permitted", "light.not_permitted"],
+        }
+    )
+
+    msg = await websocket_client.receive_json()
+    assert msg["id"] == 5
+    assert msg["type"] == const.TYPE_RESULT
+    assert msg["success"]
+
+    msg = await websocket_client.receive_json()
+    assert msg["id"] == 5
+    assert list(msg["event"]["a"]) == ["light.permitted"]
+
+    hass.states.async_set("light.not_permitted", "on")
+    hass.states.async_set("light.other", "on")
+    hass.states.async_set("light.permitted", "on", {"brightness": 10})
+
+    with timeout(3):
+        msg = await websocket_client.receive_json()
+
+    assert msg["id"] == 5
+    assert msg["type"] == "event"
+    assert list(msg["event"]["c"]) == ["light.permitted"]
+    assert msg["event"]["c"]["light.permitted"]["+"]["s"] == "on"
+    assert msg["event"]["c"]["light.permitted"]["+"]["a"] == {"brightness": 10}
+
+
 async def test_get_states(hass, websocket_client):
     """Test get_states command."""
     hass.states.async_set("greeting.hello", "world")
@@ -404,6 +589,22 @@ async def test_get_states_not_allows_nan(hass, websocket_client):
     assert msg["error"]["code"] == const.ERR_UNKNOWN_ERROR
 
 
+async def test_get_states_serialized_once(hass, websocket_client):
+    """Test get_states command reuses the JSON of the states."""
+    hass.states.async_set("greeting.hello", "world")
+
+    with patch(
+        "homeassistant.core.json_dumps", side_effect=json_dumps
+    ) as mock_json_dumps:
+        for idx in range(1, 3):
+            await websocket_client.send_json({"id": idx, "type": "get_states"})
+            msg = await websocket_client.receive_json()
+            assert msg["success"]
+            assert msg["result"] == [hass.states.get("greeting.hello").as_dict()]
+
+    assert len(mock_json_dumps.mock_calls) == 1
+
+
 async def test_subscribe_unsubscribe_events_whitelist(
     hass, websocket_client, hass_admin_user
 ):
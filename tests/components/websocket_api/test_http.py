@@ -66,6 +66,121 @@ async def test_pending_msg_peak(hass, mock_low_peak, hass_ws_client, caplog):
     assert "Client unable to keep up with pending messages" in caplog.text
 
 
+async def test_pending_msg_superseded(hass, mock_low_peak, hass_ws_client):
+    """Test a client that is behind only gets the latest message of a key."""
+    orig_handler = http.WebSocketHandler
+    instance = None
+
+    def instantiate_handler(*args):
+        nonlocal instance
+        instance = orig_handler(*args)
+        return instance
+
+    with patch(
+        "homeassistant.components.websocket_api.http.WebSocketHandler",
+        instantiate_handler,
+    ):
+        await hass_ws_client()
+
+    # Kill writer task and fill queue past peak
+    for _ in range(5):
+        instance._to_write.put_nowait(None)
+
+    instance._send_message("first", supersede_key="light.kitchen")
+    instance._send_message("other", supersede_key="light.hallway")
+    instance._send_message("result")
+    instance._send_message("second", supersede_key="light.kitchen")
+
+    queued = list(instance._to_write._queue)[5:]
+    assert [getattr(pending, "message", pending) for pending in queued] == [
+        "other",
+        "result",
+        "second",
+    ]
+
+
+async def test_pending_msg_superseded_full_queue(
+    hass, mock_low_queue, mock_low_peak, hass_ws_client, caplog
+):
+    """Test superseding a message does not overflow a full queue."""
+    orig_handler = http.WebSocketHandler
+    instance = None
+
+    def instantiate_handler(*args):
+        nonlocal instance
+        instance = orig_handler(*args)
+        return instance
+
+    with patch(
+        "homeassistant.components.websocket_api.http.WebSocketHandler",
+        instantiate_handler,
+    ):
+        await hass_ws_client()
+
+    # Kill writer task and fill the queue
+    instance._to_write.put_nowait(None)
+    instance._send_message("first", supersede_key="light.kitchen")
+    for idx in range(3):
+        instance._send_message(f"other {idx}")
+    assert instance._to_write.full()
+
+    instance._send_message("second", supersede_key="light.kitchen")
+
+    queued = list(instance._to_write._queue)[1:]
+    assert [getattr(pending, "message", pending) for pending in queued] == [
+        "other 0",
+        "other 1",
+        "other 2",
+        "second",
+    ]
+    assert "Client exceeded max pending messages" not in caplog.text
+
+
+async def test_coalesce_messages(hass, websocket_client):
+    """Test the queued messages are written in one frame when supported."""
+    await websocket_client.send_json(
+        {
+            "id": 1,
+            "type": "supported_features",
+            "features": {const.FEATURE_COALESCE_MESSAGES: 1},
+        }
+    )
+    msg = await websocket_client.receive_json()
+    assert msg["id"] == 1
+    assert msg["success"]
+
+    await websocket_client.send_json(
+        {"id": 2, "type": "subscribe_events", "event_type": "test_event"}
+    )
+    msg = await websocket_client.receive_json()
+    assert msg["id"] == 2
+    assert msg["success"]
+
+    for idx in range(3):
+        hass.bus.async_fire("test_event", {"idx": idx})
+
+    msg = await websocket_client.receive_json()
+    assert [message["event"]["data"]["idx"] for message in msg] == [0, 1, 2]
+
+
+async def test_no_coalesce_messages(hass, websocket_client):
+    """Test each message is written in its own frame by default."""
+    await websocket_client.send_json(
+        {"id": 1, "type": "subscribe_events", "event_type": "test_event"}
+    )
+    msg = await websocket_client.receive_json()
+    assert msg["id"] == 1
+    assert msg["success"]
+
+    for idx in range(3):
+        hass.bus.async_fire("test_event", {"idx": idx})
+
+    for idx in range(3):
+        msg = await websocket_client.receive_json()
+        assert msg["id"] == 1
+        assert msg["event"]["data"]["idx"] == idx
+
+
 async def test_non_json_message(hass, websocket_client, caplog):
     """Test trying to serialze non JSON objects."""
     bad_data = object()
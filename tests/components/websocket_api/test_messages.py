@@ -1,4 +1,7 @@
 """Test Websocket API messages module."""
+from unittest.mock import patch
+
+import pytest
 
 from homeassistant.components.websocket_api.messages import (
     _cached_event_message as lru_event_cache,
@@ -7,6 +10,7 @@ from homeassistant.components.websocket_api.messages import (
 )
 from homeassistant.const import EVENT_STATE_CHANGED
 from homeassistant.core import callback
+from homeassistant.util import json_backend as json_backend_module
 
 
 async def test_cached_event_message(hass):
@@ -78,18 +82,41 @@ async def test_cached_event_message_with_different_idens(hass):
     assert cache_info.currsize == 1
 
 
-async def test_message_to_json(caplog):
+@pytest.fixture(params=["stdlib", "orjson"])
+def json_backend(request):
+    """Serialize the websocket messages with each JSON backend."""
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    with patch(
+        "homeassistant.components.websocket_api.const.JSON_DUMP",
+        getattr(json_backend_module, f"_json_dumps_{request.param}"),
+    ):
+        yield request.param
+
+
+async def test_message_to_json(json_backend, caplog):
     """Test we can serialize websocket messages."""
 
     json_str = message_to_json({"id": 1, "message": "xyz"})
 
-    assert json_str == '{"id": 1, "message": "xyz"}'
+    assert json_str == '{"id":1,"message":"xyz"}'
 
     json_str2 = message_to_json({"id": 1, "message": _Unserializeable()})
 
     assert (
         json_str2
-        == '{"id": 1, "type": "result", "success": false, "error": {"code": "unknown_error", "message": "Invalid JSON in response"}}'
+        == '{"id":1,"type":"result","success":false,"error":{"code":"unknown_error","message":"Invalid JSON in response"}}'
+    )
+    assert "Unable to serialize to JSON" in caplog.text
+
+
+async def test_message_to_json_nan(json_backend, caplog):
+    """Test NaN is not sent in websocket messages."""
+    json_str = message_to_json({"id": 1, "result": {"value": float("NaN")}})
+
+    assert (
+        json_str
+        == '{"id":1,"type":"result","success":false,"error":{"code":"unknown_error","message":"Invalid JSON in response"}}'
     )
     assert "Unable to serialize to JSON" in caplog.text
 
@@ -650,6 +650,58 @@ async def test_capability_attrs(hass):
     assert state.attributes["always"] == "there"
 
 
+async def test_attributes_fingerprint(hass):
+    """Test the attributes are not compared when the fingerprint is unchanged."""
+
+    class ForecastEntity(entity.Entity):
+        """Entity with a large attribute."""
+
+        entity_name = "Home"
+        fingerprint = 1
+        forecast = [20, 21]
+
+        @property
+        def name(self):
+            """Return the name."""
+            return self.entity_name
+
+        @property
+        def state(self):
+            """Return the state."""
+            return "sunny"
+
+        @property
+        def device_state_attributes(self):
+            """Return the forecast."""
+            return {"forecast": self.forecast}
+
+        @property
+        def attributes_fingerprint(self):
+            """Return the version of the forecast."""
+            return self.fingerprint
+
+    ent = ForecastEntity()
+    ent.hass = hass
+    ent.entity_id = "weather.home"
+    ent.async_write_ha_state()
+    suppressed_writes = hass.states.suppressed_writes
+
+    # Trusts the fingerprint over the attributes
+    ent.forecast = [22, 23]
+    ent.async_write_ha_state()
+    assert hass.states.get("weather.home").attributes["forecast"] == [20, 21]
+    assert hass.states.suppressed_writes == suppressed_writes + 1
+
+    ent.fingerprint = 2
+    ent.async_write_ha_state()
+    assert hass.states.get("weather.home").attributes["forecast"] == [22, 23]
+
+    # The base attributes are still compared
+    ent.entity_name = "Cottage"
+    ent.async_write_ha_state()
+    assert hass.states.get("weather.home").name == "Cottage"
+
+
 async def test_warn_slow_write_state(hass, caplog):
     """Check that we log a warning if reading properties takes too long."""
     mock_entity = entity.Entity()
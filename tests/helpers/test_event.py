@@ -19,6 +19,7 @@ from homeassistant.helpers.event import (
     TrackTemplate,
     TrackTemplateResult,
     async_call_later,
+    async_track_matching_state_change_event,
     async_track_point_in_time,
     async_track_point_in_utc_time,
     async_track_same_state,
@@ -125,6 +126,81 @@ async def test_track_point_in_time_drift_rearm(hass):
     assert len(specific_runs) == 1
 
 
+async def test_track_point_in_utc_time_single_loop_timer(hass):
+    """Test the time listeners share a loop timer and run in time order."""
+    runs = []
+    now = dt_util.utcnow()
+    start = datetime(now.year + 1, 5, 24, 21, 59, 55, 500000, tzinfo=dt_util.UTC)
+
+    for name, delay in (("last", 2), ("first", 0), ("second", 0.25), ("gone", 1)):
+        unsub = async_track_point_in_utc_time(
+            hass,
+            callback(lambda _, name=name: runs.append(name)),
+            start + timedelta(seconds=delay),
+        )
+    unsub()
+
+    timers = [
+        handle
+        for handle in hass.loop._scheduled
+        if not handle.cancelled()
+        and getattr(handle._callback, "__name__", None) == "_async_run_due"
+    ]
+    assert len(timers) == 1
+
+    async_fire_time_changed(hass, start + timedelta(seconds=0.3))
+    await hass.async_block_till_done()
+    assert runs == ["first", "second"]
+
+    async_fire_time_changed(hass, start + timedelta(seconds=3))
+    await hass.async_block_till_done()
+    assert runs == ["first", "second", "last"]
+
+
+async def test_track_utc_time_change_no_pattern_not_on_wheel(hass):
+    """Test a listener without a pattern does not wake the loop every second."""
+    runs = []
+
+    unsub = async_track_utc_time_change(hass, callback(lambda x: runs.append(x)))
+
+    assert not [
+        handle
+        for handle in hass.loop._scheduled
+        if not handle.cancelled()
+        and getattr(handle._callback, "__name__", None) == "_async_run_due"
+    ]
+
+    now = dt_util.utcnow()
+    async_fire_time_changed(hass, now)
+    await hass.async_block_till_done()
+    assert runs == [now]
+
+    unsub()
+
+
+async def test_track_point_in_utc_time_exception(hass):
+    """Test a failing time listener does not stop the other listeners."""
+    runs = []
+    point_in_time = dt_util.utcnow() + timedelta(days=1)
+
+    @callback
+    def bad_listener(_):
+        raise ValueError("boom")
+
+    async_track_point_in_utc_time(hass, bad_listener, point_in_time)
+    async_track_point_in_utc_time(
+        hass, callback(lambda x: runs.append(x)), point_in_time
+    )
+
+    with patch.object(hass.loop, "call_exception_handler") as mock_handler:
+        async_fire_time_changed(hass, point_in_time + timedelta(seconds=1))
+        await hass.async_block_till_done()
+
+    assert runs == [point_in_time]
+    assert len(mock_handler.mock_calls) == 1
+    assert isinstance(mock_handler.mock_calls[0][1][0]["exception"], ValueError)
+
+
 async def test_track_state_change_from_to_state_match(hass):
     """Test track_state_change with from and to state matchers."""
     from_and_to_state_runs = []
@@ -626,6 +702,83 @@ async def test_async_track_state_added_domain_with_empty_list(hass):
     unsub_single()
 
 
+async def test_async_track_matching_state_change_event(hass):
+    """Test only the state changes of the matching entities are tracked."""
+    hass.states.async_set("switch.fan", "off")
+    hass.states.async_set("light.bowl", "off")
+    hass.states.async_set("sensor.kitchen_temp", "20")
+    hass.states.async_set("sensor.kitchen_humidity", "50")
+    changes = []
+
+    @ha.callback
+    def run_callback(event):
+        changes.append(event.data["entity_id"])
+
+    tracker = async_track_matching_state_change_event(
+        hass, ["switch.fan", "switch.new"], ["light"], ["sensor.*_temp"], run_callback
+    )
+    assert tracker.entity_ids == {
+        "switch.fan",
+        "switch.new",
+        "light.bowl",
+        "sensor.kitchen_temp",
+    }
+
+    hass.states.async_set("switch.fan", "on")
+    hass.states.async_set("light.bowl", "on")
+    hass.states.async_set("sensor.kitchen_temp", "21")
+    hass.states.async_set("sensor.kitchen_humidity", "51")
+    await hass.async_block_till_done()
+    assert changes == ["switch.fan", "light.bowl", "sensor.kitchen_temp"]
+
+    # Added entities are tracked once when they match
+    changes.clear()
+    hass.states.async_set("switch.new", "on")
+    hass.states.async_set("light.desk", "on")
+    hass.states.async_set("sensor.hall_temp", "19")
+    hass.states.async_set("sensor.hall_humidity", "40")
+    await hass.async_block_till_done()
+    assert changes == ["switch.new", "light.desk", "sensor.hall_temp"]
+
+    changes.clear()
+    hass.states.async_set("light.desk", "off")
+    hass.states.async_set("sensor.hall_temp", "20")
+    hass.states.async_remove("light.bowl")
+    await hass.async_block_till_done()
+    assert changes == ["light.desk", "sensor.hall_temp", "light.bowl"]
+
+    changes.clear()
+    tracker.async_remove()
+    hass.states.async_set("light.desk", "on")
+    hass.states.async_set("light.other", "on")
+    await hass.async_block_till_done()
+    assert changes == []
+
+
+async def test_async_track_matching_state_change_event_glob_domain(hass):
+    """Test globs matching any domain track the entities added to any domain."""
+    hass.states.async_set("light.kitchen", "off")
+    hass.states.async_set("light.hall", "off")
+    changes = []
+
+    @ha.callback
+    def run_callback(event):
+        changes.append(event.data["entity_id"])
+
+    tracker = async_track_matching_state_change_event(
+        hass, [], [], ["*.kitchen"], run_callback
+    )
+    assert tracker.entity_ids == {"light.kitchen"}
+
+    hass.states.async_set("switch.kitchen", "on")
+    hass.states.async_set("switch.hall", "on")
+    hass.states.async_set("light.kitchen", "on")
+    await hass.async_block_till_done()
+    assert changes == ["switch.kitchen", "light.kitchen"]
+
+    tracker.async_remove()
+
+
 async def test_async_track_state_removed_domain_with_empty_list(hass):
     """Test async_track_state_removed_domain passing an empty list of domains."""
     unsub_single = async_track_state_removed_domain(
@@ -1177,6 +1330,51 @@ async def test_track_template_result_complex(hass):
     }
 
 
+async def test_track_template_result_only_renders_affected_templates(hass):
+    """Test a state change only renders the templates depending on it."""
+    template_a = Template("{{ states('sensor.a') }}", hass)
+    template_b = Template("{{ states('sensor.b') }}", hass)
+    template_domain = Template("{{ states.light | count }}", hass)
+    runs = []
+    rendered = []
+    render_to_info = Template.async_render_to_info
+
+    def _render_to_info(self, *args, **kwargs):
+        rendered.append(self)
+        return render_to_info(self, *args, **kwargs)
+
+    def specific_run_callback(event, updates):
+        runs.append([update.template for update in updates])
+
+    info = async_track_template_result(
+        hass,
+        [
+            TrackTemplate(template_a, None),
+            TrackTemplate(template_b, None),
+            TrackTemplate(template_domain, None, timedelta(seconds=0)),
+        ],
+        specific_run_callback,
+    )
+    await hass.async_block_till_done()
+    assert info.listeners == {
+        "all": False,
+        "domains": {"light"},
+        "entities": {"sensor.a", "sensor.b"},
+        "time": False,
+    }
+
+    with patch.object(Template, "async_render_to_info", _render_to_info):
+        hass.states.async_set("sensor.a", "on")
+        await hass.async_block_till_done()
+        assert rendered == [template_a]
+        assert runs == [[template_a]]
+
+        hass.states.async_set("light.one", "on")
+        await hass.async_block_till_done()
+        assert rendered == [template_a, template_domain]
+        assert runs == [[template_a], [template_domain]]
+
+
 async def test_track_template_result_with_wildcard(hass):
     """Test tracking template with a wildcard."""
     specific_runs = []
@@ -1,9 +1,18 @@
 """Test Home Assistant remote methods and classes."""
+import json
+from types import MappingProxyType
+
 import pytest
 
 from homeassistant import core
-from homeassistant.helpers.json import JSONEncoder
-from homeassistant.util import dt as dt_util
+from homeassistant.helpers.json import (
+    JSONEncoder,
+    json_bytes,
+    json_dumps,
+    json_encoder_default,
+    json_loads,
+)
+from homeassistant.util import dt as dt_util, json_backend
 
 
 def test_json_encoder(hass):
@@ -19,3 +28,51 @@ def test_json_encoder(hass):
 
     now = dt_util.utcnow()
     assert ha_json_enc.default(now) == now.isoformat()
+
+
+def test_json_dumps(hass):
+    """Test Home Assistant objects are dumped like the JSON encoder does."""
+    state = core.State("test.test", "hello", {"list": {1}})
+    data = [state, dt_util.utcnow(), {"tuple": ("a", "b")}]
+
+    assert json_loads(json_dumps(data)) == json.loads(json.dumps(data, cls=JSONEncoder))
+    assert json_loads(json_bytes(data)) == json_loads(json_dumps(data))
+
+
+def test_json_encoder_default():
+    """Test objects that can not be converted raise TypeError."""
+    assert json_encoder_default(MappingProxyType({"a": 1})) == {"a": 1}
+
+    with pytest.raises(TypeError):
+        json_encoder_default(object())
+
+    with pytest.raises(TypeError):
+        json_dumps({"bad": object()})
+
+
+@pytest.mark.parametrize("bad", [float("NaN"), float("inf"), float("-inf")])
+@pytest.mark.parametrize("backend", ["stdlib", "orjson"])
+def test_json_backends_reject_non_finite(backend, bad):
+    """Test both backends reject NaN and infinity."""
+    if backend == "orjson":
+        pytest.importorskip("orjson")
+    dumps = getattr(json_backend, f"_json_dumps_{backend}")
+    state = core.State("test.test", "hello", {"value": bad})
+
+    for data in (bad, [None, bad], {"a": None, "b": {"c": bad}}, state, (bad,)):
+        with pytest.raises(ValueError):
+            dumps(data)
+
+
+def test_json_backends_same_output():
+    """Test both backends write the same JSON."""
+    pytest.importorskip("orjson")
+    state = core.State("test.test", "hellö", {"list": {1}, "none": None})
+    data = {"state": state, 1: [1.5, True, None], "tuple": ("a", "b")}
+
+    assert json_backend._json_dumps_orjson(data) == json_backend._json_dumps_stdlib(
+        data
+    )
+    assert json_backend._json_bytes_orjson(data) == json_backend._json_bytes_stdlib(
+        data
+    )
@@ -0,0 +1,76 @@
+"""Test the polling scheduler."""
+import asyncio
+from datetime import timedelta
+import logging
+from unittest.mock import Mock, patch
+
+from homeassistant.helpers.entity_component import EntityComponent
+from homeassistant.helpers.polling import (
+    PollingScheduler,
+    _align,
+    async_get_polling_scheduler,
+)
+import homeassistant.util.dt as dt_util
+
+from tests.common import MockEntity, MockEntityPlatform, async_fire_time_changed
+
+_LOGGER = logging.getLogger(__name__)
+DOMAIN = "test_domain"
+
+
+def test_align():
+    """Test timestamps are aligned on the next batch window."""
+    assert _align(10.0) == 10.0
+    assert _align(10.2) == 11.0
+
+
+async def test_polling_from_scheduler(hass):
+    """Test the entities of a platform are polled by the scheduler."""
+    hass.config.polling_scheduler = True
+    component = EntityComponent(_LOGGER, DOMAIN, hass, timedelta(seconds=20))
+    ent = MockEntity(should_poll=True)
+    ent.async_update = Mock()
+
+    with patch("homeassistant.helpers.polling.random.uniform", return_value=0):
+        await component.async_add_entities([ent])
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=21))
+    await hass.async_block_till_done()
+
+    assert len(ent.async_update.mock_calls) == 1
+    stats = async_get_polling_scheduler(hass).as_dict()
+    assert stats[f"{DOMAIN}.{DOMAIN}"]["polls"] == 1
+    assert stats[f"{DOMAIN}.{DOMAIN}"]["overruns"] == 0
+
+
+async def test_polling_overrun(hass):
+    """Test a platform still polling when it is due again is skipped."""
+    scheduler = PollingScheduler(hass)
+    platform = MockEntityPlatform(hass, scan_interval=timedelta(seconds=10))
+    update = asyncio.Event()
+
+    async def _update_entity_states(now):
+        await update.wait()
+
+    platform._update_entity_states = _update_entity_states
+    with patch("homeassistant.helpers.polling.random.uniform", return_value=0):
+        remove = scheduler.async_add(platform)
+
+    now = dt_util.utcnow()
+    async_fire_time_changed(hass, now + timedelta(seconds=11))
+    await asyncio.sleep(0)
+    async_fire_time_changed(hass, now + timedelta(seconds=22))
+    await asyncio.sleep(0)
+
+    stats = scheduler.as_dict()["test_platform.test_domain"]
+    assert stats["polls"] == 0
+    assert stats["overruns"] == 1
+
+    update.set()
+    await hass.async_block_till_done()
+    assert scheduler.as_dict()["test_platform.test_domain"]["polls"] == 1
+
+    remove()
+    async_fire_time_changed(hass, now + timedelta(seconds=33))
+    await hass.async_block_till_done()
+    assert scheduler.as_dict()["test_platform.test_domain"]["polls"] == 1
@@ -18,6 +18,7 @@ import homeassistant.components.scene as scene
 from homeassistant.const import ATTR_ENTITY_ID, SERVICE_TURN_ON
 from homeassistant.core import Context, CoreState, callback
 from homeassistant.helpers import config_validation as cv, script
+from homeassistant.helpers.template_timing import template_owner
 from homeassistant.setup import async_setup_component
 import homeassistant.util.dt as dt_util
 
@@ -1965,6 +1966,27 @@ async def test_script_logging(hass, caplog):
     assert "Script with % Name: Test message with name 1" in caplog.text
 
 
+async def test_script_run_resets_template_owner(hass):
+    """Test a top level run sets the template owner only while it runs."""
+    owners = []
+
+    @callback
+    def record_owner(event):
+        owners.append(template_owner.get())
+
+    hass.bus.async_listen("test_event", record_owner)
+    sequence = cv.SCRIPT_SCHEMA({"event": "test_event"})
+    script_obj = script.Script(hass, sequence, "Test Name", "test_domain")
+    run = script._ScriptRun(hass, script_obj, {}, Context(), True)
+    script_obj._runs.append(run)
+
+    await run.async_run()
+    await hass.async_block_till_done()
+
+    assert owners == ["test_domain: Test Name"]
+    assert template_owner.get() is None
+
+
 async def test_shutdown_at(hass, caplog):
     """Test stopping scripts at shutdown."""
     delay_alias = "delay step"
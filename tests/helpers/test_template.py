@@ -748,6 +748,67 @@ def test_render_with_possible_json_value_undefined_json_error_value(hass):
     assert tpl.async_render_with_possible_json_value('{"hello": "world"}', "") == ""
 
 
+@pytest.mark.parametrize(
+    "template_str,variables",
+    [
+        ("{{ states('sensor.temperature') }}", {}),
+        ("{{ states('sensor.missing') }}", {}),
+        ('{{state_attr("sensor.temperature", "unit")}}', {}),
+        ("{{ state_attr('sensor.temperature', 'missing') }}", {}),
+        ("{{ value_json.reading.temp }}", {"value_json": {"reading": {"temp": 21}}}),
+        ("{{ value_json.temp }}", {"value_json": {"temp": {"a": [1, None]}}}),
+        ("{{ value | float }}", {"value": "12.5"}),
+        ("{{ value | float * 10 }}", {"value": "2.5"}),
+        ("{{ value|float / 4 }}", {"value": "not a number"}),
+        ("{{ value | float - 0.5 }}", {"value": 3}),
+    ],
+)
+def test_fast_render(hass, template_str, variables):
+    """Test trivial templates render like Jinja without it."""
+    hass.states.async_set("sensor.temperature", "20.5", {"unit": "°C"})
+    tpl = template.Template(template_str, hass)
+    tpl.ensure_valid()
+    tpl._ensure_compiled()  # pylint: disable=protected-access
+    assert tpl._fast_render is not None  # pylint: disable=protected-access
+
+    result = tpl._fast_render(hass, variables)  # pylint: disable=protected-access
+    assert result == tpl._compiled.render(variables)  # pylint: disable=protected-access
+    assert tpl.async_render(variables) == tpl._parse_result(result)
+
+
+def test_fast_render_info(hass):
+    """Test trivial templates collect the render info like Jinja."""
+    hass.states.async_set("sensor.temperature", "20.5", {"unit": "°C"})
+
+    info = render_to_info(hass, "{{ states('sensor.temperature') }}")
+    assert_result_info(info, 20.5, ["sensor.temperature"])
+
+    info = render_to_info(hass, "{{ state_attr('sensor.missing', 'unit') }}")
+    assert_result_info(info, None, ["sensor.missing"])
+
+
+def test_fast_render_falls_back_to_jinja(hass):
+    """Test trivial templates are rendered by Jinja when they must be."""
+    tpl = template.Template("{{ states('sensor.temperature') }}", hass)
+    assert tpl.async_render({"states": lambda entity_id: "shadowed"}) == "shadowed"
+
+    tpl = template.Template("{{ value_json.items }}", hass)
+    tpl.ensure_valid()
+    tpl._ensure_compiled()  # pylint: disable=protected-access
+    assert tpl._fast_render is None  # pylint: disable=protected-access
+
+    tpl = template.Template("{{ value_json.temp }}", hass)
+    assert tpl.async_render_with_possible_json_value("[1, 2]") == ""
+
+    tpl = template.Template("{{ value | float / 0 }}", hass)
+    with pytest.raises(TemplateError):
+        tpl.async_render({"value": "1"})
+
+    tpl = template.Template("{{ states('sensor.temperature') }}", hass)
+    with pytest.raises(TemplateError):
+        tpl.async_render(limited=True)
+
+
 def test_render_with_possible_json_value_non_string_value(hass):
     """Render with possible JSON value with non-string value."""
     tpl = template.Template(
@@ -2055,35 +2116,41 @@ def test_urlencode(hass):
     assert tpl.async_render() == "the%20quick%20brown%20fox%20%3D%20true"
 
 
-async def test_cache_garbage_collection():
-    """Test caching a template."""
+async def test_compiled_code_cache(hass):
+    """Test compiled code is shared by templates and kept once they are gone."""
+    template.COMPILED_CODE_CACHE.clear()
     template_string = (
         "{% set dict = {'foo': 'x&y', 'bar': 42} %} {{ dict | urlencode }}"
     )
-    tpl = template.Template(
-        (template_string),
-    )
+    tpl = template.Template(template_string, hass)
     tpl.ensure_valid()
-    assert template._NO_HASS_ENV.template_cache.get(
-        template_string
-    )  # pylint: disable=protected-access
-
-    tpl2 = template.Template(
-        (template_string),
-    )
-    tpl2.ensure_valid()
-    assert template._NO_HASS_ENV.template_cache.get(
-        template_string
-    )  # pylint: disable=protected-access
+    assert template.COMPILED_CODE_CACHE.as_dict()["misses"] == 1
 
     del tpl
-    assert template._NO_HASS_ENV.template_cache.get(
-        template_string
-    )  # pylint: disable=protected-access
-    del tpl2
-    assert not template._NO_HASS_ENV.template_cache.get(
-        template_string
-    )  # pylint: disable=protected-access
+    tpl2 = template.Template(template_string, hass)
+    tpl2.ensure_valid()
+    stats = template.COMPILED_CODE_CACHE.as_dict()
+    assert stats["size"] == 1
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+    # Limited templates compile against the environment without hass
+    template.Template(template_string).ensure_valid()
+    assert template.COMPILED_CODE_CACHE.as_dict()["size"] == 2
+
+
+def test_compiled_code_cache_evicts_least_recently_used():
+    """Test the least recently used code is evicted once the cache is full."""
+    cache = template.CompiledCodeCache(2)
+    cache.set("{{ 1 }}", False, "one")
+    cache.set("{{ 2 }}", False, "two")
+    assert cache.get("{{ 1 }}", False) == "one"
+    cache.set("{{ 3 }}", False, "three")
+
+    assert cache.get("{{ 2 }}", False) is None
+    assert cache.get("{{ 1 }}", False) == "one"
+    assert cache.get("{{ 1 }}", True) is None
+    assert cache.as_dict() == {"size": 2, "maxsize": 2, "hits": 2, "misses": 2}
 
 
 def test_is_template_string():
@@ -0,0 +1,82 @@
+"""Test the timing of the template renders."""
+from datetime import timedelta
+
+from homeassistant.core import callback
+from homeassistant.helpers.event import TrackTemplate, async_track_template_result
+from homeassistant.helpers.template import Template
+from homeassistant.helpers.template_timing import (
+    DATA_TEMPLATE_TIMINGS,
+    TemplateTimings,
+    template_owner,
+)
+
+
+def test_template_timings():
+    """Test the renders are recorded by template and owner."""
+    timings = TemplateTimings()
+    timings.record("{{ 1 }}", "sensor.one", 0.5)
+    timings.record("{{ 1 }}", "sensor.one", 0.25)
+    timings.record("{{ 2 }}", None, 1.0)
+    timings.record_rate_limited("{{ 1 }}", "sensor.one")
+
+    assert timings.as_dict() == [
+        {
+            "template": "{{ 2 }}",
+            "owner": None,
+            "count": 1,
+            "total": 1.0,
+            "max": 1.0,
+            "rate_limited": 0,
+        },
+        {
+            "template": "{{ 1 }}",
+            "owner": "sensor.one",
+            "count": 2,
+            "total": 0.75,
+            "max": 0.5,
+            "rate_limited": 1,
+        },
+    ]
+
+
+async def test_render_timings(hass):
+    """Test the renders are timed once started."""
+    tpl = Template("{{ states('sensor.one') }}", hass)
+    tpl.async_render()
+
+    timings = hass.data[DATA_TEMPLATE_TIMINGS] = TemplateTimings()
+    tpl.async_render()
+    token = template_owner.set("script: Test")
+    try:
+        tpl.async_render()
+    finally:
+        template_owner.reset(token)
+
+    renders = {render["owner"]: render for render in timings.as_dict()}
+    assert renders[None]["count"] == 1
+    assert renders["script: Test"]["count"] == 1
+    assert renders["script: Test"]["template"] == "{{ states('sensor.one') }}"
+
+
+async def test_tracked_template_timings(hass):
+    """Test the renders of tracked templates are recorded for their tracker."""
+    timings = hass.data[DATA_TEMPLATE_TIMINGS] = TemplateTimings()
+    tpl = Template("{{ states.sensor | count }}", hass)
+
+    @callback
+    def _listener(event, updates):
+        """Ignore the updates."""
+
+    async_track_template_result(
+        hass, [TrackTemplate(tpl, None, timedelta(minutes=1))], _listener
+    )
+    hass.states.async_set("sensor.one", "on")
+    await hass.async_block_till_done()
+    hass.states.async_set("sensor.two", "on")
+    await hass.async_block_till_done()
+
+    (render,) = timings.as_dict()
+    owner = f"{__name__}.test_tracked_template_timings.<locals>._listener"
+    assert render["owner"] == owner
+    assert render["count"] == 2
+    assert render["rate_limited"] == 1
@@ -3,6 +3,7 @@
 import asyncio
 from datetime import datetime, timedelta
 import functools
+import json
 import logging
 import os
 from tempfile import TemporaryDirectory
@@ -360,6 +361,14 @@ def test_state_as_dict():
     assert state.as_dict() is state.as_dict()
 
 
+def test_state_as_json():
+    """Test a State is serialized to JSON once."""
+    state = ha.State("happy.happy", "on", {"pig": "dog"})
+
+    assert json.loads(state.as_json()) == json.loads(json.dumps(state.as_dict()))
+    assert state.as_json() is state.as_json()
+
+
 async def test_eventbus_add_remove_listener(hass):
     """Test remove_listener method."""
     old_count = len(hass.bus.async_listeners())
@@ -495,6 +504,61 @@ async def test_eventbus_coroutine_event_listener(hass):
     assert len(coroutine_calls) == 1
 
 
+async def test_eventbus_dispatch_follows_listeners(hass):
+    """Test the listeners of an event type are updated after it was fired."""
+    calls = []
+
+    @ha.callback
+    def listener(event):
+        calls.append(("listener", event.event_type))
+
+    @ha.callback
+    def match_all_listener(event):
+        calls.append(("match_all", event.event_type))
+
+    hass.bus.async_fire("test_dispatch")
+    unsub = hass.bus.async_listen("test_dispatch", listener)
+    hass.bus.async_fire("test_dispatch")
+    unsub_match_all = hass.bus.async_listen(MATCH_ALL, match_all_listener)
+    hass.bus.async_fire("test_dispatch")
+    unsub()
+    hass.bus.async_fire("test_dispatch")
+    unsub_match_all()
+    hass.bus.async_fire("test_dispatch")
+    await hass.async_block_till_done()
+
+    assert calls == [
+        ("listener", "test_dispatch"),
+        ("match_all", "test_dispatch"),
+        ("listener", "test_dispatch"),
+        ("match_all", "test_dispatch"),
+    ]
+
+
+async def test_eventbus_callback_exception_does_not_stop_dispatch(hass):
+    """Test a failing callback listener does not stop the other listeners."""
+    calls = []
+
+    @ha.callback
+    def bad_listener(event):
+        raise ValueError("boom")
+
+    @ha.callback
+    def listener(event):
+        calls.append(event)
+
+    hass.bus.async_listen("test_exception", bad_listener)
+    hass.bus.async_listen("test_exception", listener)
+
+    with patch.object(hass.loop, "call_exception_handler") as mock_handler:
+        hass.bus.async_fire("test_exception")
+        await hass.async_block_till_done()
+
+    assert len(calls) == 1
+    assert len(mock_handler.mock_calls) == 1
+    assert isinstance(mock_handler.mock_calls[0][1][0]["exception"], ValueError)
+
+
 def test_state_init():
     """Test state.init."""
     with pytest.raises(InvalidEntityFormatError):
@@ -661,6 +725,121 @@ async def test_statemachine_force_update(hass):
     assert len(events) == 1
 
 
+async def test_statemachine_shares_unchanged_attributes(hass):
+    """Test a new state shares the attributes that did not change."""
+    hass.states.async_set("light.bowl", "on", {"brightness": 100})
+    state = hass.states.get("light.bowl")
+
+    hass.states.async_set("light.bowl", "off", {"brightness": 100})
+    new_state = hass.states.get("light.bowl")
+    assert new_state.state == "off"
+    assert new_state.attributes is state.attributes
+    assert new_state.domain is state.domain
+    assert new_state.object_id is state.object_id
+
+    hass.states.async_set("light.bowl", "off", {"brightness": 50})
+    assert hass.states.get("light.bowl").attributes == {"brightness": 50}
+
+    hass.states.async_set("light.ceiling", "on")
+    hass.states.async_set("light.hall", "on", {})
+    assert (
+        hass.states.get("light.ceiling").attributes
+        is hass.states.get("light.hall").attributes
+    )
+
+
+async def test_statemachine_unchanged_attributes_fast_path(hass):
+    """Test unchanged attributes are detected without comparing them."""
+    hass.states.async_set("weather.home", "sunny", {"forecast": [20, 21]})
+    state = hass.states.get("weather.home")
+    events = async_capture_events(hass, EVENT_STATE_CHANGED)
+    suppressed_writes = hass.states.suppressed_writes
+
+    hass.states.async_set("weather.home", "sunny", state.attributes)
+    hass.states.async_set("weather.home", "sunny", {"forecast": [20, 21]})
+    assert hass.states.get("weather.home") is state
+    assert hass.states.suppressed_writes == suppressed_writes + 2
+
+    hass.states.async_set(
+        "weather.home", "sunny", {"forecast": [20, 21]}, attributes_fingerprint=1
+    )
+    # An equal fingerprint is trusted
+    hass.states.async_set(
+        "weather.home", "sunny", {"forecast": [22, 23]}, attributes_fingerprint=1
+    )
+    assert hass.states.get("weather.home") is state
+    assert hass.states.suppressed_writes == suppressed_writes + 4
+
+    hass.states.async_set(
+        "weather.home", "sunny", {"forecast": [22, 23]}, attributes_fingerprint=2
+    )
+    assert hass.states.get("weather.home").attributes == {"forecast": [22, 23]}
+    await hass.async_block_till_done()
+    assert len(events) == 1
+
+
+async def test_statemachine_domain_index(hass):
+    """Test the states of a domain follow the sets and removes."""
+    hass.states.async_set("light.bowl", "on")
+    hass.states.async_set("switch.ac", "off")
+    hass.states.async_set("light.ceiling", "off")
+
+    assert hass.states.async_entity_ids("LIGHT") == ["light.bowl", "light.ceiling"]
+    assert hass.states.async_entity_ids_count(["light", "switch"]) == 3
+    assert [state.state for state in hass.states.async_all("light")] == ["on", "off"]
+
+    hass.states.async_set("light.bowl", "off")
+    assert hass.states.async_all("light")[0] is hass.states.get("light.bowl")
+
+    hass.states.async_remove("light.bowl")
+    hass.states.async_remove("switch.ac")
+    assert hass.states.async_entity_ids(["light", "switch"]) == ["light.ceiling"]
+    assert hass.states.async_all("switch") == []
+    assert hass.states.async_entity_ids_count("switch") == 0
+
+
+async def test_statemachine_changed_since(hass):
+    """Test the states changed since a sequence number."""
+    start = hass.states.sequence
+    hass.states.async_set("light.bowl", "on")
+    hass.states.async_set("switch.ac", "off")
+    assert hass.states.async_changed_since(start) == {
+        "light.bowl": hass.states.get("light.bowl"),
+        "switch.ac": hass.states.get("switch.ac"),
+    }
+
+    sequence = hass.states.sequence
+    hass.states.async_set("switch.ac", "off")
+    assert hass.states.sequence == sequence
+    assert hass.states.async_changed_since(sequence) == {}
+
+    hass.states.async_set("light.bowl", "off")
+    hass.states.async_remove("switch.ac")
+    assert hass.states.async_changed_since(sequence) == {
+        "light.bowl": hass.states.get("light.bowl"),
+        "switch.ac": None,
+    }
+
+    hass.states.async_set("switch.ac", "on")
+    assert hass.states.async_changed_since(start) == {
+        "light.bowl": hass.states.get("light.bowl"),
+        "switch.ac": hass.states.get("switch.ac"),
+    }
+
+
+async def test_statemachine_changed_since_forgotten(hass):
+    """Test changes older than the remembered removals require a resync."""
+    start = hass.states.sequence
+    with patch.object(ha, "STATE_CHANGES_REMOVED_LIMIT", 1):
+        for entity_id in ("light.bowl", "light.ceiling"):
+            hass.states.async_set(entity_id, "on")
+            hass.states.async_remove(entity_id)
+
+    assert hass.states.async_changed_since(start) is None
+    sequence = hass.states.sequence
+    assert hass.states.async_changed_since(sequence - 1) == {"light.ceiling": None}
+
+
 def test_service_call_repr():
     """Test ServiceCall repr."""
     call = ha.ServiceCall("homeassistant", "start")
@@ -845,6 +1024,7 @@ def test_config_defaults():
     assert config.media_dirs == {}
     assert config.safe_mode is False
     assert config.legacy_templates is False
+    assert config.polling_scheduler is False
 
 
 def test_config_path_with_file():
@@ -981,6 +1161,7 @@ async def test_bad_timezone_raises_value_error(hass):
 def test_create_timer(mock_monotonic, loop):
     """Test create timer."""
     hass = MagicMock()
+    hass.bus.async_listeners.return_value = {EVENT_TIME_CHANGED: 1}
     funcs = []
     orig_callback = ha.callback
 
@@ -996,8 +1177,8 @@ def test_create_timer(mock_monotonic, loop):
     ):
         ha._async_create_timer(hass)
 
-    assert len(funcs) == 2
-    fire_time_event, stop_timer = funcs
+    assert len(funcs) == 3
+    fire_time_event, _, stop_timer = funcs
 
     assert len(hass.loop.call_later.mock_calls) == 1
     delay, callback, target = hass.loop.call_later.mock_calls[0][1]
@@ -1033,6 +1214,7 @@ def test_create_timer(mock_monotonic, loop):
 def test_timer_out_of_sync(mock_monotonic, loop):
     """Test create timer."""
     hass = MagicMock()
+    hass.bus.async_listeners.return_value = {EVENT_TIME_CHANGED: 1}
     funcs = []
     orig_callback = ha.callback
 
@@ -1071,8 +1253,8 @@ def test_timer_out_of_sync(mock_monotonic, loop):
 
         assert event_context_0 == event_context_1
 
-        assert len(funcs) == 2
-        fire_time_event, _ = funcs
+        assert len(funcs) == 3
+        fire_time_event, _, _ = funcs
 
     assert len(hass.loop.call_later.mock_calls) == 2
 
@@ -1082,6 +1264,73 @@ def test_timer_out_of_sync(mock_monotonic, loop):
     assert abs(target - 14.2) < 0.001
 
 
+@patch("homeassistant.core.monotonic")
+def test_timer_pauses_without_listeners(mock_monotonic, loop):
+    """Test the timer only ticks while something listens to it."""
+    hass = MagicMock()
+    hass.bus.async_listeners.return_value = {}
+    funcs = []
+    orig_callback = ha.callback
+
+    def mock_callback(func):
+        funcs.append(func)
+        return orig_callback(func)
+
+    mock_monotonic.side_effect = 10.2, 10.4, 11.3, 11.4
+
+    with patch.object(ha, "callback", mock_callback), patch(
+        "homeassistant.core.dt_util.utcnow",
+        return_value=datetime(2018, 12, 31, 3, 4, 5, 333333),
+    ):
+        ha._async_create_timer(hass)
+
+    fire_time_event, resume_timer, _ = funcs
+    assert hass.bus._async_resume_timer is resume_timer
+    assert len(hass.loop.call_later.mock_calls) == 0
+
+    with patch(
+        "homeassistant.core.dt_util.utcnow",
+        return_value=datetime(2018, 12, 31, 3, 4, 5, 600000),
+    ):
+        resume_timer()
+        resume_timer()
+
+    assert len(hass.loop.call_later.mock_calls) == 1
+    delay, callback, target = hass.loop.call_later.mock_calls[0][1]
+    assert abs(delay - 0.4) < 0.001
+    assert callback is fire_time_event
+
+    with patch(
+        "homeassistant.core.dt_util.utcnow",
+        return_value=datetime(2018, 12, 31, 3, 4, 6, 100000),
+    ):
+        callback(target)
+
+    # Without listeners the timer does not schedule the next tick
+    assert len(hass.bus.async_fire.mock_calls) == 1
+    assert len(hass.loop.call_later.mock_calls) == 1
+
+    with patch(
+        "homeassistant.core.dt_util.utcnow",
+        return_value=datetime(2018, 12, 31, 3, 4, 6, 200000),
+    ):
+        resume_timer()
+
+    assert len(hass.loop.call_later.mock_calls) == 2
+
+
+async def test_time_changed_listener_resumes_timer(hass):
+    """Test listening to the time changed event resumes the timer."""
+    resume_timer = Mock()
+    hass.bus._async_resume_timer = resume_timer
+
+    hass.bus.async_listen(EVENT_STATE_CHANGED, lambda _: None)
+    assert len(resume_timer.mock_calls) == 0
+
+    hass.bus.async_listen_once(EVENT_TIME_CHANGED, lambda _: None)
+    assert len(resume_timer.mock_calls) == 1
+
+
 async def test_hass_start_starts_the_timer(loop):
     """Test when hass starts, it starts the timer."""
     hass = ha.HomeAssistant()
@@ -0,0 +1,92 @@
+"""Test Home Assistant job timing utility functions."""
+import asyncio
+import functools
+
+from homeassistant.util import job_timing
+
+
+def _target():
+    """Do nothing."""
+
+
+def test_target_name():
+    """Test the name of a target is its qualified name."""
+    assert job_timing.target_name(_target) == f"{__name__}._target"
+    assert job_timing.target_name(functools.partial(_target)) == f"{__name__}._target"
+
+
+def test_percentile():
+    """Test the nearest rank percentile."""
+    assert job_timing.percentile([], 0.99) is None
+    assert job_timing.percentile([3.0, 1.0, 2.0], 0.5) == 2.0
+    assert job_timing.percentile([float(value) for value in range(100)], 0.99) == 99.0
+
+
+async def test_job_timings(hass):
+    """Test callbacks, executor jobs and tasks are recorded."""
+    timings = job_timing.JobTimings(hass.loop)
+
+    timings.run_callback(_target)
+    timings.run_callback(_target)
+    await hass.async_add_executor_job(timings.run_executor_job, _target)
+
+    async def _coroutine():
+        await asyncio.sleep(0)
+
+    await hass.loop.create_task(timings.time_coroutine(_coroutine, _coroutine()))
+
+    jobs = {job["target"]: job for job in timings.as_dict()["jobs"]}
+    assert jobs[f"{__name__}._target"]["count"] == 3
+    assert jobs[f"{__name__}._target"]["job_type"] == job_timing.JOB_TYPE_CALLBACK
+    coroutine = jobs[f"{__name__}.test_job_timings.<locals>._coroutine"]
+    assert coroutine["job_type"] == job_timing.JOB_TYPE_COROUTINE
+    assert coroutine["count"] == 1
+
+
+async def test_coroutine_awaits_not_timed(hass):
+    """Test the time a coroutine awaits is not recorded."""
+    timings = job_timing.JobTimings(hass.loop)
+
+    async def _sleep():
+        await asyncio.sleep(0.1)
+        return "done"
+
+    task = hass.loop.create_task(timings.time_coroutine(_sleep, _sleep()))
+    assert await task == "done"
+
+    (job,) = timings.as_dict()["jobs"]
+    assert job["count"] == 1
+    assert job["total"] < 0.05
+
+
+async def test_jobs_timed_once_started(hass):
+    """Test the jobs of the instance are only timed while started."""
+    timings = hass.job_timings = job_timing.JobTimings(hass.loop)
+    hass.async_add_job(_target)
+    await hass.async_block_till_done()
+    assert timings.as_dict()["jobs"] == []
+
+    timings.async_start()
+    hass.async_add_job(_target)
+    await hass.async_block_till_done()
+    timings.async_stop()
+
+    jobs = {job["target"]: job for job in timings.as_dict()["jobs"]}
+    assert jobs[f"{__name__}._target"]["count"] == 1
+
+
+async def test_loop_lag(hass):
+    """Test the lag of the loop is measured until stopped."""
+    timings = job_timing.JobTimings(hass.loop)
+    timings.async_start()
+    # pylint: disable=protected-access
+    expected = hass.loop.time() - 0.5
+    timings._lag_handle.cancel()
+    timings._async_check_lag(expected)
+
+    loop_lag = timings.as_dict()["loop_lag"]
+    assert loop_lag["last"] >= 0.5
+    assert loop_lag["max"] == loop_lag["last"]
+
+    timings.async_stop()
+    assert timings._lag_handle is None
@@ -96,6 +96,18 @@ def test_load_bad_data():
         load_json(fname)
 
 
+def test_save_and_load_nan():
+    """Test NaN and Infinity are kept in the files like before."""
+    fname = _path_for("test_nan")
+    save_json(fname, {"nan": float("NaN"), "inf": float("inf")})
+    with open(fname) as fh:
+        assert fh.read() == '{\n    "nan": NaN,\n    "inf": Infinity\n}'
+
+    data = load_json(fname)
+    assert math.isnan(data["nan"])
+    assert data["inf"] == float("inf")
+
+
 def test_custom_encoder():
     """Test serializing with a custom encoder."""
 